@@ -0,0 +1,9 @@
+"""
+URLs del admin, cargadas en la primera petición a admin/ (ver config/urls.py).
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+app_name = 'admin'
+urlpatterns = admin.site.get_urls()
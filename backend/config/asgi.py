@@ -20,6 +20,12 @@ django_asgi_app = get_asgi_application()
 
 # Importar routing después de inicializar Django
 from tasks.routing import websocket_urlpatterns
+from tasks.middleware import QueryStringJWTAuthMiddleware
+from tasks.warmup import warm_up
+
+# Cargar ahora lo que si no pagaría la primera petición (ver tasks/warmup.py).
+# Si falla no impide arrancar: /api/health/ready/ da 503 y lo reintenta
+warm_up()
 
 # Configurar el enrutador de protocolos
 application = ProtocolTypeRouter({
@@ -28,8 +34,10 @@ application = ProtocolTypeRouter({
     
     # Maneja las conexiones WebSocket
     "websocket": AuthMiddlewareStack(
-        URLRouter(
-            websocket_urlpatterns
+        QueryStringJWTAuthMiddleware(
+            URLRouter(
+                websocket_urlpatterns
+            )
         )
     ),
 })
@@ -10,11 +10,18 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
@@ -32,7 +39,8 @@ ALLOWED_HOSTS = []
 
 INSTALLED_APPS = [
     'daphne',  # Debe estar al inicio para WebSockets
-    'django.contrib.admin',
+    # Sin autodiscover al arrancar: el admin se carga con su primera URL (config/admin_urls.py)
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -47,11 +55,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'tasks.middleware.ProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'tasks.middleware.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -87,17 +97,184 @@ CHANNEL_LAYERS = {
     }
 }
 
+# Límites por conexión de BoardConsumer (tasks/consumers.py)
+BOARD_CONSUMER = {
+    # Mensajes entrantes: token bucket por conexión
+    'INBOUND_RATE': 10,            # mensajes/segundo sostenidos
+    'INBOUND_BURST': 20,           # ráfaga máxima
+    'INBOUND_MAX_STRIKES': 50,     # rechazos seguidos antes de cerrar la conexión
+    'MAX_MESSAGE_BYTES': 16 * 1024,
+    'ALLOWED_CLIENT_TYPES': ['message', 'ping'],
+    # Mensajes salientes: cola acotada por conexión
+    'OUTBOUND_QUEUE_SIZE': 200,
+    'SLOW_CONSUMER_POLICY': 'coalesce',  # 'coalesce' | 'drop' | 'disconnect'
+    # Control de flujo: el cliente confirma con {"type": "ack", "received": N}
+    # los frames recibidos. Con ACK_WINDOW frames sin confirmar se deja de
+    # enviar (la cola se llena y entra la política); si no llega ningún ack en
+    # ACK_TIMEOUT segundos se cierra con resync. None desactiva el control.
+    'ACK_WINDOW': 64,
+    'ACK_TIMEOUT': 15,
+    # Canal efímero (type 'ephemeral'): con pérdidas, sin BD ni actividad
+    'EPHEMERAL_KINDS': ['drag', 'cursor'],
+    'EPHEMERAL_RATE': 60,          # mensajes/segundo; el exceso se descarta
+    'EPHEMERAL_BURST': 120,
+    'EPHEMERAL_TICK': 0.05,        # segundos entre publicaciones (20 Hz)
+    'EPHEMERAL_MAX_OBJECTS': 20,   # objetos distintos pendientes por conexión
+    # ws/boards/: tableros suscritos como máximo por conexión
+    'MAX_SUBSCRIPTIONS': 50,
+    # Admisión por worker (ver tasks/admission.py)
+    'MAX_CONCURRENT_ACCEPTS': 50,  # connect() en curso a la vez
+    'ACCEPT_QUEUE_SIZE': 500,      # conexiones esperando plaza
+    'ACCEPT_QUEUE_TIMEOUT': 5,     # segundos de espera antes de rechazar
+    'RETRY_AFTER': 1,              # segundos mínimos antes de reintentar...
+    'RETRY_JITTER': 10,            # ...más un aleatorio de hasta estos segundos
+    'PRESENCE_DEBOUNCE': 0.25,     # ventana de agrupación de entradas/salidas
+}
+
+# Profiler estadístico bajo demanda (ver tasks/profiling.py)
+PROFILING = {
+    'ENABLED': os.environ.get('PROFILING_ENABLED') == '1',
+    'SAMPLE_RATE': int(os.environ.get('PROFILING_SAMPLE_RATE', '0')),  # 1 de cada N; 0 = solo con cabecera
+    'HEADER': 'X-Profile',         # token de `manage.py profile_token`
+    'TOKEN_MAX_AGE': 24 * 3600,
+    'INTERVAL': 0.005,             # segundos entre muestras
+    'DIR': BASE_DIR / 'profiles',
+    'KEEP': 200,                   # perfiles que se conservan en DIR
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
+# Perfil de base de datos (DB_PROFILE), el mismo para todos los alias:
+# - 'dev': SQLite tal cual, una conexión nueva por request.
+# - 'sqlite': conexiones persistentes (una por hilo del pool de daphne), WAL,
+#   busy_timeout, mmap y BEGIN IMMEDIATE. Las escrituras de cada proceso
+#   esperan turno en una cola FIFO por fichero (tasks/backends/sqlite3).
+# - 'postgres': pool de conexiones de psycopg (requiere psycopg[pool]) del
+#   tamaño del pool de hilos. Se compara con `manage.py benchmark_concurrency`.
+DB_PROFILE = os.environ.get('DB_PROFILE', 'dev')
+
+# Hilos con los que daphne ejecuta el código síncrono (vistas, database_sync_to_async);
+# por defecto el mismo tamaño que el ThreadPoolExecutor de asyncio
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', min(32, (os.cpu_count() or 1) + 4)))
+
+DB_POOL = {
+    'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+    'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', ASGI_THREADS)),
+    'TIMEOUT': 10,                 # segundos esperando conexión libre
+}
+
+DB_SQLITE = {
+    'BUSY_TIMEOUT': 20,            # segundos (busy_timeout y espera en la cola de escritura)
+    'MMAP_SIZE': 256 * 1024 * 1024,
+}
+
+
+def _database(alias):
+    if DB_PROFILE == 'postgres':
+        name = os.environ.get('POSTGRES_DB', 'collaboration')
+        return {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': name if alias == 'default' else f'{name}_{alias}',
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Con pool las conexiones ya se reutilizan: CONN_MAX_AGE tiene que ser 0
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'pool': {'min_size': DB_POOL['MIN_SIZE'], 'max_size': DB_POOL['MAX_SIZE'], 'timeout': DB_POOL['TIMEOUT']},
+            },
+        }
+
+    database = {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': BASE_DIR / ('db.sqlite3' if alias == 'default' else f'{alias}.sqlite3'),
     }
+    if alias != 'default':
+        database['TEST'] = {'NAME': BASE_DIR / f'test_{alias}.sqlite3'}
+    if DB_PROFILE == 'sqlite':
+        database.update({
+            'ENGINE': 'tasks.backends.sqlite3',
+            'CONN_MAX_AGE': None,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'timeout': DB_SQLITE['BUSY_TIMEOUT'],
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; '
+                    f"PRAGMA mmap_size={DB_SQLITE['MMAP_SIZE']}; PRAGMA temp_store=MEMORY"
+                ),
+                'serialize_writes': True,
+            },
+        })
+    elif DB_PROFILE != 'dev':
+        raise ImproperlyConfigured(f"DB_PROFILE={DB_PROFILE!r}: use 'dev', 'sqlite' or 'postgres'")
+    return database
+
+
+DATABASES = {
+    'default': _database('default'),
 }
 
+# Réplicas de solo lectura (alias separados por comas, p.ej. DB_REPLICAS=replica_1,replica_2).
+# Con SQLite cada réplica es un fichero; en producción se sustituyen
+# por réplicas reales del primario. Nunca ejecutar migrate contra ellas.
+DATABASE_REPLICAS = [alias for alias in os.environ.get('DB_REPLICAS', '').split(',') if alias]
+
+if TESTING:
+    # Los tests usan dos ficheros SQLite como réplicas y activan el router caso a caso
+    _replica_aliases, DATABASE_REPLICAS = ['replica_1', 'replica_2'], []
+else:
+    _replica_aliases = DATABASE_REPLICAS
+
+for _alias in _replica_aliases:
+    DATABASES[_alias] = _database(_alias)
+
+# Shards por tablero (alias separados por comas, p.ej. DB_SHARDS=shard_1,shard_2).
+# Cada shard se crea con `migrate --database=<alias>` y `init_shards`; ver
+# tasks/db_routers.py. Con SQLite cada shard es un fichero.
+DATABASE_SHARDS = [alias for alias in os.environ.get('DB_SHARDS', '').split(',') if alias]
+
+# Ids reservados a cada shard: el shard i usa [i * SHARD_ID_SPAN, (i + 1) * SHARD_ID_SPAN)
+SHARD_ID_SPAN = 100_000_000
+
+if TESTING:
+    # Igual que las réplicas: dos ficheros SQLite que los tests activan caso a caso
+    _shard_aliases, DATABASE_SHARDS = ['shard_1', 'shard_2'], []
+else:
+    _shard_aliases = DATABASE_SHARDS
+
+for _alias in _shard_aliases:
+    DATABASES[_alias] = _database(_alias)
+
+DATABASE_ROUTERS = ['tasks.db_routers.ShardRouter', 'tasks.db_routers.PrimaryReplicaRouter']
+
+# Segundos que un cliente lee del primario tras escribir (read-your-writes)
+REPLICA_PIN_SECONDS = 5
+
+# Tareas por lista incluidas en el snapshot del tablero; el resto se pagina
+# con /api/lists/{id}/tasks/?after=<position>
+BOARD_TASKS_PER_LIST = 100
+
+# Fusión de actividad repetida (ver tasks/activity.py): ediciones del mismo
+# tipo, usuario y tablero a menos de WINDOW segundos van a una sola entrada
+ACTIVITY_COALESCE = {
+    'WINDOW': 60,
+    'KINDS': ['reordered', 'updated'],
+    'MAX_IDS': 100,
+}
+
+# Historial de tableros para ?at= (ver tasks/history.py): un checkpoint del
+# estado completo cada CHECKPOINT_EVERY eventos acota los eventos a reaplicar
+BOARD_HISTORY = {
+    'CHECKPOINT_EVERY': 100,
+}
+
+# A partir de este número de filas el admin muestra recuentos estimados
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -137,6 +314,9 @@ STATIC_URL = 'static/'
 
 # CORS Configuration
 CORS_ALLOW_ALL_ORIGINS = True  # Solo para desarrollo
+# Marca de read-your-writes de ReplicaRoutingMiddleware (el frontend la reenvía)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-db-pin')
+CORS_EXPOSE_HEADERS = ['X-DB-Pin']
 
 # REST Framework Configuration
 REST_FRAMEWORK = {
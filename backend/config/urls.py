@@ -14,34 +14,72 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
 from django.urls import path, include
+from django.urls.resolvers import RoutePattern, URLResolver
+from django.utils.module_loading import import_string
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from tasks.views import RegisterView, BoardViewSet, ListViewSet, TaskViewSet, ActivityLogViewSet
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from tasks.views import RegisterView, BoardViewSet, ListViewSet, TaskViewSet, ArchivedTaskViewSet, ActivityLogViewSet, NotificationViewSet, ProfileListView, ProfileDetailView, ReadinessView
+from tasks import async_views
+
+
+def lazy_view(dotted_path, **initkwargs):
+    """
+    Vista que se importa en su primera petición. drf_spectacular (esquema y
+    Swagger) tarda más en importarse que el resto del URLconf junto.
+    """
+    view = None
+
+    @csrf_exempt
+    def dispatch(request, *args, **kwargs):
+        nonlocal view
+        if view is None:
+            view = import_string(dotted_path).as_view(**initkwargs)
+        return view(request, *args, **kwargs)
+
+    return dispatch
+
+
+# El admin (SimpleAdminConfig, sin autodiscover al arrancar) se carga al
+# resolver o invertir por primera vez una URL bajo admin/
+admin_urls = URLResolver(RoutePattern('admin/'), 'config.admin_urls', app_name='admin', namespace='admin')
 
 router = DefaultRouter()
 router.register(r'boards', BoardViewSet)
 router.register(r'lists', ListViewSet)
 router.register(r'tasks', TaskViewSet)
+router.register(r'archived-tasks', ArchivedTaskViewSet)
 router.register(r'activity', ActivityLogViewSet, basename='activity')
+router.register(r'notifications', NotificationViewSet, basename='notification')
 
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    admin_urls,
     path('api/', include(router.urls)),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/signup/', RegisterView.as_view(), name='auth_register'),
+
+    # Endpoints async de tareas (mismo contrato que /api/tasks/, sin hilos bloqueados)
+    path('api/async/tasks/', async_views.task_create, name='async_task_create'),
+    path('api/async/tasks/<int:pk>/', async_views.task_update, name='async_task_update'),
+    path('api/async/tasks/<int:pk>/move/', async_views.task_move, name='async_task_move'),
+
+    # Perfiles del profiler bajo demanda (solo staff)
+    path('api/internal/profiles/', ProfileListView.as_view(), name='profile_list'),
+    path('api/internal/profiles/<str:name>/', ProfileDetailView.as_view(), name='profile_detail'),
     
+    # Sonda de disponibilidad del worker (ver tasks/warmup.py)
+    path('api/health/ready/', ReadinessView.as_view(), name='readiness'),
+
     # Swagger UI:
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path('api/schema/swagger-ui/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('api/schema/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+    path('api/schema/', lazy_view('drf_spectacular.views.SpectacularAPIView'), name='schema'),
+    path('api/schema/swagger-ui/', lazy_view('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
+    path('api/schema/redoc/', lazy_view('drf_spectacular.views.SpectacularRedocView', url_name='schema'), name='redoc'),
 ]
 
 
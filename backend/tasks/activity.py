@@ -0,0 +1,131 @@
+"""
+Texto de actividad de las ediciones de tareas y fusión de entradas repetidas.
+
+Reordenar una columna o editar varias veces seguidas genera una entrada por
+request. Las de los tipos de ACTIVITY_COALESCE['KINDS'] se funden al
+escribir: si el mismo usuario tiene una entrada del mismo tipo en el mismo
+tablero (y lista, para reordenar) de hace menos de WINDOW segundos, se suma
+a ella (count, object_ids) en lugar de crear otra.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .db_routers import board_db
+from .models import ActivityLog, Task
+
+
+def describe_task_update(instance, old_list, old_title, old_description, old_position, old_assigned, new_assigned):
+    """
+    Construye el tipo y el texto de actividad para la actualización de una
+    tarea como (kind, texto). Devuelve None si no hubo ningún cambio relevante.
+    """
+    has_list_changed = old_list != instance.list
+    has_content_changed = old_title != instance.title or old_description != instance.description
+    # Position diff check (rounding)
+    has_position_changed = abs(float(old_position) - float(instance.position)) > 0.0001
+    has_assignment_changed = old_assigned != new_assigned
+
+    if not (has_list_changed or has_content_changed or has_position_changed or has_assignment_changed):
+        return None
+
+    if has_list_changed:
+        return 'moved', f"moved task '{instance.title}' to '{instance.list.title}'"
+    if has_assignment_changed:
+        added = new_assigned - old_assigned
+        removed = old_assigned - new_assigned
+        if added:
+            names = ", ".join([u.username for u in added if u and hasattr(u, 'username')])
+            return 'assigned', f"assigned task '{instance.title}' to {names}"
+        if removed:
+            names = ", ".join([u.username for u in removed if u and hasattr(u, 'username')])
+            return 'unassigned', f"unassigned {names} from task '{instance.title}'"
+        return 'assignments', f"updated assignments for task '{instance.title}'"
+    if has_position_changed and not has_content_changed:
+        return 'reordered', f"reordered task '{instance.title}' in '{instance.list.title}'"
+    return 'updated', f"updated task '{instance.title}'"
+
+
+def coalesce_setting(name):
+    return settings.ACTIVITY_COALESCE[name]
+
+
+def _merged_action(kind, task, task_ids):
+    if len(task_ids) == 1:
+        return None
+    if kind == 'reordered':
+        return f"reordered {len(task_ids)} tasks in '{task.list.title}'"
+    return f"updated {len(task_ids)} tasks"
+
+
+def _coalesce_key(kind, task):
+    # Reordenar se agrupa por lista: "reordered 12 tasks in 'Doing'"
+    return f'{kind}:{task.list_id}' if kind == 'reordered' else kind
+
+
+def _merge_into_recent(db, user, task, kind, key, action, pending):
+    """
+    Suma la edición a la entrada reciente con un UPDATE condicionado a su
+    `count` (compare-and-swap): si otra petición la fundió entre la lectura
+    y la escritura no se actualiza ninguna fila y se vuelve a leer. Devuelve
+    el pk de la entrada actualizada, o None si ninguna cumple las condiciones.
+    """
+    for _ in range(3):
+        now = timezone.now()
+        recent = (
+            ActivityLog.objects.using(db)
+            .filter(
+                user=user, board_id=task.board_id, kind=key,
+                timestamp__gte=now - timedelta(seconds=coalesce_setting('WINDOW')),
+            )
+            .exclude(pk=getattr(pending, 'pk', None))
+            .order_by('-timestamp').values('pk', 'count', 'object_ids').first()
+        )
+        if recent is None:
+            return None
+        object_ids = recent['object_ids']
+        if task.id not in object_ids:
+            if len(object_ids) >= coalesce_setting('MAX_IDS'):
+                return None
+            object_ids = [*object_ids, task.id]
+        updated = ActivityLog.objects.using(db).filter(pk=recent['pk'], count=recent['count']).update(
+            object_ids=object_ids,
+            count=F('count') + 1,
+            action=_merged_action(kind, task, object_ids) or action,
+            timestamp=now,
+        )
+        if updated:
+            return recent['pk']
+    return None
+
+
+def log_task_update(user, task, kind, action, pending=None):
+    """
+    Registra la edición de `task`. `pending` es la entrada que ya creó la
+    señal post_save (sin usuario): se completa, o se borra si la edición se
+    funde con una entrada anterior. Solo se inserta una fila si no hay
+    entrada que fundir. Devuelve la entrada resultante.
+    """
+    if kind in coalesce_setting('KINDS'):
+        key = _coalesce_key(kind, task)
+        db = board_db(task.board_id)
+        with transaction.atomic(using=db):
+            merged = _merge_into_recent(db, user, task, kind, key, action, pending)
+            if merged is not None:
+                if pending is not None:
+                    pending.delete()
+                return ActivityLog.objects.using(db).get(pk=merged)
+        kind = key
+
+    log = pending or ActivityLog(content_type=ContentType.objects.get_for_model(Task), object_id=task.id)
+    log.user = user
+    log.action = action
+    log.board_id = task.board_id
+    log.kind = kind
+    log.object_ids = [task.id]
+    log.save()
+    return log
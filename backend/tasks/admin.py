@@ -1,60 +1,307 @@
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
 from django.contrib import admin
-from .models import Board, BoardMember, List, Task, ActivityLog
+from django.core.paginator import Paginator
+from django.db import connections
+from django.http import QueryDict
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .db_routers import current_shard, shard_for_board, shard_for_id, shard_id_start, sharding_enabled, use_shard
+from .models import Board, BoardMember, List, Task, ArchivedTask, ActivityLog
+
+
+def estimate_row_count(model, using):
+    """
+    Número aproximado de filas de la tabla sin recorrerla, o None si el
+    motor no ofrece una estimación barata.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+        elif connection.vendor == 'sqlite':
+            # El máximo de la PK sale del índice; es una cota superior razonable.
+            # En un shard los ids empiezan en index * SHARD_ID_SPAN (ver prepare_shard)
+            cursor.execute(f"SELECT MAX({connection.ops.quote_name(model._meta.pk.column)}) FROM {connection.ops.quote_name(table)}")
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    estimate = row[0] - shard_id_start(using) if connection.vendor == 'sqlite' else row[0]
+    return estimate if estimate >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginador para tablas muy grandes.
+    Sin filtros usa la estimación del motor cuando supera el umbral; con
+    filtros cuenta como mucho umbral + 1 filas, así que el COUNT nunca
+    recorre toda la tabla.
+    """
+
+    @cached_property
+    def count(self):
+        threshold = settings.ADMIN_ESTIMATED_COUNT_THRESHOLD
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > threshold:
+                return estimate
+        return queryset.order_by()[:threshold + 1].count()
+
+
+class DayWindowFilter(admin.SimpleListFilter):
+    """
+    Pagina por fecha: un día por opción (generadas sin consultar la BD) más
+    ventanas de 7 y 30 días. Filtra por rango sobre un campo indexado.
+    """
+    title = 'fecha'
+    parameter_name = 'day'
+    field_name = None
+    days = 7
+
+    def lookups(self, request, model_admin):
+        today = timezone.localdate()
+        choices = [(str(today - timedelta(days=offset)), str(today - timedelta(days=offset))) for offset in range(self.days)]
+        return [('7d', 'Últimos 7 días'), ('30d', 'Últimos 30 días')] + choices
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        now = timezone.localtime()
+        if value.endswith('d') and value[:-1].isdigit():
+            return queryset.filter(**{f'{self.field_name}__gte': now - timedelta(days=int(value[:-1]))})
+        try:
+            start = timezone.make_aware(datetime.combine(date.fromisoformat(value), time.min))
+        except ValueError:
+            return queryset
+        return queryset.filter(**{
+            f'{self.field_name}__gte': start,
+            f'{self.field_name}__lt': start + timedelta(days=1),
+        })
+
+
+class ActivityDayFilter(DayWindowFilter):
+    field_name = 'timestamp'
+
+
+class TaskCreatedDayFilter(DayWindowFilter):
+    title = 'creada'
+    field_name = 'created_at'
+
+
+class BoardIdFilter(admin.SimpleListFilter):
+    """
+    Filtra por id de tablero escrito a mano. El filtro 'board' de Django
+    pinta un enlace por cada tablero, que con miles de tableros es una
+    consulta y una página enormes.
+    """
+    title = 'tablero'
+    parameter_name = 'board_id'
+    template = 'admin/tasks/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if not value:
+            return queryset
+        return queryset.filter(board_id=int(value)) if value.isdigit() else queryset.none()
+
+    def choices(self, changelist):
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'display': 'Todos',
+            # El formulario conserva el resto de filtros y el orden
+            'hidden': [(name, value) for name, value in changelist.params.items() if name != self.parameter_name],
+        }
+
+
+class ShardFilter(admin.SimpleListFilter):
+    """
+    Shard del que se listan las filas (solo con sharding). No hay opción
+    "Todos": sin ?shard= se usa el primero.
+    """
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in settings.DATABASE_SHARDS]
+
+    def queryset(self, request, queryset):
+        # El shard ya lo fija ShardedAdmin alrededor de toda la vista
+        return queryset
+
+    def choices(self, changelist):
+        current = self.value() or settings.DATABASE_SHARDS[0]
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': alias == current,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': title,
+            }
+
+
+class ShardedAdmin(admin.ModelAdmin):
+    """
+    Admin de un modelo por tablero. Con sharding cada vista se ejecuta dentro
+    de use_shard(): el listado en el shard de ?shard= (o el primero), las
+    fichas en el shard de su id (los rangos de ids son por shard) y el alta
+    en el shard del listado del que se viene. Fuera de una vista (p.ej. el
+    autocompletado) get_queryset() usa ?shard= o el primer shard.
+    """
+
+    def object_shard(self, object_id):
+        return shard_for_id(object_id)
+
+    def request_shard(self, request, object_id=None):
+        if not sharding_enabled():
+            return None
+        if object_id is not None and str(object_id).isdigit():
+            return self.object_shard(int(object_id)) or settings.DATABASE_SHARDS[0]
+        filters = QueryDict(request.GET.get('_changelist_filters', ''))
+        alias = request.GET.get(ShardFilter.parameter_name) or filters.get(ShardFilter.parameter_name)
+        return alias if alias in settings.DATABASE_SHARDS else settings.DATABASE_SHARDS[0]
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        return [ShardFilter, *list_filter] if sharding_enabled() else list_filter
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if sharding_enabled() and current_shard() is None:
+            queryset = queryset.using(self.request_shard(request))
+        return queryset
+
+    def in_shard(self, alias, view, *args):
+        # Las TemplateResponse se renderizan al salir de la vista; se fuerza
+        # aquí para que los formularios y filtros consulten el mismo shard.
+        with use_shard(alias):
+            response = view(*args)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        return response
+
+    def changelist_view(self, request, extra_context=None):
+        return self.in_shard(self.request_shard(request), super().changelist_view, request, extra_context)
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        return self.in_shard(
+            self.request_shard(request, object_id), super().changeform_view,
+            request, object_id, form_url, extra_context,
+        )
+
+    def delete_view(self, request, object_id, extra_context=None):
+        return self.in_shard(self.request_shard(request, object_id), super().delete_view, request, object_id, extra_context)
+
+    def history_view(self, request, object_id, extra_context=None):
+        return self.in_shard(self.request_shard(request, object_id), super().history_view, request, object_id, extra_context)
 
 
 class BoardMemberInline(admin.TabularInline):
     """Inline para mostrar los miembros dentro del admin de Board"""
     model = BoardMember
     extra = 1
+    autocomplete_fields = ['user']
 
 
 @admin.register(Board)
-class BoardAdmin(admin.ModelAdmin):
+class BoardAdmin(ShardedAdmin):
+    """
+    Los tableros están en 'default'; el shard solo importa para el inline de miembros.
+    """
     list_display = ['name', 'owner', 'created_at', 'updated_at']
     list_filter = ['created_at', 'updated_at']
+    list_select_related = ['owner']
     search_fields = ['name', 'description', 'owner__username']
+    autocomplete_fields = ['owner']
     inlines = [BoardMemberInline]
     readonly_fields = ['created_at', 'updated_at']
 
+    def object_shard(self, object_id):
+        return shard_for_board(object_id)
+
+    def get_list_filter(self, request):
+        return admin.ModelAdmin.get_list_filter(self, request)
+
+    def get_queryset(self, request):
+        return admin.ModelAdmin.get_queryset(self, request)
+
 
 @admin.register(BoardMember)
-class BoardMemberAdmin(admin.ModelAdmin):
+class BoardMemberAdmin(ShardedAdmin):
     list_display = ['user', 'board', 'role', 'joined_at']
     list_filter = ['role', 'joined_at']
+    # __str__ usa user y board
+    list_select_related = ['user', 'board']
     search_fields = ['user__username', 'board__name']
+    autocomplete_fields = ['user', 'board']
 
 
 @admin.register(List)
-class ListAdmin(admin.ModelAdmin):
+class ListAdmin(ShardedAdmin):
     list_display = ['title', 'board', 'position', 'created_at']
-    list_filter = ['created_at', 'board']
+    list_filter = ['created_at', BoardIdFilter]
+    # __str__ usa board
+    list_select_related = ['board']
     search_fields = ['title', 'board__name']
+    autocomplete_fields = ['board']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['board', 'position']
 
 
 @admin.register(Task)
-class TaskAdmin(admin.ModelAdmin):
+class TaskAdmin(ShardedAdmin):
     list_display = ['title', 'list', 'position', 'due_date', 'created_at']
-    list_filter = ['created_at', 'due_date', 'list__board']
+    list_filter = [TaskCreatedDayFilter, 'due_date', BoardIdFilter]
+    # La columna 'list' imprime List.__str__, que a su vez usa board
+    list_select_related = ['list__board']
     search_fields = ['title', 'description']
-    filter_horizontal = ['assigned_to']
+    autocomplete_fields = ['list', 'assigned_to']
     readonly_fields = ['created_at', 'updated_at']
-    ordering = ['list', 'position']
+    # Orden por un campo indexado; ordenar por lista obliga a un join y un sort completos
+    ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(ShardedAdmin):
+    list_display = ['title', 'list', 'priority', 'archived_at', 'archived_by']
+    list_select_related = ['list__board', 'archived_by']
+    search_fields = ['title', 'description']
+    autocomplete_fields = ['list', 'assigned_to']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'archived_at', 'archived_by']
+    ordering = ['-archived_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(ActivityLog)
-class ActivityLogAdmin(admin.ModelAdmin):
+class ActivityLogAdmin(ShardedAdmin):
     list_display = ['user', 'action', 'content_type', 'object_id', 'timestamp']
-    list_filter = ['timestamp', 'content_type']
+    list_filter = [ActivityDayFilter, 'content_type']
+    list_select_related = ['user', 'content_type']
     search_fields = ['user__username', 'action']
     readonly_fields = ['user', 'action', 'content_type', 'object_id', 'timestamp']
     ordering = ['-timestamp']
-    
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
     def has_add_permission(self, request):
         """No permitir agregar manualmente registros de actividad"""
         return False
-    
+
     def has_change_permission(self, request, obj=None):
         """No permitir editar registros de actividad"""
         return False
@@ -0,0 +1,76 @@
+"""
+Control de admisión de conexiones WebSocket por worker.
+
+Tras un despliegue o un corte de red todos los clientes reconectan a la vez.
+Como mucho BOARD_CONSUMER['MAX_CONCURRENT_ACCEPTS'] conexiones ejecutan su
+connect() (roles, group_add, snapshot, presencia) a la vez; las siguientes
+esperan en una cola de ACCEPT_QUEUE_SIZE plazas durante ACCEPT_QUEUE_TIMEOUT
+segundos. Si no caben, el consumer responde con un retry_after con jitter
+para que los reintentos no vuelvan a llegar todos juntos.
+"""
+import asyncio
+import random
+from collections import deque
+
+from django.conf import settings
+
+
+def admission_setting(name):
+    return settings.BOARD_CONSUMER[name]
+
+
+class AdmissionControl:
+    """
+    Semáforo con cola acotada. Al liberar una plaza se entrega directamente
+    al primero de la cola, así el orden de llegada se respeta.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.waiters = deque()
+
+    async def acquire(self):
+        """
+        Devuelve False si la cola está llena o se agota la espera.
+        """
+        if self.active < admission_setting('MAX_CONCURRENT_ACCEPTS'):
+            self.active += 1
+            return True
+        if len(self.waiters) >= admission_setting('ACCEPT_QUEUE_SIZE'):
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, admission_setting('ACCEPT_QUEUE_TIMEOUT'))
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            # El cliente se fue justo cuando recibía la plaza: devolverla
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self.waiters:
+                self.waiters.remove(waiter)
+        return True
+
+    def release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                # La plaza pasa al siguiente sin tocar `active`
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+
+def retry_after():
+    """
+    Segundos que debe esperar un cliente rechazado: RETRY_AFTER más un jitter
+    uniforme de hasta RETRY_JITTER.
+    """
+    return round(admission_setting('RETRY_AFTER') + random.uniform(0, admission_setting('RETRY_JITTER')), 2)
+
+
+admission = AdmissionControl()
@@ -0,0 +1,110 @@
+"""
+Archivado de tareas: mueve Task (y sus asignaciones) a la tabla fría
+ArchivedTask por lotes, y la operación inversa.
+
+Las tareas archivadas conservan su id, no aparecen en los snapshots del
+tablero ni generan eventos por tarea; cada lote emite un solo evento de
+resumen por tablero.
+"""
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from .events import broadcast
+from .models import ActivityLog, ArchivedTask, Board, Task
+from .signals import mute_signals
+from .stats import rebuild_board_stats
+
+BATCH_SIZE = 500
+
+# Columnas comunes a Task y ArchivedTask
+COPIED_FIELDS = ('id', 'list_id', 'board_id', 'title', 'description', 'position', 'due_date', 'priority', 'created_at', 'updated_at')
+
+
+def stale_tasks(days, queryset=None):
+    """
+    Tareas sin modificar desde hace más de `days` días.
+    """
+    queryset = Task.objects.all() if queryset is None else queryset
+    return queryset.filter(updated_at__lt=timezone.now() - timedelta(days=days))
+
+
+def _copy_batch(db, source_model, target_model, ids, **extra):
+    """
+    Copia las filas `ids` de source_model a target_model junto con sus
+    asignaciones y las borra del origen (el borrado arrastra las asignaciones).
+    """
+    rows = list(source_model.objects.using(db).filter(pk__in=ids).values(*COPIED_FIELDS))
+    objects = target_model.objects.using(db).bulk_create([target_model(**row, **extra) for row in rows])
+    # bulk_create aplica auto_now/auto_now_add: se restauran las fechas originales
+    for obj, row in zip(objects, rows):
+        obj.created_at, obj.updated_at = row['created_at'], row['updated_at']
+    target_model.objects.using(db).bulk_update(objects, ['created_at', 'updated_at'])
+
+    source_field = source_model._meta.get_field('assigned_to')
+    target_field = target_model._meta.get_field('assigned_to')
+    source_fk = source_field.m2m_column_name()
+    target_fk = target_field.m2m_column_name()
+    assignments = source_field.remote_field.through.objects.using(db).filter(**{f'{source_fk}__in': ids})
+    Through = target_field.remote_field.through
+    Through.objects.using(db).bulk_create([
+        Through(**{target_fk: object_id, 'user_id': user_id})
+        for object_id, user_id in assignments.values_list(source_fk, 'user_id')
+    ])
+
+    source_model.objects.using(db).filter(pk__in=ids).delete()
+
+
+def _notify(event_type, boards, user):
+    board_ct = ContentType.objects.get_for_model(Board)
+    verb = 'archived' if event_type == 'tasks_archived' else 'restored'
+    for board_id, task_ids in boards.items():
+        ActivityLog.objects.create(
+            user=user,
+            action=f"{verb} {len(task_ids)} tasks",
+            content_type=board_ct,
+            object_id=board_id
+        )
+        broadcast(board_id, {
+            'type': event_type,
+            'task_ids': task_ids
+        })
+
+
+def _move(queryset, source_model, target_model, event_type, user, batch_size, **extra):
+    # Con sharding el queryset lleva el shard del contexto (ver db_routers)
+    db = queryset.db
+    moved = 0
+    touched = set()
+    while True:
+        batch = list(queryset.order_by('pk').values_list('pk', 'board_id')[:batch_size])
+        if not batch:
+            for board_id in touched:
+                rebuild_board_stats(board_id)
+            return moved
+        ids = [pk for pk, _ in batch]
+        boards = {}
+        for pk, board_id in batch:
+            boards.setdefault(board_id, []).append(pk)
+
+        with transaction.atomic(using=db), mute_signals():
+            _copy_batch(db, source_model, target_model, ids, **extra)
+        _notify(event_type, boards, user)
+        touched.update(boards)
+        moved += len(ids)
+
+
+def archive_tasks(queryset, user=None, batch_size=BATCH_SIZE):
+    """
+    Archiva las tareas del queryset (de Task) por lotes. Devuelve cuántas se movieron.
+    """
+    return _move(queryset, Task, ArchivedTask, 'tasks_archived', user, batch_size, archived_by=user)
+
+
+def restore_tasks(queryset, user=None, batch_size=BATCH_SIZE):
+    """
+    Devuelve a Task las tareas del queryset (de ArchivedTask), con su id original.
+    """
+    return _move(queryset, ArchivedTask, Task, 'tasks_restored', user, batch_size)
@@ -0,0 +1,219 @@
+"""
+Implementaciones async de los endpoints de Task más calientes (crear, editar, mover).
+
+Bajo daphne, TaskViewSet ocupa un hilo por request y cada señal vuelve a
+bloquearlo con async_to_sync(group_send). Estas vistas usan el ORM async y
+hacen await directamente sobre el channel layer. La validación y la
+representación siguen pasando por TaskSerializer, y la autenticación y la
+autorización son las mismas que en TaskViewSet (JWT + roles por tablero).
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .activity import describe_task_update, log_task_update
+from .db_routers import shard_for_id, sharding_enabled, use_shard
+from .events import abroadcast
+from .notifications import task_notifications
+from .models import ActivityLog, Task
+from .permissions import aboard_roles, require_board_role
+from .serializers import TaskSerializer
+from .signals import mute_signals, task_payload
+
+User = get_user_model()
+
+_jwt = JWTAuthentication()
+
+
+async def authenticate(request):
+    """
+    Equivalente async de JWTAuthentication + IsAuthenticated.
+    La validación del token no toca la base de datos; el usuario se carga con aget().
+    """
+    header = _jwt.get_header(request)
+    raw_token = _jwt.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise exceptions.NotAuthenticated()
+
+    token = _jwt.get_validated_token(raw_token)
+    try:
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise exceptions.AuthenticationFailed('Token contained no recognizable user identification')
+
+    try:
+        user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+    except User.DoesNotExist:
+        raise exceptions.AuthenticationFailed('User not found', code='user_not_found')
+
+    if not user.is_active:
+        raise exceptions.AuthenticationFailed('User is inactive', code='user_inactive')
+    return user
+
+
+def async_api_view(*methods):
+    """
+    Decorador para vistas async: métodos permitidos, exención CSRF (igual que DRF),
+    autenticación JWT y traducción de APIException a respuestas JSON.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @require_http_methods(methods)
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                request.user = await authenticate(request)
+                return await view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                detail = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+                response = JsonResponse(detail, status=exc.status_code, safe=False)
+                if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                    response['WWW-Authenticate'] = _jwt.authenticate_header(request)
+                return response
+        return wrapper
+    return decorator
+
+
+def _task_shard(pk):
+    """
+    Con sharding, la tarea (o la lista en la que se crea) fija el shard de
+    toda la vista; los ids fuera de rango no existen.
+    """
+    if not sharding_enabled():
+        return use_shard(None)
+    try:
+        alias = shard_for_id(pk)
+    except (TypeError, ValueError):
+        alias = None
+    if alias is None:
+        raise exceptions.NotFound()
+    return use_shard(alias)
+
+
+def _parse(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise exceptions.ParseError()
+    if not isinstance(data, dict):
+        raise exceptions.ParseError('Expected a JSON object.')
+    return data
+
+
+async def _get_task(pk, roles):
+    try:
+        return await Task.objects.select_related('list').aget(pk=pk, board_id__in=list(roles))
+    except Task.DoesNotExist:
+        raise exceptions.NotFound()
+
+
+async def _represent(task):
+    # assigned_to necesita una consulta síncrona dentro del serializer
+    return await sync_to_async(lambda: TaskSerializer(task).data)()
+
+
+async def _log(user, action, task):
+    content_type = await sync_to_async(ContentType.objects.get_for_model)(Task)
+    await ActivityLog.objects.acreate(
+        user=user,
+        action=action,
+        content_type=content_type,
+        object_id=task.id
+    )
+
+
+async def _broadcast(task, event_type):
+    await abroadcast(task.board_id, {
+        'type': event_type,
+        'task': task_payload(task)
+    })
+
+
+@async_api_view('POST')
+async def task_create(request):
+    data = _parse(request)
+    if sharding_enabled() and data.get('list') is None:
+        raise exceptions.ValidationError({'list': ['This field is required.']})
+    with _task_shard(data.get('list')):
+        return await _create(request, data)
+
+
+async def _create(request, data):
+    serializer = TaskSerializer(data=data)
+    await sync_to_async(serializer.is_valid)(raise_exception=True)
+
+    data = dict(serializer.validated_data)
+    require_board_role(await aboard_roles(request.user), data['list'].board_id)
+    assigned = data.pop('assigned_to', [])
+    # La actividad y el evento se emiten aquí, sin pasar por las señales síncronas
+    with mute_signals():
+        task = await Task.objects.acreate(**data)
+    await task.assigned_to.aset(assigned)
+    await sync_to_async(task_notifications)(task, request.user, assigned)
+
+    await _log(request.user, f"Task '{task.title}' created in list '{task.list.title}'", task)
+    await _broadcast(task, 'task_created')
+    return JsonResponse(await _represent(task), status=201)
+
+
+async def _update(request, pk, data, partial):
+    roles = await aboard_roles(request.user)
+    task = await _get_task(pk, roles)
+    old_list = task.list
+    old_title = task.title
+    old_description = task.description
+    old_position = task.position
+    old_assigned = {user async for user in task.assigned_to.all()}
+
+    serializer = TaskSerializer(task, data=data, partial=partial)
+    await sync_to_async(serializer.is_valid)(raise_exception=True)
+
+    data = dict(serializer.validated_data)
+    if 'list' in data:
+        require_board_role(roles, data['list'].board_id)
+    assigned = data.pop('assigned_to', None)
+    for attr, value in data.items():
+        setattr(task, attr, value)
+    with mute_signals():
+        await task.asave()
+
+    new_assigned = old_assigned
+    if assigned is not None:
+        await task.assigned_to.aset(assigned)
+        new_assigned = set(assigned)
+    await sync_to_async(task_notifications)(task, request.user, new_assigned - old_assigned, old_description)
+
+    change = describe_task_update(
+        task, old_list, old_title, old_description, old_position, old_assigned, new_assigned
+    )
+    if change:
+        await sync_to_async(log_task_update)(request.user, task, *change)
+    await _broadcast(task, 'task_updated')
+    return JsonResponse(await _represent(task))
+
+
+@async_api_view('PUT', 'PATCH')
+async def task_update(request, pk):
+    with _task_shard(pk):
+        return await _update(request, pk, _parse(request), partial=request.method == 'PATCH')
+
+
+@async_api_view('POST')
+async def task_move(request, pk):
+    """
+    Mueve una tarea: solo acepta 'list' y/o 'position'.
+    """
+    data = {key: value for key, value in _parse(request).items() if key in ('list', 'position')}
+    if not data:
+        raise exceptions.ValidationError({'detail': "Either 'list' or 'position' is required."})
+    with _task_shard(pk):
+        return await _update(request, pk, data, partial=True)
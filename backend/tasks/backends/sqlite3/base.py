@@ -0,0 +1,145 @@
+"""
+SQLite con cola de escritura por proceso (DB_PROFILE=sqlite, ver config/settings.py).
+
+SQLite admite un solo escritor a la vez. Con BEGIN IMMEDIATE el bloqueo de
+escritura se toma al abrir la transacción, pero los hilos que esperan lo
+sondean con busy_timeout sin ningún orden y, con suficientes hilos, alguno
+agota la espera con "database is locked". Con OPTIONS['serialize_writes']
+las transacciones y las escrituras sueltas en autocommit de los hilos de un
+proceso hacen cola (FIFO, por fichero) antes de tocar SQLite; busy_timeout
+queda solo para la competencia con otros procesos. La espera en la cola
+está acotada por OPTIONS['writer_timeout'], por defecto OPTIONS['timeout']
+como busy_timeout.
+"""
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+WRITE_RE = re.compile(r'\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b', re.IGNORECASE)
+
+
+class WriterQueue:
+    """
+    Cerrojo FIFO: los escritores entran en orden de llegada.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._waiting = deque()
+        self._held = False
+
+    def acquire(self, timeout=None):
+        with self._condition:
+            ticket = object()
+            self._waiting.append(ticket)
+            if self._condition.wait_for(lambda: not self._held and self._waiting[0] is ticket, timeout):
+                self._waiting.popleft()
+                self._held = True
+                return True
+            # Sin turno a tiempo: se sale de la cola y se despierta al siguiente
+            self._waiting.remove(ticket)
+            self._condition.notify_all()
+            return False
+
+    def release(self):
+        with self._condition:
+            self._held = False
+            self._condition.notify_all()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def writer_queue(name):
+    with _queues_lock:
+        return _queues.setdefault(str(name), WriterQueue())
+
+
+class SerializedCursorWrapper(base.SQLiteCursorWrapper):
+    db = None
+
+    def execute(self, query, params=None):
+        with self.db.autocommit_write(query):
+            return super().execute(query, params)
+
+    def executemany(self, query, param_list):
+        with self.db.autocommit_write(query):
+            return super().executemany(query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.serialize_writes = False
+        self._writing = False
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        self.serialize_writes = kwargs.pop('serialize_writes', False)
+        self.writer_timeout = kwargs.pop('writer_timeout', kwargs.get('timeout', 5))
+        return kwargs
+
+    def create_cursor(self, name=None):
+        if not self.serialize_writes:
+            return super().create_cursor(name)
+        cursor = self.connection.cursor(factory=SerializedCursorWrapper)
+        cursor.db = self
+        return cursor
+
+    def _begin_write(self):
+        if not writer_queue(self.settings_dict['NAME']).acquire(self.writer_timeout):
+            raise OperationalError(f"database is locked (no write turn after {self.writer_timeout}s)")
+        self._writing = True
+
+    def _end_write(self):
+        if self._writing:
+            self._writing = False
+            writer_queue(self.settings_dict['NAME']).release()
+
+    @contextmanager
+    def autocommit_write(self, query):
+        """
+        Turno para una escritura fuera de transacción (las de dentro ya lo tienen).
+        """
+        if self._writing or not WRITE_RE.match(query):
+            yield
+            return
+        self._begin_write()
+        try:
+            yield
+        finally:
+            self._end_write()
+
+    def _start_transaction_under_autocommit(self):
+        if not self.serialize_writes:
+            return super()._start_transaction_under_autocommit()
+        self._begin_write()
+        try:
+            super()._start_transaction_under_autocommit()
+        except BaseException:
+            self._end_write()
+            raise
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._end_write()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._end_write()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._end_write()
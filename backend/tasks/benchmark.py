@@ -0,0 +1,249 @@
+"""
+Benchmark de las rutas REST principales contra el dataset de
+tasks/dataset.py (ver `manage.py benchmark`).
+
+Cada escenario se ejecuta con el test client de Django (pila completa de
+middleware, autenticación JWT, serializadores y señales) dentro de una
+transacción que se deshace al final, así que las escrituras no alteran el
+dataset. Se mide el tiempo de pared y las consultas de cada iteración.
+
+run_concurrency() (`manage.py benchmark_concurrency`) mide en cambio el
+perfil de base de datos (DB_PROFILE) bajo concurrencia: varios hilos, cada
+uno con su conexión, lanzan la mezcla de escenarios a la vez. Aquí no hay
+transacción que deshacer, así que las escrituras quedan en el dataset.
+"""
+import copy
+import json
+import math
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .dataset import PASSWORD
+from .models import Board, Task
+
+
+def _host():
+    """
+    Un host que acepte ALLOWED_HOSTS (con DEBUG y la lista vacía vale localhost).
+    """
+    host = next((h for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+    return host.lstrip('.')
+
+
+class Fixture:
+    """
+    Tablero más grande del dataset, su propietario autenticado y sus tareas.
+    """
+
+    def __init__(self, prefix):
+        self.board = (
+            Board.objects.filter(owner__username__startswith=f'{prefix}-')
+            .annotate(size=Count('board_tasks')).order_by('-size').first()
+        )
+        if self.board is None:
+            raise LookupError(f"No hay dataset con el prefijo '{prefix}' (ver generate_dataset)")
+        self.list_ids = list(self.board.lists.values_list('id', flat=True))
+        self.task_ids = list(Task.objects.filter(board=self.board).values_list('id', flat=True)[:500])
+        self.connect()
+
+    def connect(self):
+        self.client = APIClient(SERVER_NAME=_host())
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.board.owner).access_token}')
+        self.anonymous = APIClient(SERVER_NAME=_host())
+
+    def for_thread(self):
+        """
+        Copia con clientes propios: el test client no se comparte entre hilos.
+        """
+        fixture = copy.copy(self)
+        fixture.connect()
+        return fixture
+
+    def pick(self, items, i):
+        return items[i % len(items)]
+
+
+def board_retrieve(fixture, i):
+    return fixture.client.get(f'/api/boards/{fixture.board.id}/')
+
+
+def task_patch(fixture, i):
+    return fixture.client.patch(f'/api/tasks/{fixture.pick(fixture.task_ids, i)}/', {'title': f'Benchmark {i}'}, format='json')
+
+
+def task_move(fixture, i):
+    return fixture.client.patch(
+        f'/api/tasks/{fixture.pick(fixture.task_ids, i)}/',
+        {'list': fixture.pick(fixture.list_ids, i + 1), 'position': '0.5'},
+        format='json',
+    )
+
+
+def activity_feed(fixture, i):
+    return fixture.client.get('/api/activity/')
+
+
+def signup(fixture, i):
+    return fixture.anonymous.post('/api/signup/', {'username': f'signup-{uuid.uuid4().hex[:12]}', 'password': PASSWORD}, format='json')
+
+
+SCENARIOS = {
+    'board_retrieve': board_retrieve,
+    'task_patch': task_patch,
+    'task_move': task_move,
+    'activity_feed': activity_feed,
+    'signup': signup,
+}
+
+
+def percentile(values, q):
+    """
+    Percentil por rango más cercano sobre una lista ya ordenada.
+    """
+    return values[max(0, math.ceil(q / 100 * len(values)) - 1)]
+
+
+def _measure(scenario, fixture, iterations, warmup):
+    timings, queries = [], []
+    for i in range(warmup + iterations):
+        with ExitStack() as stack:
+            captures = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in ('default', *settings.DATABASE_REPLICAS)
+            ]
+            started = time.perf_counter()
+            response = scenario(fixture, i)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code >= 400:
+            raise RuntimeError(f"{scenario.__name__}: HTTP {response.status_code} {response.content[:200]!r}")
+        if i >= warmup:
+            timings.append(elapsed)
+            queries.append(sum(len(capture) for capture in captures))
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': round(sum(timings) / len(timings), 2),
+        'p50_ms': round(percentile(timings, 50), 2),
+        'p95_ms': round(percentile(timings, 95), 2),
+        'p99_ms': round(percentile(timings, 99), 2),
+        'queries': max(queries),
+    }
+
+
+def run_benchmarks(prefix='bench', scenarios=tuple(SCENARIOS), iterations=30, warmup=3):
+    """
+    Devuelve {escenario: {mean_ms, p50_ms, p95_ms, p99_ms, queries}}.
+    """
+    results = {}
+    with transaction.atomic():
+        fixture = Fixture(prefix)
+        for name in scenarios:
+            results[name] = _measure(SCENARIOS[name], fixture, iterations, warmup)
+        transaction.set_rollback(True)
+    return results
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Compara con un baseline guardado. Es regresión que p50 o p95 empeoren más
+    de `threshold` (fracción) o que aumente el número de consultas.
+    """
+    rows = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            rows.append({'scenario': name, 'regressions': [], 'new': True})
+            continue
+        regressions = [
+            metric for metric in ('p50_ms', 'p95_ms')
+            if previous[metric] and current[metric] > previous[metric] * (1 + threshold)
+        ]
+        if current['queries'] > previous['queries']:
+            regressions.append('queries')
+        rows.append({
+            'scenario': name,
+            'regressions': regressions,
+            'new': False,
+            **{f'{metric}_delta': round(current[metric] / previous[metric] - 1, 3) if previous[metric] else None
+               for metric in ('p50_ms', 'p95_ms')},
+            'queries_delta': current['queries'] - previous['queries'],
+        })
+    return rows
+
+
+def run_concurrency(prefix='bench', scenarios=('board_retrieve', 'task_patch', 'activity_feed'), threads=None, requests=50):
+    """
+    `threads` hilos (por defecto DB_POOL['MAX_SIZE']) hacen `requests`
+    peticiones cada uno repartidas entre `scenarios`. Devuelve el rendimiento
+    total, la latencia y los errores por tipo ("database is locked" incluido).
+    """
+    threads = threads or settings.DB_POOL['MAX_SIZE']
+    fixture = Fixture(prefix)
+    timings, errors, lock = [], Counter(), threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker(offset):
+        local_timings, local_errors = [], Counter()
+        try:
+            own = fixture.for_thread()
+            start.wait()
+            for i in range(requests):
+                scenario = SCENARIOS[scenarios[(offset + i) % len(scenarios)]]
+                started = time.perf_counter()
+                try:
+                    response = scenario(own, offset * requests + i)
+                except Exception as exc:
+                    local_errors[f'{type(exc).__name__}: {str(exc)[:80]}'] += 1
+                    continue
+                if response.status_code >= 400:
+                    local_errors[f'HTTP {response.status_code}'] += 1
+                    continue
+                local_timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            connections.close_all()
+            with lock:
+                timings.extend(local_timings)
+                errors.update(local_errors)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    timings.sort()
+    return {
+        'profile': settings.DB_PROFILE,
+        'vendor': connections['default'].vendor,
+        'threads': threads,
+        'requests': threads * requests,
+        'ok': len(timings),
+        'errors': dict(errors),
+        'throughput_rps': round(len(timings) / elapsed, 1),
+        **{
+            f'p{q}_ms': round(percentile(timings, q), 2) if timings else None
+            for q in (50, 95, 99)
+        },
+    }
+
+
+def load_baseline(path):
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def save_baseline(results, path):
+    with open(path, 'w') as handle:
+        json.dump(results, handle, indent=2, sort_keys=True)
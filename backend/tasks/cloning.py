@@ -0,0 +1,104 @@
+"""
+Clonado de tableros y plantillas.
+
+Un clon copia listas, tareas (con sus posiciones) y, opcionalmente, miembros y
+asignaciones en una sola transacción con bulk_create: no se disparan las
+señales por fila (actividad, WebSocket, estadísticas incrementales) y al
+final se reconstruyen las estadísticas y se registra una única entrada de
+actividad. Una plantilla es un tablero con is_template=True; clonarla crea
+un tablero normal.
+"""
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from .db_routers import board_db
+from .history import checkpoint
+from .models import ActivityLog, Board, BoardMember, List, Task
+from .permissions import invalidate_board_roles
+from .signals import mute_signals
+from .stats import rebuild_board_stats
+
+BATCH_SIZE = 2000
+
+
+def clone_board(source, owner, name=None, include_members=False, include_assignments=False, is_template=False):
+    """
+    Devuelve el tablero nuevo, propiedad de `owner` (que queda como admin).
+    Las asignaciones solo se copian para usuarios que son miembros del clon.
+    """
+    with transaction.atomic(), mute_signals():
+        board = Board.objects.create(
+            name=name or f"{source.name} (copia)",
+            description=source.description,
+            owner=owner,
+            is_template=is_template,
+        )
+        # Con sharding el original y el clon pueden estar en shards distintos
+        source_db, db = board_db(source.id), board_db(board.id)
+        with transaction.atomic(using=db):
+            members = _copy(source, board, owner, source_db, db, include_members, include_assignments)
+
+    # bulk_create no dispara las señales que invalidan los roles cacheados
+    for user_id in members:
+        invalidate_board_roles(user_id)
+
+    # Las señales estaban silenciadas: el historial empieza con el contenido copiado
+    checkpoint(board.id, board.version)
+    return board
+
+
+def _copy(source, board, owner, source_db, db, include_members, include_assignments):
+    """
+    Copia el contenido de `source` en `board` y devuelve los miembros del clon.
+    """
+    members = {owner.id: 'admin'}
+    usernames = {owner.id: owner.username}
+    if include_members:
+        rows = BoardMember.objects.using(source_db).filter(board=source).values_list('user_id', 'username', 'role')
+        for user_id, username, role in rows:
+            members.setdefault(user_id, role)
+            usernames.setdefault(user_id, username)
+        # El propietario del original no tiene fila en BoardMember, pero es admin
+        if source.owner_id not in members:
+            members[source.owner_id] = 'admin'
+            usernames[source.owner_id] = source.owner.username
+    BoardMember.objects.using(db).bulk_create([
+        BoardMember(board=board, user_id=user_id, username=usernames[user_id], role=role)
+        for user_id, role in members.items()
+    ])
+
+    source_lists = List.objects.using(source_db).filter(board=source).order_by('position', 'id').values_list('id', 'title', 'position')
+    new_lists = List.objects.using(db).bulk_create(
+        [List(board=board, title=title, position=position) for _, title, position in source_lists],
+        batch_size=BATCH_SIZE,
+    )
+    list_map = {old_id: new.id for (old_id, _, _), new in zip(source_lists, new_lists)}
+
+    source_tasks = Task.objects.using(source_db).filter(board=source).order_by('list_id', 'position', 'id').values_list(
+        'id', 'list_id', 'title', 'description', 'position', 'due_date', 'priority'
+    )
+    new_tasks = Task.objects.using(db).bulk_create([
+        Task(
+            list_id=list_map[list_id], board_id=board.id, title=title, description=description,
+            position=position, due_date=due_date, priority=priority,
+        )
+        for _, list_id, title, description, position, due_date, priority in source_tasks
+    ], batch_size=BATCH_SIZE)
+
+    if include_assignments:
+        task_map = {row[0]: new.id for row, new in zip(source_tasks, new_tasks)}
+        through = Task.assigned_to.through
+        assignments = through.objects.using(source_db).filter(task__board=source, user_id__in=list(members)).values_list('task_id', 'user_id')
+        through.objects.using(db).bulk_create(
+            [through(task_id=task_map[task_id], user_id=user_id) for task_id, user_id in assignments],
+            batch_size=BATCH_SIZE,
+        )
+
+    rebuild_board_stats(board.id)
+    ActivityLog.objects.create(
+        user=owner,
+        action=f"Board '{board.name}' cloned from '{source.name}' ({len(new_lists)} lists, {len(new_tasks)} tasks)",
+        content_type=ContentType.objects.get_for_model(Board),
+        object_id=board.id,
+    )
+    return members
@@ -1,29 +1,155 @@
+import asyncio
+import itertools
 import json
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from .admission import admission, retry_after
+from .notifications import unread_count, user_group
+from .permissions import aboard_roles
+from .profiling import profile_message
+from .snapshots import FORMATS, board_snapshot
+
 User = get_user_model()
 
 
 # Global store for connected users (In-memory, for dev/single-worker only)
 connected_users = {}
 
+# Código de cierre cuando el cliente no consume a tiempo (debe recargar el tablero)
+CLOSE_RESYNC = 4008
+# Código de cierre cuando el cliente supera repetidamente el límite de mensajes
+CLOSE_RATE_LIMITED = 4029
+# Código de cierre cuando el usuario no es miembro del tablero
+CLOSE_FORBIDDEN = 4003
+# Código de cierre cuando el worker no admite más conexiones (reintentar tras retry_after)
+CLOSE_OVERLOADED = 4013
+
+# Cambios de presencia pendientes por tablero en este worker
+_presence_pending = {}
+
+
+def consumer_setting(name):
+    return settings.BOARD_CONSUMER[name]
+
+
+def announce_presence(channel_layer, board_id, joined=None, left=None):
+    """
+    Acumula entradas y salidas durante PRESENCE_DEBOUNCE segundos y las publica
+    en un único evento presence_changed por tablero. Una reconexión (salida y
+    entrada del mismo usuario en la misma ventana) no genera ningún cambio.
+    """
+    loop = asyncio.get_running_loop()
+    pending = _presence_pending.get(board_id)
+    if pending is None or pending['loop'] is not loop:
+        pending = _presence_pending[board_id] = {'loop': loop, 'joined': set(), 'left': set()}
+        asyncio.ensure_future(_flush_presence(channel_layer, board_id, pending))
+    if joined:
+        if joined in pending['left']:
+            pending['left'].discard(joined)
+        else:
+            pending['joined'].add(joined)
+    if left:
+        if left in pending['joined']:
+            pending['joined'].discard(left)
+        else:
+            pending['left'].add(left)
+
+
+async def _flush_presence(channel_layer, board_id, pending):
+    await asyncio.sleep(consumer_setting('PRESENCE_DEBOUNCE'))
+    if _presence_pending.get(board_id) is pending:
+        del _presence_pending[board_id]
+    if pending['joined'] or pending['left']:
+        await channel_layer.group_send(f'board_{board_id}', {
+            'type': 'presence_changed',
+            'board_id': board_id,
+            'joined': sorted(pending['joined']),
+            'left': sorted(pending['left'])
+        })
+
+
+class TokenBucket:
+    """
+    Token bucket clásico: `rate` tokens por segundo, como máximo `burst` acumulados.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def consume(self, tokens=1):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < tokens:
+            return False
+        self.tokens -= tokens
+        return True
+
+    def retry_after(self, tokens=1):
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+
 class BoardConsumer(AsyncWebsocketConsumer):
     """
     Consumer para manejar las conexiones WebSocket de un tablero.
     Permite a los usuarios unirse a un grupo basado en el board_id
     y recibir notificaciones en tiempo real.
+
+    Cada conexión limita sus mensajes entrantes con un token bucket y solo
+    acepta los tipos de BOARD_CONSUMER['ALLOWED_CLIENT_TYPES']. Los mensajes
+    salientes pasan por una cola acotada (ver push()) para que un cliente lento
+    no acumule memoria sin límite en el worker. Como el buffer de escritura de
+    daphne no tiene límite, `await self.send()` nunca se bloquea: la lentitud
+    se mide con los acks del cliente (ver _drain_outbox()).
     """
-    
+
+    async def dispatch(self, message):
+        with profile_message(self, message):
+            await super().dispatch(message)
+
     async def connect(self):
         """
         Se ejecuta cuando un cliente intenta conectarse al WebSocket.
         """
+        # Admisión por worker (ver tasks/admission.py): si no hay plaza se
+        # acepta solo para indicar cuándo reintentar. La plaza solo se ocupa
+        # durante _admit().
+        if not await admission.acquire():
+            self.authorized = False
+            await self.accept()
+            await self.send(text_data=json.dumps({'type': 'retry', 'retry_after': retry_after()}))
+            await self.close(code=CLOSE_OVERLOADED)
+            return
+        try:
+            await self._admit()
+        finally:
+            admission.release()
+
+    async def _admit(self):
         # Obtener el board_id de la URL
         self.board_id = self.scope['url_route']['kwargs']['board_id']
         self.board_group_name = f'board_{self.board_id}'
 
+        # La membresía se resuelve una vez por conexión (ver tasks/permissions.py)
+        self.roles = await aboard_roles(self.scope.get('user'))
+        self.authorized = self.board_id.isdigit() and int(self.board_id) in self.roles
+        if not self.authorized:
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+
+        self.setup_queues()
+        self.writer = asyncio.ensure_future(self._drain_outbox())
+
         # Unirse al grupo del tablero
         await self.channel_layer.group_add(
             self.board_group_name,
@@ -33,6 +159,14 @@ class BoardConsumer(AsyncWebsocketConsumer):
         # Aceptar la conexión WebSocket
         await self.accept()
 
+        # ?snapshot=1 (o =compact): el primer frame es el estado del tablero y su
+        # versión. Se carga después de unirse al grupo, así que ningún evento
+        # posterior a esa versión se pierde.
+        snapshot = parse_qs(self.scope.get('query_string', b'').decode()).get('snapshot', [None])[0]
+        if snapshot:
+            fmt = snapshot if snapshot in FORMATS else 'full'
+            await self.push(await board_snapshot(int(self.board_id), fmt))
+
         # Obtener información del usuario (si está autenticado)
         user = self.scope.get('user')
         if user and user.is_authenticated:
@@ -43,25 +177,25 @@ class BoardConsumer(AsyncWebsocketConsumer):
 
             # Send current online users list to the connecting user
             online_list = list(connected_users[self.board_group_name])
-            await self.send(text_data=json.dumps({
+            await self.push({
                 'type': 'present_users',
                 'users': online_list
-            }))
-
-            # Notificar al grupo que un usuario se ha conectado
-            await self.channel_layer.group_send(
-                self.board_group_name,
-                {
-                    'type': 'user_joined',
-                    'user': user.username,
-                    'message': f'{user.username} se ha unido al tablero'
-                }
-            )
+            })
+
+            # Notificar al grupo que un usuario se ha conectado (agrupado, ver announce_presence)
+            announce_presence(self.channel_layer, int(self.board_id), joined=user.username)
 
     async def disconnect(self, close_code):
         """
         Se ejecuta cuando un cliente se desconecta del WebSocket.
         """
+        if not getattr(self, 'authorized', False):
+            return
+        if hasattr(self, 'writer'):
+            self.writer.cancel()
+        if getattr(self, 'ephemeral_flush', None):
+            self.ephemeral_flush.cancel()
+
         # Obtener información del usuario
         user = self.scope.get('user')
         if user and user.is_authenticated:
@@ -72,14 +206,7 @@ class BoardConsumer(AsyncWebsocketConsumer):
                     del connected_users[self.board_group_name]
 
             # Notificar al grupo que un usuario se ha desconectado
-            await self.channel_layer.group_send(
-                self.board_group_name,
-                {
-                    'type': 'user_left',
-                    'user': user.username,
-                    'message': f'{user.username} ha salido del tablero'
-                }
-            )
+            announce_presence(self.channel_layer, int(self.board_id), left=user.username)
 
         # Salir del grupo del tablero
         await self.channel_layer.group_discard(
@@ -87,34 +214,237 @@ class BoardConsumer(AsyncWebsocketConsumer):
             self.channel_name
         )
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
         Se ejecuta cuando se recibe un mensaje del cliente.
         """
+        try:
+            data, error = self._parse(text_data), None
+        except ValueError as exc:
+            data, error = None, str(exc)
+
+        if data is not None and data.get('type') == 'ephemeral':
+            await self._receive_ephemeral(data)
+            return
+        if data is not None and data.get('type') == 'ack':
+            self._receive_ack(data)
+            return
+
+        if not self.inbound.consume():
+            await self._reject_rate_limited()
+            return
+        self.strikes = 0
+
+        if error:
+            await self.push({
+                'type': 'error',
+                'message': error
+            })
+            return
+        message_type = data.get('type', 'message')
+
+        if message_type not in consumer_setting('ALLOWED_CLIENT_TYPES'):
+            await self.push({
+                'type': 'error',
+                'message': f'Tipo de mensaje no permitido: {message_type}'
+            })
+            return
+
+        if message_type == 'ping':
+            # Se responde localmente, sin pasar por el grupo
+            await self.push({'type': 'pong'})
+            return
+
+        # Obtener el usuario
+        user = self.scope.get('user')
+        username = user.username if user and user.is_authenticated else 'Anónimo'
+
+        # Enviar el mensaje a todos los miembros del grupo
+        await self.channel_layer.group_send(
+            self.board_group_name,
+            {
+                'type': 'board_message',
+                'board_id': int(self.board_id),
+                'message_type': message_type,
+                'data': data,
+                'user': username
+            }
+        )
+
+    def _parse(self, text_data):
+        if text_data is None or len(text_data) > consumer_setting('MAX_MESSAGE_BYTES'):
+            raise ValueError('Mensaje demasiado grande o no es texto')
         try:
             data = json.loads(text_data)
-            message_type = data.get('type', 'message')
-
-            # Obtener el usuario
-            user = self.scope.get('user')
-            username = user.username if user and user.is_authenticated else 'Anónimo'
-
-            # Enviar el mensaje a todos los miembros del grupo
-            await self.channel_layer.group_send(
-                self.board_group_name,
-                {
-                    'type': 'board_message',
-                    'message_type': message_type,
-                    'data': data,
-                    'user': username
-                }
-            )
         except json.JSONDecodeError:
             # Enviar error al cliente si el JSON es inválido
-            await self.send(text_data=json.dumps({
+            raise ValueError('Formato de mensaje inválido')
+        if not isinstance(data, dict):
+            raise ValueError('Formato de mensaje inválido')
+        return data
+
+    def setup_queues(self):
+        """
+        Estado por conexión: límite de entrada y cola de salida.
+        """
+        self.inbound = TokenBucket(consumer_setting('INBOUND_RATE'), consumer_setting('INBOUND_BURST'))
+        self.strikes = 0
+        self.outbox = OrderedDict()
+        self.outbox_ready = asyncio.Event()
+        self.outbox_seq = itertools.count()
+        self.needs_resync = False
+        self.sent = 0
+        self.acked = 0
+        self.ack_ready = asyncio.Event()
+        self.ephemeral = TokenBucket(consumer_setting('EPHEMERAL_RATE'), consumer_setting('EPHEMERAL_BURST'))
+        self.ephemeral_pending = {}
+        self.ephemeral_flush = None
+
+    async def _reject_rate_limited(self):
+        """
+        Descarta el mensaje. Solo se avisa en el primer rechazo de cada racha;
+        si la racha supera INBOUND_MAX_STRIKES se cierra la conexión.
+        """
+        self.strikes += 1
+        if self.strikes == 1:
+            await self.push({
                 'type': 'error',
-                'message': 'Formato de mensaje inválido'
-            }))
+                'message': 'Demasiados mensajes',
+                'retry_after': round(self.inbound.retry_after(), 3)
+            })
+        elif self.strikes > consumer_setting('INBOUND_MAX_STRIKES'):
+            await self.close(code=CLOSE_RATE_LIMITED)
+
+    # Canal efímero (arrastres, cursores)
+
+    async def _receive_ephemeral(self, data):
+        """
+        Mensajes efímeros: {"type": "ephemeral", "kind": "drag", "object_id": 12, "data": {...}}.
+        Nunca tocan la base de datos ni el registro de actividad. Solo se guarda
+        el último valor por (kind, object_id) de esta conexión y se publica como
+        mucho una vez por tick; lo que exceda el límite se descarta en silencio.
+        """
+        if not self.ephemeral.consume():
+            return
+        kind = data.get('kind')
+        object_id = data.get('object_id')
+        if kind not in consumer_setting('EPHEMERAL_KINDS') or not isinstance(object_id, (int, str)):
+            return
+
+        key = (kind, object_id)
+        if key not in self.ephemeral_pending and len(self.ephemeral_pending) >= consumer_setting('EPHEMERAL_MAX_OBJECTS'):
+            return
+        self.ephemeral_pending[key] = data.get('data')
+
+        if self.ephemeral_flush is None or self.ephemeral_flush.done():
+            self.ephemeral_flush = asyncio.ensure_future(self._flush_ephemeral())
+
+    async def _flush_ephemeral(self):
+        await asyncio.sleep(consumer_setting('EPHEMERAL_TICK'))
+        items = [
+            {'kind': kind, 'object_id': object_id, 'data': value}
+            for (kind, object_id), value in self.ephemeral_pending.items()
+        ]
+        self.ephemeral_pending = {}
+
+        user = self.scope.get('user')
+        await self.channel_layer.group_send(
+            self.board_group_name,
+            {
+                'type': 'ephemeral_batch',
+                'board_id': int(self.board_id),
+                'sender': self.channel_name,
+                'user': user.username if user and user.is_authenticated else 'Anónimo',
+                'items': items
+            }
+        )
+
+    # Cola de salida
+
+    async def push(self, payload, key=None):
+        """
+        Encola un mensaje para el cliente.
+
+        Los mensajes con `key` son actualizaciones de estado: si ya hay uno
+        pendiente con la misma clave se sustituye por el nuevo. Cuando la cola
+        está llena se aplica BOARD_CONSUMER['SLOW_CONSUMER_POLICY']:
+          - 'coalesce': fusiona por clave; si aun así se llena, desconecta con resync.
+          - 'drop': fusiona por clave; si se llena, descarta la actualización
+                    pendiente más antigua y al vaciar la cola envía un resync.
+          - 'disconnect': sin fusión; si se llena, desconecta con resync.
+        """
+        policy = consumer_setting('SLOW_CONSUMER_POLICY')
+        if policy == 'disconnect':
+            key = None
+
+        if key is not None and key in self.outbox:
+            del self.outbox[key]
+        elif len(self.outbox) >= consumer_setting('OUTBOUND_QUEUE_SIZE'):
+            if policy != 'drop':
+                await self._disconnect_for_resync()
+                return
+            stale = next((k for k in self.outbox if isinstance(k, tuple)), next(iter(self.outbox)))
+            del self.outbox[stale]
+            self.needs_resync = True
+
+        self.outbox[key if key is not None else next(self.outbox_seq)] = payload
+        self.outbox_ready.set()
+
+    async def _disconnect_for_resync(self):
+        self.outbox.clear()
+        await self.send(text_data=json.dumps({'type': 'resync', 'reason': 'slow_consumer'}))
+        await self.close(code=CLOSE_RESYNC)
+
+    def _receive_ack(self, data):
+        """
+        {"type": "ack", "received": N}: el cliente ha procesado N frames desde
+        que conectó. No pasa por el token bucket; un valor fuera de rango se ignora.
+        """
+        received = data.get('received')
+        if isinstance(received, int) and self.acked < received <= self.sent:
+            self.acked = received
+            self.ack_ready.set()
+
+    async def _wait_for_window(self):
+        """
+        Espera a que haya hueco en la ventana de frames sin confirmar. Mientras
+        tanto push() sigue encolando, así que la política de cliente lento se
+        aplica sobre la cola. Devuelve False si se agotó ACK_TIMEOUT y la
+        conexión se cerró.
+        """
+        window = consumer_setting('ACK_WINDOW')
+        while window is not None and self.sent - self.acked >= window:
+            self.ack_ready.clear()
+            try:
+                await asyncio.wait_for(self.ack_ready.wait(), consumer_setting('ACK_TIMEOUT'))
+            except asyncio.TimeoutError:
+                await self._disconnect_for_resync()
+                return False
+        return True
+
+    async def _send_frame(self, payload):
+        self.sent += 1
+        # Los frames ya renderizados (snapshot) se envían tal cual
+        await self.send(text_data=payload if isinstance(payload, str) else json.dumps(payload))
+
+    async def _drain_outbox(self):
+        while True:
+            await self.outbox_ready.wait()
+            while self.outbox:
+                if not await self._wait_for_window():
+                    return
+                if not self.outbox:
+                    break
+                # Se saca después de esperar: lo que llegue mientras tanto aún
+                # puede fusionarse con el frame pendiente
+                _, payload = self.outbox.popitem(last=False)
+                await self._send_frame(payload)
+            if self.needs_resync:
+                if not await self._wait_for_window():
+                    return
+                self.needs_resync = False
+                await self._send_frame({'type': 'resync', 'reason': 'dropped_updates'})
+            self.outbox_ready.clear()
 
     # Handlers para diferentes tipos de mensajes
 
@@ -122,82 +452,316 @@ class BoardConsumer(AsyncWebsocketConsumer):
         """
         Handler para mensajes generales del tablero.
         """
-        await self.send(text_data=json.dumps({
+        await self.push({
             'type': event['message_type'],
             'data': event['data'],
             'user': event['user']
-        }))
+        })
 
-    async def user_joined(self, event):
+    async def ephemeral_batch(self, event):
         """
-        Handler cuando un usuario se une al tablero.
+        Handler para el lote efímero de otro usuario. Si la cola de salida ya va
+        cargada el lote se descarta; si hay uno pendiente del mismo usuario se
+        fusionan, quedándose con el último valor por objeto.
         """
-        await self.send(text_data=json.dumps({
-            'type': 'user_joined',
+        if event['sender'] == self.channel_name:
+            return
+        if len(self.outbox) >= consumer_setting('OUTBOUND_QUEUE_SIZE') // 2:
+            return
+
+        key = ('ephemeral', event['user'])
+        items = {}
+        if key in self.outbox:
+            items = {(item['kind'], item['object_id']): item for item in self.outbox[key]['items']}
+        items.update({(item['kind'], item['object_id']): item for item in event['items']})
+        await self.push({
+            'type': 'ephemeral',
             'user': event['user'],
-            'message': event['message']
-        }))
+            'items': list(items.values())
+        }, key=key)
 
-    async def user_left(self, event):
+    async def board_updated(self, event):
         """
-        Handler cuando un usuario sale del tablero.
+        Handler cuando se actualiza el tablero.
         """
-        await self.send(text_data=json.dumps({
-            'type': 'user_left',
-            'user': event['user'],
-            'message': event['message']
-        }))
+        await self.push({
+            'type': 'board_updated',
+            'version': event.get('version'),
+            'board': event['board']
+        }, key=('board_updated',))
+
+    async def presence_changed(self, event):
+        """
+        Handler con las entradas y salidas de usuarios de la última ventana.
+        """
+        await self.push({
+            'type': 'presence_changed',
+            'joined': event['joined'],
+            'left': event['left']
+        })
 
     async def task_created(self, event):
         """
         Handler cuando se crea una nueva tarea.
         """
-        await self.send(text_data=json.dumps({
+        await self.push({
             'type': 'task_created',
+            'version': event.get('version'),
             'task': event['task']
-        }))
+        })
 
     async def task_updated(self, event):
         """
         Handler cuando se actualiza una tarea.
         """
-        await self.send(text_data=json.dumps({
+        await self.push({
             'type': 'task_updated',
+            'version': event.get('version'),
             'task': event['task']
-        }))
+        }, key=('task_updated', event['task']['id']))
 
     async def task_deleted(self, event):
         """
         Handler cuando se elimina una tarea.
         """
-        await self.send(text_data=json.dumps({
+        await self.push({
             'type': 'task_deleted',
+            'version': event.get('version'),
             'task_id': event['task_id']
-        }))
+        })
 
     async def list_created(self, event):
         """
         Handler cuando se crea una nueva lista.
         """
-        await self.send(text_data=json.dumps({
+        await self.push({
             'type': 'list_created',
+            'version': event.get('version'),
             'list': event['list']
-        }))
+        })
 
     async def list_updated(self, event):
         """
         Handler cuando se actualiza una lista.
         """
-        await self.send(text_data=json.dumps({
+        await self.push({
             'type': 'list_updated',
+            'version': event.get('version'),
             'list': event['list']
-        }))
+        }, key=('list_updated', event['list']['id']))
+
+    async def list_deleted(self, event):
+        """
+        Handler cuando se elimina una lista, con las tareas borradas en cascada.
+        """
+        await self.push({
+            'type': 'list_deleted',
+            'version': event.get('version'),
+            'list_id': event['list_id'],
+            'task_ids': event['task_ids']
+        })
+
+    async def board_imported(self, event):
+        """
+        Handler cuando se importan datos en bloque: el cliente debe recargar el tablero.
+        """
+        await self.push({
+            'type': 'board_imported',
+            'version': event.get('version'),
+            'summary': event['summary']
+        })
+
+    async def tasks_archived(self, event):
+        """
+        Handler cuando se archiva un lote de tareas: desaparecen del tablero.
+        """
+        await self.push({
+            'type': 'tasks_archived',
+            'version': event.get('version'),
+            'task_ids': event['task_ids']
+        })
+
+    async def tasks_restored(self, event):
+        """
+        Handler cuando se restaura un lote de tareas archivadas.
+        """
+        await self.push({
+            'type': 'tasks_restored',
+            'version': event.get('version'),
+            'task_ids': event['task_ids']
+        })
 
     async def member_added(self, event):
         """
         Handler cuando se añade un miembro al tablero.
         """
-        await self.send(text_data=json.dumps({
+        await self.push({
             'type': 'member_added',
+            'version': event.get('version'),
             'member': event['member']
-        }))
\ No newline at end of file
+        })
+
+
+class MultiBoardConsumer(BoardConsumer):
+    """
+    Un único WebSocket suscrito a varios tableros (ws/boards/).
+
+    El cliente envía {"type": "subscribe", "board_ids": [1, 2], "snapshot": "compact"},
+    {"type": "unsubscribe", "board_ids": [2]} y los acks de BoardConsumer; todos los eventos salen con
+    board_id. La conexión comparte una sola cola de salida, un solo token bucket
+    y una sola resolución de roles; cada suscripción solo añade su id al set
+    y la pertenencia al grupo board_{id}.
+
+    Las suscripciones son de observación: no anuncian presencia ni reciben el
+    canal efímero, y no admiten mensajes de cliente hacia el tablero.
+    """
+    CLIENT_TYPES = ('subscribe', 'unsubscribe', 'ping')
+
+    async def _admit(self):
+        # Misma admisión que BoardConsumer (ver BoardConsumer.connect)
+        user = self.scope.get('user')
+        self.authorized = bool(user and user.is_authenticated)
+        if not self.authorized:
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+
+        self.boards = set()
+        self.event_board = None
+        self.setup_queues()
+        self.writer = asyncio.ensure_future(self._drain_outbox())
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if not getattr(self, 'authorized', False):
+            return
+        self.writer.cancel()
+        for board_id in self.boards:
+            await self.channel_layer.group_discard(f'board_{board_id}', self.channel_name)
+        self.boards.clear()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data, error = self._parse(text_data), None
+        except ValueError as exc:
+            data, error = None, str(exc)
+        if data is not None and data.get('type') == 'ack':
+            self._receive_ack(data)
+            return
+
+        if not self.inbound.consume():
+            await self._reject_rate_limited()
+            return
+        self.strikes = 0
+
+        if error:
+            await self.push({'type': 'error', 'message': error})
+            return
+        message_type = data.get('type')
+        if message_type not in self.CLIENT_TYPES:
+            await self.push({
+                'type': 'error',
+                'message': f'Tipo de mensaje no permitido: {message_type}'
+            })
+            return
+
+        if message_type == 'ping':
+            await self.push({'type': 'pong'})
+            return
+
+        board_ids = data.get('board_ids')
+        if not isinstance(board_ids, list) or not all(isinstance(b, int) for b in board_ids):
+            await self.push({'type': 'error', 'message': 'board_ids debe ser una lista de enteros'})
+            return
+
+        if message_type == 'subscribe':
+            await self._subscribe(board_ids, data.get('snapshot'))
+        else:
+            await self._unsubscribe(board_ids)
+
+    async def _subscribe(self, board_ids, snapshot=None):
+        """
+        Los roles se vuelven a leer (de la caché) en cada suscripción, así un
+        tablero al que el usuario se unió después de conectar ya es visible.
+        """
+        roles = await aboard_roles(self.scope.get('user'))
+        added, denied = [], []
+        for board_id in dict.fromkeys(board_ids):
+            if board_id in self.boards:
+                added.append(board_id)
+            elif board_id not in roles or len(self.boards) >= consumer_setting('MAX_SUBSCRIPTIONS'):
+                denied.append(board_id)
+            else:
+                await self.channel_layer.group_add(f'board_{board_id}', self.channel_name)
+                self.boards.add(board_id)
+                added.append(board_id)
+
+        await self.push({'type': 'subscribed', 'board_ids': added, 'denied': denied})
+        if snapshot:
+            fmt = snapshot if snapshot in FORMATS else 'full'
+            for board_id in added:
+                # Frame ya renderizado con board_id (ver tasks/snapshots.py)
+                await self.push(await board_snapshot(board_id, fmt, tagged=True))
+
+    async def _unsubscribe(self, board_ids):
+        removed = [board_id for board_id in dict.fromkeys(board_ids) if board_id in self.boards]
+        for board_id in removed:
+            await self.channel_layer.group_discard(f'board_{board_id}', self.channel_name)
+            self.boards.discard(board_id)
+        await self.push({'type': 'unsubscribed', 'board_ids': removed})
+
+    async def dispatch(self, message):
+        """
+        Los handlers heredados no saben de qué tablero viene el evento:
+        se guarda aquí para que push() lo añada al mensaje y a su clave.
+        Todos los eventos de grupo llevan board_id; los que no lo traen, o
+        son de un tablero recién desuscrito (ya en vuelo), se descartan.
+        """
+        board_id = message.get('board_id')
+        if not message['type'].startswith('websocket.') and board_id not in self.boards:
+            return
+        self.event_board = board_id
+        try:
+            await super().dispatch(message)
+        finally:
+            self.event_board = None
+
+    async def push(self, payload, key=None):
+        board_id = self.event_board
+        if board_id is not None and isinstance(payload, dict):
+            payload = {'board_id': board_id, **payload}
+            if key is not None:
+                key = (board_id, *key)
+        await super().push(payload, key=key)
+
+    async def ephemeral_batch(self, event):
+        return
+
+
+class NotificationConsumer(AsyncWebsocketConsumer):
+    """
+    Bandeja en tiempo real del usuario autenticado: al conectar envía el
+    contador de no leídas y después cada notificación nueva del grupo
+    user_<id> (ver tasks/notifications.py). No acepta mensajes del cliente.
+    """
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if not user or not user.is_authenticated:
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        unread = await database_sync_to_async(unread_count)(user.id)
+        await self.send(text_data=json.dumps({'type': 'unread', 'unread': unread}))
+
+    async def disconnect(self, close_code):
+        if hasattr(self, 'group_name'):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def notification(self, event):
+        await self.send(text_data=json.dumps({
+            'type': 'notification',
+            'notification': event['notification'],
+            'unread': event['unread']
+        }))
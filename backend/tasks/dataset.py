@@ -0,0 +1,157 @@
+"""
+Datos sintéticos para pruebas de carga y benchmarks (ver `manage.py
+generate_dataset` y `manage.py benchmark`).
+
+Todo se inserta con bulk_create, tablero a tablero en bloques de
+transacción, así que ninguna señal de actividad ni de WebSocket se dispara;
+las estadísticas se reconstruyen al final de cada bloque. Los tamaños
+siguen distribuciones de cola larga: la mayoría de tableros son pequeños y
+unos pocos tienen listas con cientos de tareas, como en producción.
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ActivityLog, Board, BoardMember, List, Task
+from .signals import mute_signals
+from .stats import rebuild_board_stats
+
+User = get_user_model()
+
+PASSWORD = 'bench-password'
+LIST_TITLES = ['Backlog', 'To Do', 'In Progress', 'Review', 'Blocked', 'Done', 'Ideas', 'QA']
+WORDS = ['api', 'login', 'export', 'cache', 'deploy', 'report', 'search', 'billing', 'mobile', 'docs', 'onboarding', 'metrics']
+PRIORITIES = ['low', 'medium', 'medium', 'medium', 'high']
+
+
+def _skewed(rng, low, high, alpha):
+    """
+    Entero de Pareto entre low y high: muchos valores cerca de low, pocos cerca de high.
+    """
+    return min(high, low + int(rng.paretovariate(alpha)) - 1)
+
+
+def clear_dataset(prefix):
+    """
+    Borra los usuarios del dataset y, en cascada, sus tableros.
+    """
+    with mute_signals():
+        Board.objects.filter(owner__username__startswith=f'{prefix}-').delete()
+        return User.objects.filter(username__startswith=f'{prefix}-').delete()[1].get(User._meta.label, 0)
+
+
+def generate_dataset(boards=1000, users=200, prefix='bench', seed=0, max_lists=12, max_tasks=400,
+                     max_members=15, activity_per_board=50, chunk_size=100, progress=None):
+    """
+    Crea `users` usuarios y `boards` tableros. Devuelve los totales creados.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    totals = {'users': 0, 'boards': 0, 'lists': 0, 'tasks': 0, 'assignments': 0, 'activity': 0}
+
+    password = make_password(PASSWORD)
+    usernames = {
+        user.id: user.username for user in User.objects.bulk_create(
+            [User(username=f'{prefix}-{seed}-{i}', password=password) for i in range(users)], batch_size=1000
+        )
+    }
+    user_ids = list(usernames)
+    totals['users'] = len(user_ids)
+    content_types = ContentType.objects.get_for_models(Board, List, Task)
+
+    for start in range(0, boards, chunk_size):
+        with transaction.atomic(), mute_signals():
+            chunk = Board.objects.bulk_create([
+                Board(name=f'{rng.choice(WORDS).title()} board {start + i}', owner_id=rng.choice(user_ids))
+                for i in range(min(chunk_size, boards - start))
+            ])
+
+            members, member_ids = [], {}
+            for board in chunk:
+                others = rng.sample(user_ids, min(len(user_ids), _skewed(rng, 1, max_members, 1.5)))
+                member_ids[board.id] = list(dict.fromkeys([board.owner_id, *others]))
+                members += [
+                    BoardMember(board=board, user_id=user_id, username=usernames[user_id],
+                                role='admin' if user_id == board.owner_id else 'member')
+                    for user_id in member_ids[board.id]
+                ]
+            BoardMember.objects.bulk_create(members, batch_size=2000)
+
+            lists = List.objects.bulk_create([
+                List(board=board, title=rng.choice(LIST_TITLES), position=Decimal(position))
+                for board in chunk
+                for position in range(_skewed(rng, 2, max_lists, 1.8))
+            ], batch_size=2000)
+
+            tasks = Task.objects.bulk_create([
+                Task(
+                    list=task_list,
+                    board_id=task_list.board_id,
+                    title=f'{rng.choice(WORDS)} {rng.choice(WORDS)} #{position}',
+                    description=rng.choice(['', 'Ver el ticket enlazado.', 'Pendiente de revisión con el equipo.']),
+                    position=Decimal(position),
+                    priority=rng.choice(PRIORITIES),
+                    due_date=now + timedelta(days=rng.randint(-30, 60)) if rng.random() < 0.3 else None,
+                )
+                for task_list in lists
+                for position in range(_skewed(rng, 0, max_tasks, 1.1))
+            ], batch_size=2000)
+
+            assignments = []
+            for task in tasks:
+                candidates = member_ids[task.board_id]
+                assignments += [
+                    Task.assigned_to.through(task_id=task.id, user_id=user_id)
+                    for user_id in rng.sample(candidates, min(len(candidates), rng.choice([0, 1, 1, 1, 2, 3])))
+                ]
+            Task.assigned_to.through.objects.bulk_create(assignments, batch_size=5000)
+
+            activity = _activity(rng, now, chunk, lists, tasks, member_ids, content_types, activity_per_board)
+
+            for board in chunk:
+                rebuild_board_stats(board.id)
+
+        for key, created in (('boards', chunk), ('lists', lists), ('tasks', tasks),
+                             ('assignments', assignments), ('activity', activity)):
+            totals[key] += len(created)
+        if progress:
+            progress(totals)
+    return totals
+
+
+def _activity(rng, now, boards, lists, tasks, member_ids, content_types, per_board):
+    """
+    Historial del último año repartido entre el tablero, sus listas y sus tareas.
+    auto_now_add pisa el timestamp en bulk_create, así que se corrige después.
+    """
+    targets = {board.id: [(content_types[Board], board.id, board.name)] for board in boards}
+    for task_list in lists:
+        targets[task_list.board_id].append((content_types[List], task_list.id, task_list.title))
+    for task in tasks:
+        targets[task.board_id].append((content_types[Task], task.id, task.title))
+
+    logs, timestamps = [], []
+    for board in boards:
+        # Pareto(2) tiene media 2: de media per_board entradas, con cola hasta 10x
+        for _ in range(min(per_board * 10, int(per_board * rng.paretovariate(2) / 2))):
+            content_type, object_id, name = rng.choice(targets[board.id])
+            verb = rng.choice(['created', 'updated', 'updated', 'moved'])
+            logs.append(ActivityLog(
+                user_id=rng.choice(member_ids[board.id]),
+                action=f"{content_type.model.title()} '{name}' {verb}",
+                content_type=content_type,
+                object_id=object_id,
+            ))
+            timestamps.append(now - timedelta(minutes=rng.randint(0, 365 * 24 * 60)))
+
+    logs = ActivityLog.objects.bulk_create(logs, batch_size=2000)
+    for log, timestamp in zip(logs, timestamps):
+        log.timestamp = timestamp
+    ActivityLog.objects.bulk_update(logs, ['timestamp'], batch_size=1000)
+    return logs
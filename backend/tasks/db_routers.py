@@ -0,0 +1,335 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+from django.db.models import prefetch_related_objects
+
+
+# Alias desde el que se leen las consultas del request actual.
+# None significa "leer del primario" (comportamiento por defecto).
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def pick_replica():
+    """
+    Devuelve una réplica al azar de DATABASE_REPLICAS, o None si no hay ninguna.
+    """
+    replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+    return random.choice(replicas) if replicas else None
+
+
+def route_reads_to(alias):
+    """
+    Envía las lecturas del contexto actual al alias indicado.
+    Devuelve el token para restaurar el estado con reset_read_routing().
+    """
+    return _read_alias.set(alias)
+
+
+def reset_read_routing(token):
+    _read_alias.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """
+    Fuerza que todas las lecturas dentro del bloque vayan al primario.
+    """
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Router primario/réplicas.
+    Las escrituras siempre van al primario; las lecturas van a la réplica
+    elegida por ReplicaRoutingMiddleware solo en requests seguros (GET/HEAD/OPTIONS)
+    de clientes que no hayan escrito recientemente. Fuera de un request
+    (consumers, comandos, señales) todo se lee del primario.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplicas contienen los mismos datos
+        return True
+
+
+# Sharding por tablero
+#
+# Con DATABASE_SHARDS = ['shard_1', 'shard_2', ...] las filas que pertenecen a
+# un tablero (listas, tareas y sus asignaciones, miembros, archivadas,
+# estadísticas, historial y su actividad) viven en
+# DATABASE_SHARDS[board_id % N]. Los usuarios y el directorio de tableros
+# siguen en 'default' y se replican como tablas de referencia en cada shard
+# (ver signals.replicate_reference_row), así las FKs y los joins con User
+# funcionan dentro de un shard.
+#
+# Cada shard reparte ids en su propio rango (ver prepare_shard), de modo que el
+# id de una tarea o una lista basta para saber en qué shard está:
+# shard_for_id(pk) = DATABASE_SHARDS[pk // SHARD_ID_SPAN].
+#
+# Una consulta sobre un modelo por tablero se resuelve, por orden: por la
+# instancia relacionada (board.lists, task.assigned_to, save()...), por el
+# shard del contexto (use_shard(), fijado por las vistas para todo el request)
+# o, si no hay ninguno, falla con ShardNotSelected en lugar de leer de
+# 'default' y devolver un resultado vacío.
+
+SHARDED_MODELS = {
+    'tasks.list', 'tasks.task', 'tasks.task_assigned_to', 'tasks.boardmember',
+    'tasks.archivedtask', 'tasks.archivedtask_assigned_to', 'tasks.boardstat', 'tasks.activitylog',
+    'tasks.boardevent', 'tasks.boardcheckpoint',
+}
+
+_shard = ContextVar('shard', default=None)
+
+
+class ShardNotSelected(Exception):
+    pass
+
+
+def sharding_enabled():
+    return bool(getattr(settings, 'DATABASE_SHARDS', []))
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def shard_for_board(board_id):
+    shards = settings.DATABASE_SHARDS
+    return shards[int(board_id) % len(shards)]
+
+
+def shard_for_id(pk):
+    """
+    Shard de una fila por su id, o None si el id no cae en ningún rango.
+    """
+    index = int(pk) // settings.SHARD_ID_SPAN
+    shards = settings.DATABASE_SHARDS
+    return shards[index] if 0 <= index < len(shards) else None
+
+
+def shard_id_start(alias):
+    """
+    Primer id del rango de un shard; 0 para 'default' y alias que no son shards.
+    """
+    shards = settings.DATABASE_SHARDS
+    return shards.index(alias) * settings.SHARD_ID_SPAN if alias in shards else 0
+
+
+def board_db(board_id):
+    """
+    Alias para .using() en código que trabaja sobre un tablero concreto.
+    Sin sharding devuelve None y decide el router de siempre.
+    """
+    return shard_for_board(board_id) if sharding_enabled() else None
+
+
+def each_shard():
+    """
+    Alias sobre los que repartir una consulta que cruza tableros ([None] sin sharding).
+    """
+    return list(settings.DATABASE_SHARDS) or [None]
+
+
+def current_shard():
+    return _shard.get()
+
+
+def route_shard_to(alias):
+    return _shard.set(alias)
+
+
+def reset_shard_routing(token):
+    _shard.reset(token)
+
+
+@contextmanager
+def use_shard(alias):
+    token = _shard.set(alias)
+    try:
+        yield
+    finally:
+        _shard.reset(token)
+
+
+def use_board_shard(board_id):
+    return use_shard(board_db(board_id))
+
+
+def _shard_of(instance):
+    """
+    Shard de una instancia de un modelo por tablero, o None si no se puede saber.
+    """
+    model = instance._meta.label_lower
+    if model == 'tasks.board':
+        return shard_for_board(instance.pk) if instance.pk is not None else None
+    if model not in SHARDED_MODELS:
+        return None
+    if getattr(instance, 'board_id', None) is not None:
+        return shard_for_board(instance.board_id)
+    if getattr(instance, 'list_id', None) is not None:
+        return shard_for_id(instance.list_id)
+    if model == 'tasks.activitylog' and instance.content_type_id is not None:
+        target = ContentType.objects.get_for_id(instance.content_type_id).model
+        if target == 'board':
+            return shard_for_board(instance.object_id)
+        if target in ('list', 'task'):
+            return shard_for_id(instance.object_id)
+        return DEFAULT_DB_ALIAS
+    if instance.pk is not None:
+        return shard_for_id(instance.pk)
+    return None
+
+
+class ShardedQuerySet(models.QuerySet):
+    """
+    create() construye la instancia antes de elegir la base de datos, así que
+    Model.objects.create(board=...) va a su shard sin use_shard() y aunque el
+    request tenga fijado el de otro tablero.
+    """
+
+    def create(self, **kwargs):
+        if self._db is None and sharding_enabled():
+            alias = _shard_of(self.model(**kwargs))
+            if alias is not None:
+                return self.using(alias).create(**kwargs)
+        return super().create(**kwargs)
+
+
+ShardedManager = models.Manager.from_queryset(ShardedQuerySet)
+
+
+class ShardRouter:
+    """
+    Router de shards. Sin DATABASE_SHARDS no decide nada y todo pasa a
+    PrimaryReplicaRouter.
+    """
+
+    def _route(self, model, hints):
+        if not sharding_enabled():
+            return None
+        if model._meta.apps is not apps:
+            # Modelo histórico de una migración: va a la base que se migra
+            # (RunPython usa .using(schema_editor.connection.alias))
+            return _shard.get()
+        instance = hints.get('instance')
+        if not is_sharded(model):
+            # Tablas de referencia: si la consulta cuelga de una fila de un
+            # shard (p.ej. task.assigned_to) se lee la copia de ese shard
+            if instance is not None and is_sharded(type(instance)):
+                return _shard_of(instance)
+            return None
+        alias = _shard_of(instance) if instance is not None else None
+        alias = alias or _shard.get()
+        if alias is None and instance is None:
+            raise ShardNotSelected(
+                f"Consulta de {model._meta.label} sin shard: usa use_shard()/use_board_shard() o .using(board_db(...))"
+            )
+        return alias
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las tablas globales están replicadas en cada shard
+        return True if sharding_enabled() else None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Todas las tablas existen en 'default' y en cada shard: las por tablero
+        # se usan solo en los shards y las de referencia se replican en ellos
+        if not sharding_enabled():
+            return None
+        return True if db == DEFAULT_DB_ALIAS or db in settings.DATABASE_SHARDS else None
+
+
+def prefetch_by_shard(instances, *lookups):
+    """
+    prefetch_related_objects() por grupos de tableros del mismo shard (Django
+    solo mira la primera instancia para elegir la base de datos).
+    """
+    groups = {}
+    for instance in instances:
+        groups.setdefault(board_db(instance.pk), []).append(instance)
+    for group in groups.values():
+        prefetch_related_objects(group, *lookups)
+
+
+def prepare_shard(alias):
+    """
+    Deja un shard listo tras migrate: los ids de las tablas por tablero empiezan
+    en index * SHARD_ID_SPAN y contenttypes, usuarios y tableros son copia de
+    'default'. Solo para shards vacíos.
+    """
+    from django.contrib.auth import get_user_model
+
+    from .models import ActivityLog, Board
+
+    start = shard_id_start(alias)
+    connection = connections[alias]
+    with transaction.atomic(using=alias):
+        for model in apps.get_models(include_auto_created=True):
+            if is_sharded(model) and isinstance(model._meta.pk, models.AutoField):
+                _set_sequence(connection, model._meta.db_table, start)
+
+        # post_migrate crea los contenttypes de cada base con sus propios ids
+        def ids(db):
+            return set(ContentType.objects.using(db).values_list('id', 'app_label', 'model'))
+        if ids(alias) != ids(DEFAULT_DB_ALIAS):
+            if ActivityLog.objects.using(alias).exists():
+                raise ValueError(f"{alias} ya tiene actividad con otros contenttypes")
+            ContentType.objects.using(alias).all().delete()
+            copy_rows(ContentType, ContentType.objects.using(DEFAULT_DB_ALIAS).all(), alias)
+        for model in (get_user_model(), Board):
+            copy_rows(model, model._base_manager.using(DEFAULT_DB_ALIAS).all(), alias)
+
+
+def _set_sequence(connection, table, start):
+    if start == 0:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s", [start, table, start])
+            cursor.execute(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s "
+                "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)",
+                [table, start, table],
+            )
+        elif connection.vendor == 'postgresql':
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), GREATEST(%s, (SELECT COALESCE(MAX(id), 0) FROM "
+                + connection.ops.quote_name(table) + ")))",
+                [table, start],
+            )
+        else:
+            raise NotImplementedError(f"Rangos de ids por shard no soportados en {connection.vendor}")
+
+
+def copy_rows(model, rows, alias):
+    """
+    Upsert de filas de una tabla global en un shard, sin señales.
+    """
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    copies = [model(**{field.attname: getattr(row, field.attname) for field in model._meta.concrete_fields}) for row in rows]
+    model._base_manager.using(alias).bulk_create(
+        copies,
+        batch_size=1000,
+        update_conflicts=bool(fields),
+        unique_fields=[model._meta.pk.name] if fields else None,
+        update_fields=[field.name for field in fields] or None,
+    )
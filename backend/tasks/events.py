@@ -0,0 +1,55 @@
+"""
+Eventos de estado de un tablero hacia el channel layer.
+
+Cada evento incrementa Board.version, se guarda en el historial del tablero
+(tasks/history.py) y viaja con board_id y version, así
+un cliente que arrancó con el snapshot de la versión N (ver
+BoardConsumer.connect) descarta los eventos con version <= N. Presencia y
+canal efímero no cambian el estado del tablero y no pasan por aquí.
+"""
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.db import connections, router
+from django.db.models import F
+
+from .db_routers import use_primary
+from .history import record
+from .models import Board
+
+
+def next_version(board_id):
+    """
+    Incrementa Board.version y devuelve (version, checkpoint_version), o
+    (None, None) si el tablero no existe; con RETURNING es una sola consulta.
+    """
+    connection = connections[router.db_for_write(Board)]
+    if connection.vendor in ('postgresql', 'sqlite'):
+        table = connection.ops.quote_name(Board._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} SET version = version + 1 WHERE id = %s RETURNING version, checkpoint_version",
+                [board_id],
+            )
+            row = cursor.fetchone()
+        return row or (None, None)
+
+    Board.objects.filter(pk=board_id).update(version=F('version') + 1)
+    with use_primary():
+        return Board.objects.filter(pk=board_id).values_list('version', 'checkpoint_version').first() or (None, None)
+
+
+def _versioned(board_id, event):
+    version, checkpoint_version = next_version(board_id)
+    # Historial para ?at= (ver tasks/history.py)
+    record(board_id, version, event, checkpoint_version)
+    return {**event, 'board_id': board_id, 'version': version}
+
+
+def broadcast(board_id, event):
+    async_to_sync(get_channel_layer().group_send)(f'board_{board_id}', _versioned(board_id, event))
+
+
+async def abroadcast(board_id, event):
+    event = await database_sync_to_async(_versioned)(board_id, event)
+    await get_channel_layer().group_send(f'board_{board_id}', event)
@@ -0,0 +1,155 @@
+"""
+Estado de un tablero en un instante pasado (/api/boards/{id}/?at=<timestamp>).
+
+Cada evento que sale por events.broadcast() se guarda como BoardEvent con su
+versión. Cuando han pasado BOARD_HISTORY['CHECKPOINT_EVERY'] versiones desde
+el último checkpoint (Board.checkpoint_version) se guarda además un
+BoardCheckpoint con el estado completo del tablero comprimido. Para un
+instante T se carga el último checkpoint anterior a T y se reaplican solo
+los eventos posteriores hasta T, así el coste está acotado por
+CHECKPOINT_EVERY sea cual sea la edad del tablero.
+
+Los eventos masivos cuyo payload no basta para reproducirlos (importación,
+restauración de archivadas) van seguidos de un checkpoint, igual que la
+creación de un tablero y su clonado. El historial cubre tablero, listas y
+tareas (sin asignados ni miembros) y empieza en el primer checkpoint.
+"""
+import json
+import zlib
+from decimal import Decimal
+
+from django.conf import settings
+
+from .db_routers import board_db, use_primary
+from .models import Board, BoardCheckpoint, BoardEvent, List, Task
+
+
+class HistoryUnavailable(Exception):
+    pass
+
+
+def _apply_task(state, payload):
+    state['tasks'][str(payload['task']['id'])] = payload['task']
+
+
+def _drop_tasks(state, task_ids):
+    for task_id in task_ids:
+        state['tasks'].pop(str(task_id), None)
+
+
+def _apply_list(state, payload):
+    state['lists'][str(payload['list']['id'])] = payload['list']
+
+
+def _drop_list(state, payload):
+    state['lists'].pop(str(payload['list_id']), None)
+    _drop_tasks(state, payload['task_ids'])
+
+
+APPLY = {
+    'board_updated': lambda state, payload: state['board'].update(payload['board']),
+    'task_created': _apply_task,
+    'task_updated': _apply_task,
+    'task_deleted': lambda state, payload: _drop_tasks(state, [payload['task_id']]),
+    'list_created': _apply_list,
+    'list_updated': _apply_list,
+    'list_deleted': _drop_list,
+    'tasks_archived': lambda state, payload: _drop_tasks(state, payload['task_ids']),
+}
+
+# Eventos tras los que se guarda un checkpoint en lugar de reaplicarlos
+CHECKPOINT_AFTER = {'board_imported', 'tasks_restored'}
+
+
+def history_setting(name):
+    return settings.BOARD_HISTORY[name]
+
+
+def capture_state(board_id):
+    """
+    Estado actual del tablero con la misma forma que los payloads de los eventos.
+    """
+    from .signals import task_payload  # signals importa events, que importa este módulo
+
+    db = board_db(board_id)
+    with use_primary():
+        board = Board.objects.values('id', 'name', 'description').get(pk=board_id)
+        lists = List.objects.using(db).filter(board_id=board_id).values('id', 'title', 'board_id', 'position')
+        tasks = Task.objects.using(db).filter(board_id=board_id).only(
+            'id', 'title', 'description', 'list_id', 'position', 'due_date', 'priority'
+        )
+        return {
+            'board': board,
+            'lists': {str(row['id']): {**row, 'position': str(row['position'])} for row in lists},
+            'tasks': {str(task.id): task_payload(task) for task in tasks.iterator()},
+        }
+
+
+def checkpoint(board_id, version):
+    data = zlib.compress(json.dumps(capture_state(board_id), separators=(',', ':')).encode())
+    saved = BoardCheckpoint.objects.create(board_id=board_id, version=version, data=data)
+    Board.objects.filter(pk=board_id, checkpoint_version__lt=version).update(checkpoint_version=version)
+    return saved
+
+
+def record(board_id, version, event, checkpoint_version=0):
+    """
+    Guarda un evento de broadcast() y, si toca, un checkpoint del estado.
+
+    La distancia se mide desde Board.checkpoint_version y no con version % N:
+    los eventos que no se guardan (presencia, miembros...) también consumen
+    versiones y con el módulo podían saltarse checkpoints.
+    """
+    kind = event['type']
+    if version is None or (kind not in APPLY and kind not in CHECKPOINT_AFTER):
+        return
+    BoardEvent.objects.create(
+        board_id=board_id, version=version, type=kind,
+        payload={key: value for key, value in event.items() if key != 'type'},
+    )
+    if kind in CHECKPOINT_AFTER or version - checkpoint_version >= history_setting('CHECKPOINT_EVERY'):
+        checkpoint(board_id, version)
+
+
+def board_at(board_id, at):
+    """
+    Estado del tablero en el instante `at`, con listas y tareas ordenadas por posición.
+    """
+    db = board_db(board_id)
+    latest = (
+        BoardCheckpoint.objects.using(db).filter(board_id=board_id, created_at__lte=at)
+        .order_by('-created_at', '-version').first()
+    )
+    if latest is None:
+        raise HistoryUnavailable(f"No history for board {board_id} before {at.isoformat()}")
+
+    state = json.loads(zlib.decompress(latest.data))
+    events = (
+        BoardEvent.objects.using(db).filter(board_id=board_id, version__gt=latest.version, timestamp__lte=at)
+        .order_by('version').values_list('version', 'type', 'payload')
+    )
+    version = latest.version
+    for version, kind, payload in events.iterator():
+        if kind in APPLY:
+            APPLY[kind](state, payload)
+    return _render(state, at, version)
+
+
+def _by_position(item):
+    return Decimal(item['position']), item['id']
+
+
+def _render(state, at, version):
+    tasks = {}
+    for task in state['tasks'].values():
+        tasks.setdefault(task['list_id'], []).append(task)
+    lists = sorted(state['lists'].values(), key=_by_position)
+    return {
+        **state['board'],
+        'at': at.isoformat(),
+        'version': version,
+        'lists': [
+            {**task_list, 'tasks': sorted(tasks.get(task_list['id'], []), key=_by_position)}
+            for task_list in lists
+        ],
+    }
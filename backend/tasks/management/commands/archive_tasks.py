@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.archive import BATCH_SIZE, archive_tasks, stale_tasks
+from tasks.db_routers import each_shard, use_shard
+from tasks.models import Task
+
+
+class Command(BaseCommand):
+    help = "Archiva las tareas sin modificar desde hace más de N días (por lotes)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, required=True)
+        parser.add_argument('--board', type=int, help="Limitar a un tablero")
+        parser.add_argument('--list', type=int, help="Limitar a una lista")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help="Solo contar, sin mover nada")
+
+    def handle(self, *args, **options):
+        if options['older_than_days'] < 0:
+            raise CommandError("--older-than-days debe ser >= 0")
+
+        counted = archived = 0
+        # Con sharding se recorre cada shard; sin él, each_shard() es [None]
+        for alias in each_shard():
+            with use_shard(alias):
+                queryset = Task.objects.all()
+                if options['board']:
+                    queryset = queryset.filter(board_id=options['board'])
+                if options['list']:
+                    queryset = queryset.filter(list_id=options['list'])
+                queryset = stale_tasks(options['older_than_days'], queryset)
+
+                if options['dry_run']:
+                    counted += queryset.count()
+                else:
+                    archived += archive_tasks(queryset, batch_size=options['batch_size'])
+
+        if options['dry_run']:
+            self.stdout.write(f"{counted} tareas se archivarían")
+            return
+        self.stdout.write(self.style.SUCCESS(f"{archived} tareas archivadas"))
@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.benchmark import SCENARIOS, compare, load_baseline, run_benchmarks, save_baseline
+
+
+class Command(BaseCommand):
+    help = "Mide las rutas REST principales contra el dataset de generate_dataset y las compara con un baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help="Prefijo del dataset")
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help="Repetible; por defecto todos")
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--baseline', help="JSON con el que comparar")
+        parser.add_argument('--save-baseline', help="Guardar los resultados como baseline en este fichero")
+        parser.add_argument('--threshold', type=float, default=0.2, help="Empeoramiento tolerado de p50/p95 (0.2 = 20%%)")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations debe ser >= 1")
+        try:
+            results = run_benchmarks(
+                prefix=options['prefix'],
+                scenarios=options['scenario'] or tuple(SCENARIOS),
+                iterations=options['iterations'],
+                warmup=options['warmup'],
+            )
+        except (LookupError, RuntimeError) as exc:
+            raise CommandError(str(exc))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.stdout.write(f"{'escenario':<16}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'queries':>9}")
+            for name, row in results.items():
+                self.stdout.write(
+                    f"{name:<16}{row['mean_ms']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['queries']:>9}"
+                )
+
+        if options['save_baseline']:
+            save_baseline(results, options['save_baseline'])
+            self.stdout.write(f"Baseline guardado en {options['save_baseline']}")
+
+        if options['baseline']:
+            rows = compare(results, load_baseline(options['baseline']), options['threshold'])
+            for row in rows:
+                if row['new']:
+                    self.stdout.write(f"{row['scenario']}: sin baseline")
+                    continue
+                deltas = ' '.join(
+                    f"{metric} {'n/a' if row[f'{metric}_ms_delta'] is None else format(row[f'{metric}_ms_delta'], '+.1%')}"
+                    for metric in ('p50', 'p95')
+                )
+                line = f"{row['scenario']}: {deltas} consultas {row['queries_delta']:+d}"
+                self.stdout.write(self.style.ERROR(line) if row['regressions'] else line)
+            regressed = [row['scenario'] for row in rows if row['regressions']]
+            if regressed:
+                raise CommandError(f"Regresiones en: {', '.join(regressed)}")
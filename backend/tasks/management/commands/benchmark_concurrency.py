@@ -0,0 +1,53 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.benchmark import SCENARIOS, load_baseline, run_concurrency, save_baseline
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el perfil de base de datos (DB_PROFILE) con peticiones concurrentes contra el dataset "
+        "de generate_dataset. Las escrituras quedan en el dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='bench', help="Prefijo del dataset")
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), help="Repetible; por defecto lectura, edición y actividad")
+        parser.add_argument('--threads', type=int, help="Hilos concurrentes; por defecto DB_POOL['MAX_SIZE']")
+        parser.add_argument('--requests', type=int, default=50, help="Peticiones por hilo")
+        parser.add_argument('--save', help="Guardar el resultado en este JSON (para comparar perfiles)")
+        parser.add_argument('--compare', help="JSON de otro perfil con el que comparar")
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or (options['threads'] is not None and options['threads'] < 1):
+            raise CommandError("--threads y --requests deben ser >= 1")
+        try:
+            result = run_concurrency(
+                prefix=options['prefix'],
+                scenarios=options['scenario'] or ('board_retrieve', 'task_patch', 'activity_feed'),
+                threads=options['threads'],
+                requests=options['requests'],
+            )
+        except LookupError as exc:
+            raise CommandError(str(exc))
+
+        rows = [result]
+        if options['compare']:
+            rows.append(load_baseline(options['compare']))
+        if options['json']:
+            self.stdout.write(json.dumps(rows if options['compare'] else result, indent=2))
+        else:
+            self.stdout.write(f"{'perfil':<10}{'hilos':>7}{'ok':>8}{'errores':>9}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+            for row in rows:
+                self.stdout.write(
+                    f"{row['profile']:<10}{row['threads']:>7}{row['ok']:>8}{sum(row['errors'].values()):>9}"
+                    f"{row['throughput_rps']:>10}{row['p50_ms']!s:>10}{row['p95_ms']!s:>10}{row['p99_ms']!s:>10}"
+                )
+            for message, count in result['errors'].items():
+                self.stdout.write(self.style.WARNING(f"{count} x {message}"))
+
+        if options['save']:
+            save_baseline(result, options['save'])
+            self.stdout.write(f"Resultado guardado en {options['save']}")
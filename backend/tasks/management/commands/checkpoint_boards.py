@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from tasks.history import checkpoint
+from tasks.models import Board
+
+
+class Command(BaseCommand):
+    help = "Guarda un checkpoint del estado actual de los tableros (inicio del historial para ?at=)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', type=int, action='append', help="Tablero (repetible); por defecto todos")
+
+    def handle(self, *args, **options):
+        boards = Board.objects.all()
+        if options['board']:
+            boards = boards.filter(pk__in=options['board'])
+        count = 0
+        for board_id, version in boards.values_list('id', 'version').iterator():
+            checkpoint(board_id, version)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"{count} checkpoints guardados"))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.dataset import clear_dataset, generate_dataset
+
+
+class Command(BaseCommand):
+    help = "Genera un dataset sintético (tableros, listas, tareas, asignaciones y actividad) con bulk_create."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--boards', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--prefix', default='bench', help="Prefijo de los usernames del dataset")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--max-lists', type=int, default=12, help="Listas como máximo por tablero")
+        parser.add_argument('--max-tasks', type=int, default=400, help="Tareas como máximo por lista")
+        parser.add_argument('--max-members', type=int, default=15, help="Miembros como máximo por tablero")
+        parser.add_argument('--activity-per-board', type=int, default=50, help="Entradas de actividad medias por tablero")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Tableros por transacción")
+        parser.add_argument('--clear', action='store_true', help="Borrar antes el dataset con el mismo prefijo")
+
+    def handle(self, *args, **options):
+        if options['boards'] < 0 or options['users'] < 1:
+            raise CommandError("--boards debe ser >= 0 y --users >= 1")
+
+        if options['clear']:
+            self.stdout.write(f"{clear_dataset(options['prefix'])} usuarios borrados")
+
+        totals = generate_dataset(
+            boards=options['boards'],
+            users=options['users'],
+            prefix=options['prefix'],
+            seed=options['seed'],
+            max_lists=options['max_lists'],
+            max_tasks=options['max_tasks'],
+            max_members=options['max_members'],
+            activity_per_board=options['activity_per_board'],
+            chunk_size=options['chunk_size'],
+            progress=lambda totals: self.stdout.write(f"{totals['boards']} tableros..."),
+        )
+        self.stdout.write(self.style.SUCCESS(', '.join(f"{count} {name}" for name, count in totals.items())))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.db_routers import prepare_shard
+
+
+class Command(BaseCommand):
+    help = "Migra los shards de DATABASE_SHARDS y los prepara (rangos de ids y tablas de referencia)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shard', action='append', help="Shard a preparar (repetible); por defecto todos")
+
+    def handle(self, *args, **options):
+        shards = options['shard'] or settings.DATABASE_SHARDS
+        if not shards:
+            raise CommandError("No hay shards configurados (DB_SHARDS)")
+        for alias in shards:
+            if alias not in settings.DATABASE_SHARDS:
+                raise CommandError(f"{alias} no está en DATABASE_SHARDS")
+            call_command('migrate', database=alias, interactive=False, verbosity=0)
+            try:
+                prepare_shard(alias)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(f"{alias} listo")
+        self.stdout.write(self.style.SUCCESS(f"{len(shards)} shards preparados"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tasks.notifications import due_soon_notifications
+
+
+class Command(BaseCommand):
+    help = "Notifica a los asignados de las tareas que vencen pronto (una vez por tarea y usuario)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help="Ventana de vencimiento en horas")
+
+    def handle(self, *args, **options):
+        created = due_soon_notifications(hours=options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} notificaciones creadas"))
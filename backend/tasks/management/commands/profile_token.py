@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.profiling import profile_token
+
+
+class Command(BaseCommand):
+    help = "Genera un token firmado para perfilar requests con la cabecera PROFILING['HEADER']."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{settings.PROFILING['HEADER']}: {profile_token()}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from tasks.models import Board
+from tasks.stats import rebuild_board_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores de BoardStat (corrige desviaciones)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', type=int, action='append', help="Tablero a recalcular (repetible); por defecto todos")
+
+    def handle(self, *args, **options):
+        board_ids = options['board'] or Board.objects.values_list('id', flat=True).iterator()
+        count = 0
+        for board_id in board_ids:
+            rebuild_board_stats(board_id)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"{count} tableros recalculados"))
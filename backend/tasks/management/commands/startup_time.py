@@ -0,0 +1,49 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Proceso nuevo: importa la aplicación ASGI (django.setup, URLconf, warm_up) como un worker
+BOOT = """
+import json, time
+import daphne.server  # un worker de daphne ya lo tiene cargado al importar la aplicación
+started = time.perf_counter()
+import config.asgi
+from tasks.warmup import STARTUP
+print(json.dumps({'boot_ms': round((time.perf_counter() - started) * 1000, 1), **STARTUP}))
+"""
+
+
+class Command(BaseCommand):
+    help = "Mide el arranque de un worker ASGI (import de config.asgi con warm_up) en procesos nuevos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument('--json', action='store_true', help="Salida en JSON")
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError("--runs debe ser >= 1")
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        runs = []
+        for _ in range(options['runs']):
+            result = subprocess.run(
+                [sys.executable, '-c', BOOT], cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+            )
+            if result.returncode:
+                raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "El worker no arrancó")
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+        summary = {'runs': len(runs), 'boot_ms': statistics.median(run['boot_ms'] for run in runs)}
+        summary['warmup_ms'] = statistics.median(run['total_ms'] for run in runs)
+        summary['steps'] = {step: statistics.median(run['steps'][step] for run in runs) for step in runs[0]['steps']}
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        self.stdout.write(f"arranque (mediana de {len(runs)}): {summary['boot_ms']} ms, de ellos warm_up {summary['warmup_ms']} ms")
+        for step, ms in summary['steps'].items():
+            self.stdout.write(f"  {step:<14}{ms:>8} ms")
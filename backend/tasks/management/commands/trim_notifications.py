@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tasks.notifications import BATCH_SIZE, trim_notifications
+
+
+class Command(BaseCommand):
+    help = "Borra en lotes las notificaciones antiguas y corrige los contadores de no leídas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=90, help="Antigüedad mínima en días")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Filas por transacción")
+
+    def handle(self, *args, **options):
+        deleted = trim_notifications(options['older_than_days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"{deleted} notificaciones borradas"))
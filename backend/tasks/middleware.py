@@ -0,0 +1,181 @@
+import hashlib
+from urllib.parse import parse_qs
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .db_routers import pick_replica, reset_read_routing, route_reads_to
+from .profiling import profile_request, profile_view_thread
+
+
+def _pin_key(request):
+    """
+    Identifica al cliente sin tocar la base de datos: el user_id del JWT
+    (solo se valida la firma) o, si no hay token, la cookie de sesión.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(header) == 2 and header[0] in jwt_settings.AUTH_HEADER_TYPES:
+        try:
+            return f"user:{AccessToken(header[1])[jwt_settings.USER_ID_CLAIM]}"
+        except (TokenError, KeyError):
+            pass
+    session_key = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session_key:
+        return f"session:{session_key}"
+    return None
+
+
+# Marca de read-your-writes: la guarda el cliente (cookie firmada y cabecera),
+# así vale en cualquier worker sin una caché compartida
+PIN_COOKIE = 'db_pin'
+PIN_HEADER = 'X-DB-Pin'
+_PIN_SALT = 'tasks.middleware.replica-pin'
+
+
+def _is_pinned(request, key):
+    """
+    True si el cliente trae una marca firmada para `key` emitida hace menos de
+    REPLICA_PIN_SECONDS. La caducidad va en la firma, no en la cookie.
+    """
+    value = request.headers.get(PIN_HEADER) or request.COOKIES.get(PIN_COOKIE)
+    if not (key and value):
+        return False
+    try:
+        return signing.loads(value, salt=_PIN_SALT, max_age=settings.REPLICA_PIN_SECONDS) == _pin_digest(key)
+    except signing.BadSignature:
+        return False
+
+
+def _pin_digest(key):
+    # La marca es legible por el cliente: nunca lleva la clave de sesión en claro
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def _pin(response, key):
+    value = signing.dumps(_pin_digest(key), salt=_PIN_SALT)
+    response[PIN_HEADER] = value
+    response.set_cookie(
+        PIN_COOKIE, value, max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax'
+    )
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Decide, por request, si las lecturas pueden ir a una réplica.
+
+    - Requests que escriben (POST/PUT/PATCH/DELETE) leen y escriben en el primario,
+      y "fijan" al cliente al primario durante REPLICA_PIN_SECONDS para que
+      siempre vea sus propios cambios aunque las réplicas vayan con retraso.
+      La marca viaja en la respuesta (cookie db_pin y cabecera X-DB-Pin) y el
+      cliente la devuelve; ningún worker guarda estado.
+    - Requests seguros de clientes no fijados leen de una réplica al azar.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Sin esto, las vistas async se ejecutarían en un hilo por culpa del middleware
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _replica_for(self, request, key):
+        if request.method in SAFE_METHODS and not _is_pinned(request, key):
+            return pick_replica()
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        key = _pin_key(request)
+        token = route_reads_to(self._replica_for(request, key))
+        try:
+            response = self.get_response(request)
+        finally:
+            reset_read_routing(token)
+
+        if request.method not in SAFE_METHODS and key:
+            _pin(response, key)
+        return response
+
+    async def __acall__(self, request):
+        key = _pin_key(request)
+        token = route_reads_to(self._replica_for(request, key))
+        try:
+            response = await self.get_response(request)
+        finally:
+            reset_read_routing(token)
+
+        if request.method not in SAFE_METHODS and key:
+            _pin(response, key)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Perfila requests bajo demanda (ver tasks/profiling.py). Con
+    PROFILING['ENABLED'] = False se quita de la cadena al arrancar.
+
+    En la cadena async las vistas síncronas corren en el hilo de
+    sync_to_async; process_view es síncrono, así que Django lo ejecuta en ese
+    mismo hilo y lo añade al perfil.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILING['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profile_request(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with profile_request(request):
+            return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        profile_view_thread()
+
+
+@database_sync_to_async
+def _user_for_token(raw_token):
+    try:
+        user_id = AccessToken(raw_token)[jwt_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+    return get_user_model().objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}, is_active=True).first()
+
+
+class QueryStringJWTAuthMiddleware(BaseMiddleware):
+    """
+    Autenticación de WebSockets con el access token en ?token= (los navegadores
+    no permiten cabeceras en el handshake). Si no hay token válido se conserva
+    el usuario que haya puesto AuthMiddlewareStack (sesión).
+    """
+
+    async def __call__(self, scope, receive, send):
+        raw_token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+        if raw_token:
+            user = await _user_for_token(raw_token)
+            if user is not None:
+                scope = dict(scope, user=user)
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.2 on 2026-10-19 06:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_admin_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['list', 'position', 'id'], name='task_list_position_idx'),
+        ),
+    ]
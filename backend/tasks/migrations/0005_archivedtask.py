@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 06:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_task_list_position_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTask',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=255, verbose_name='Título')),
+                ('description', models.TextField(blank=True, verbose_name='Descripción')),
+                ('position', models.DecimalField(decimal_places=5, default=0, max_digits=10, verbose_name='Posición')),
+                ('due_date', models.DateTimeField(blank=True, null=True, verbose_name='DueDate')),
+                ('priority', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], default='medium', max_length=10, verbose_name='Priority')),
+                ('created_at', models.DateTimeField(verbose_name='Fecha de creación')),
+                ('updated_at', models.DateTimeField(verbose_name='Última actualización')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de archivado')),
+                ('archived_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Archivada por')),
+                ('assigned_to', models.ManyToManyField(blank=True, related_name='archived_tasks', to=settings.AUTH_USER_MODEL, verbose_name='Asignado a')),
+                ('list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to='tasks.list', verbose_name='Lista')),
+            ],
+            options={
+                'verbose_name': 'Tarea archivada',
+                'verbose_name_plural': 'Tareas archivadas',
+                'ordering': ['-archived_at'],
+                'indexes': [models.Index(fields=['list', '-archived_at'], name='archived_list_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_board(apps, schema_editor):
+    db = schema_editor.connection.alias
+    List = apps.get_model('tasks', 'List')
+    board_of_list = Subquery(List.objects.using(db).filter(pk=OuterRef('list_id')).values('board_id')[:1])
+    for model_name in ('Task', 'ArchivedTask'):
+        apps.get_model('tasks', model_name).objects.using(db).update(board_id=board_of_list)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_archivedtask'),
+    ]
+
+    # Primero nullable, se rellena desde la lista y después se hace obligatorio
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='board',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='board_tasks', to='tasks.board', verbose_name='Tablero'),
+        ),
+        migrations.AddField(
+            model_name='archivedtask',
+            name='board',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to='tasks.board', verbose_name='Tablero'),
+        ),
+        migrations.RunPython(fill_board, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='task',
+            name='board',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='board_tasks', to='tasks.board', verbose_name='Tablero'),
+        ),
+        migrations.AlterField(
+            model_name='archivedtask',
+            name='board',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_tasks', to='tasks.board', verbose_name='Tablero'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_task_board'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('list', 'Tareas por lista'), ('priority', 'Tareas por prioridad'), ('assignee', 'Tareas por asignado'), ('moved', 'Tareas movidas a la lista por día')], max_length=10, verbose_name='Dimensión')),
+                ('key', models.CharField(max_length=32, verbose_name='Clave')),
+                ('day', models.DateField(blank=True, null=True, verbose_name='Día')),
+                ('count', models.IntegerField(default=0, verbose_name='Cantidad')),
+            ],
+            options={
+                'verbose_name': 'Estadística del tablero',
+                'verbose_name_plural': 'Estadísticas del tablero',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['board', 'due_date'], name='task_board_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='boardstat',
+            name='board',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='tasks.board', verbose_name='Tablero'),
+        ),
+        migrations.AddConstraint(
+            model_name='boardstat',
+            constraint=models.UniqueConstraint(condition=models.Q(('day__isnull', True)), fields=('board', 'dimension', 'key'), name='boardstat_unique_total'),
+        ),
+        migrations.AddConstraint(
+            model_name='boardstat',
+            constraint=models.UniqueConstraint(condition=models.Q(('day__isnull', False)), fields=('board', 'dimension', 'key', 'day'), name='boardstat_unique_day'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_board_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Versión'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_board_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='is_template',
+            field=models.BooleanField(default=False, verbose_name='Plantilla'),
+        ),
+    ]
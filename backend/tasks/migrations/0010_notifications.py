@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-19 11:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('tasks', '0009_board_is_template'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Inbox',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inbox', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('unread', models.PositiveIntegerField(default=0, verbose_name='Sin leer')),
+            ],
+            options={
+                'verbose_name': 'Bandeja',
+                'verbose_name_plural': 'Bandejas',
+            },
+        ),
+        migrations.CreateModel(
+            name='Notification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('assigned', 'Asignación'), ('mentioned', 'Mención'), ('due_soon', 'Vence pronto')], max_length=20, verbose_name='Tipo')),
+                ('board_id', models.PositiveIntegerField(verbose_name='ID del tablero')),
+                ('task_id', models.PositiveIntegerField(blank=True, null=True, verbose_name='ID de la tarea')),
+                ('message', models.CharField(max_length=255, verbose_name='Mensaje')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='Leída')),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Autor')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Notificación',
+                'verbose_name_plural': 'Notificaciones',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['user', '-id'], name='notification_user_idx'), models.Index(fields=['created_at'], name='notification_created_idx')],
+            },
+        ),
+    ]
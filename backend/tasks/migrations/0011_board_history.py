@@ -0,0 +1,45 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoardCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(verbose_name='Versión')),
+                ('data', models.BinaryField(verbose_name='Estado comprimido')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creación')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='tasks.board', verbose_name='Tablero')),
+            ],
+            options={
+                'verbose_name': 'Checkpoint del tablero',
+                'verbose_name_plural': 'Checkpoints del tablero',
+                'indexes': [models.Index(fields=['board', 'created_at'], name='boardcheckpoint_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='BoardEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveIntegerField(verbose_name='Versión')),
+                ('type', models.CharField(max_length=30, verbose_name='Tipo')),
+                ('payload', models.JSONField(verbose_name='Datos')),
+                ('timestamp', models.DateTimeField(auto_now_add=True, verbose_name='Fecha y hora')),
+                ('board', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='tasks.board', verbose_name='Tablero')),
+            ],
+            options={
+                'verbose_name': 'Evento del tablero',
+                'verbose_name_plural': 'Eventos del tablero',
+                'indexes': [models.Index(fields=['board', 'version'], name='boardevent_version_idx')],
+            },
+        ),
+    ]
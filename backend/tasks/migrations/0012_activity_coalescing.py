@@ -0,0 +1,40 @@
+# Generated by Django 6.0.2 on 2026-10-19 12:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('tasks', '0011_board_history'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='board_id',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='ID del tablero'),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='count',
+            field=models.PositiveIntegerField(default=1, verbose_name='Eventos'),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='kind',
+            field=models.CharField(blank=True, max_length=40, verbose_name='Tipo'),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='object_ids',
+            field=models.JSONField(blank=True, default=list, verbose_name='IDs afectados'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', 'board_id', 'kind', '-timestamp'], name='activity_coalesce_idx'),
+        ),
+    ]
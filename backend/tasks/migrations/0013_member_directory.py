@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-19 13:15
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def fill_directory(apps, schema_editor):
+    db = schema_editor.connection.alias
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    BoardMember = apps.get_model('tasks', 'BoardMember')
+    BoardStat = apps.get_model('tasks', 'BoardStat')
+    BoardMember.objects.using(db).update(
+        username=Subquery(User.objects.using(db).filter(pk=OuterRef('user_id')).values('username')[:1])
+    )
+    counts = BoardMember.objects.using(db).order_by().values_list('board_id').annotate(count=Count('id'))
+    BoardStat.objects.using(db).bulk_create(
+        [BoardStat(board_id=board_id, dimension='member', key='', count=count) for board_id, count in counts],
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_activity_coalescing'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    # El nombre se copia del usuario y el contador de miembros pasa a BoardStat
+    operations = [
+        migrations.AddField(
+            model_name='boardmember',
+            name='username',
+            field=models.CharField(blank=True, max_length=150, verbose_name='Nombre de usuario'),
+        ),
+        migrations.AlterField(
+            model_name='boardstat',
+            name='dimension',
+            field=models.CharField(choices=[('list', 'Tareas por lista'), ('priority', 'Tareas por prioridad'), ('assignee', 'Tareas por asignado'), ('moved', 'Tareas movidas a la lista por día'), ('member', 'Miembros')], max_length=10, verbose_name='Dimensión'),
+        ),
+        migrations.AddIndex(
+            model_name='boardmember',
+            index=models.Index(fields=['board', 'username', 'user'], name='boardmember_directory_idx'),
+        ),
+        migrations.RunPython(fill_directory, migrations.RunPython.noop),
+    ]
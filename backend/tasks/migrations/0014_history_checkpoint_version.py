@@ -0,0 +1,44 @@
+# Generated by Django 6.0.2 on 2026-10-19 16:20
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def fill_checkpoint_version(apps, schema_editor):
+    db = schema_editor.connection.alias
+    Board = apps.get_model('tasks', 'Board')
+    BoardCheckpoint = apps.get_model('tasks', 'BoardCheckpoint')
+    latest = (
+        BoardCheckpoint.objects.using(db).filter(board_id=OuterRef('pk')).order_by()
+        .values('board_id').annotate(version=Max('version')).values('version')
+    )
+    Board.objects.using(db).filter(
+        pk__in=BoardCheckpoint.objects.using(db).values('board_id')
+    ).update(checkpoint_version=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_member_directory'),
+    ]
+
+    # Los checkpoints van por distancia al último (Board.checkpoint_version)
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='checkpoint_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Versión del último checkpoint'),
+        ),
+        migrations.AlterField(
+            model_name='boardcheckpoint',
+            name='version',
+            field=models.PositiveBigIntegerField(verbose_name='Versión'),
+        ),
+        migrations.AlterField(
+            model_name='boardevent',
+            name='version',
+            field=models.PositiveBigIntegerField(verbose_name='Versión'),
+        ),
+        migrations.RunPython(fill_checkpoint_version, migrations.RunPython.noop),
+    ]
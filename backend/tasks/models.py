@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
+from .db_routers import ShardedManager
+
 User = get_user_model()
 
 
@@ -24,6 +26,14 @@ class Board(models.Model):
         related_name='boards',
         verbose_name="Miembros"
     )
+    # Se incrementa con cada evento de estado del tablero (ver tasks/events.py)
+    version = models.PositiveBigIntegerField(default=0, editable=False, verbose_name="Versión")
+    # Versión del último BoardCheckpoint (ver tasks/history.py)
+    checkpoint_version = models.PositiveBigIntegerField(
+        default=0, editable=False, verbose_name="Versión del último checkpoint"
+    )
+    # Las plantillas se clonan para empezar proyectos nuevos (ver tasks/cloning.py)
+    is_template = models.BooleanField(default=False, verbose_name="Plantilla")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Última actualización")
 
@@ -35,12 +45,25 @@ class Board(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # version y checkpoint_version solo cambian con UPDATE atómicos (ver
+        # tasks/events.py y tasks/history.py): un save() con la instancia
+        # cargada antes no debe pisarlas
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('version', 'checkpoint_version')
+            ]
+        super().save(*args, **kwargs)
+
 
 class BoardMember(models.Model):
     """
     Modelo intermedio para la relación M2M entre Board y User,
     que incluye el rol del miembro.
     """
+    objects = ShardedManager()
+
     ROLE_CHOICES = [
         ('admin', 'Administrador'),
         ('member', 'Miembro'),
@@ -65,12 +88,23 @@ class BoardMember(models.Model):
         verbose_name="Rol"
     )
     joined_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de ingreso")
+    # Copia de user.username: el directorio (/api/boards/{id}/members/) pagina
+    # y busca por prefijo sobre el índice (board, username, user) sin join
+    username = models.CharField(max_length=150, blank=True, verbose_name="Nombre de usuario")
 
     class Meta:
         verbose_name = "Miembro del tablero"
         verbose_name_plural = "Miembros del tablero"
         unique_together = ['board', 'user']
         ordering = ['board', 'role', 'joined_at']
+        indexes = [
+            models.Index(fields=['board', 'username', 'user'], name='boardmember_directory_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self.username:
+            self.username = self.user.username
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user.username} - {self.board.name} ({self.get_role_display()})"
@@ -80,6 +114,8 @@ class List(models.Model):
     """
     Modelo que representa una lista dentro de un tablero.
     """
+    objects = ShardedManager()
+
     board = models.ForeignKey(
         Board,
         on_delete=models.CASCADE,
@@ -108,13 +144,24 @@ class List(models.Model):
 class Task(models.Model):
     """
     Modelo que representa una tarea dentro de una lista.
+    `board` es una copia de list.board: se mantiene en save() al crear y al
+    mover, y permite filtrar y notificar por tablero sin pasar por la lista.
     """
+    objects = ShardedManager()
+
     list = models.ForeignKey(
         List,
         on_delete=models.CASCADE,
         related_name='tasks',
         verbose_name="Lista"
     )
+    board = models.ForeignKey(
+        Board,
+        on_delete=models.CASCADE,
+        related_name='board_tasks',
+        editable=False,
+        verbose_name="Tablero"
+    )
     title = models.CharField(max_length=255, verbose_name="Título")
     description = models.TextField(blank=True, verbose_name="Descripción")
     assigned_to = models.ManyToManyField(
@@ -152,16 +199,209 @@ class Task(models.Model):
         verbose_name = "Tarea"
         verbose_name_plural = "Tareas"
         ordering = ['position']
+        indexes = [
+            models.Index(fields=['-created_at'], name='task_created_idx'),
+            # Ventana inicial y paginación por keyset dentro de cada lista
+            models.Index(fields=['list', 'position', 'id'], name='task_list_position_idx'),
+            # Recuento de vencidas en las estadísticas del tablero
+            models.Index(fields=['board', 'due_date'], name='task_board_due_idx'),
+        ]
+
+    # Valores cargados de la BD que save() y las estadísticas comparan con los actuales
+    TRACKED_FIELDS = ('list_id', 'board_id', 'priority')
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded = {name: instance.__dict__.get(name) for name in cls.TRACKED_FIELDS}
+        return instance
+
+    def loaded_value(self, name):
+        """
+        Valor de `name` tal como se leyó de la BD (None si la instancia no viene de ella).
+        """
+        return getattr(self, '_loaded', {}).get(name)
+
+    def save(self, *args, **kwargs):
+        # Solo se consulta la lista si no está cargada y la tarea es nueva o cambió de lista
+        if self.list_id is not None and (
+            Task.list.is_cached(self)
+            or self.board_id is None
+            or self.list_id != self.loaded_value('list_id')
+        ):
+            self.board_id = self.list.board_id
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'list' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'board'}
+        super().save(*args, **kwargs)
+        self._loaded = {name: getattr(self, name) for name in self.TRACKED_FIELDS}
+
+
+class ArchivedTask(models.Model):
+    """
+    Tarea archivada (tabla fría). Conserva el id original de la Task, así que
+    el historial de actividad sigue apuntando al mismo objeto y una
+    restauración devuelve la tarea con su id.
+    """
+    objects = ShardedManager()
+
+    id = models.BigIntegerField(primary_key=True, verbose_name="ID")
+    list = models.ForeignKey(
+        List,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks',
+        verbose_name="Lista"
+    )
+    board = models.ForeignKey(
+        Board,
+        on_delete=models.CASCADE,
+        related_name='archived_tasks',
+        editable=False,
+        verbose_name="Tablero"
+    )
+    title = models.CharField(max_length=255, verbose_name="Título")
+    description = models.TextField(blank=True, verbose_name="Descripción")
+    assigned_to = models.ManyToManyField(
+        User,
+        blank=True,
+        related_name='archived_tasks',
+        verbose_name="Asignado a"
+    )
+    position = models.DecimalField(max_digits=10, decimal_places=5, default=0, verbose_name="Posición")
+    due_date = models.DateTimeField(null=True, blank=True, verbose_name="DueDate")
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES, default='medium', verbose_name="Priority")
+    created_at = models.DateTimeField(verbose_name="Fecha de creación")
+    updated_at = models.DateTimeField(verbose_name="Última actualización")
+    archived_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de archivado")
+    archived_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Archivada por"
+    )
+
+    class Meta:
+        verbose_name = "Tarea archivada"
+        verbose_name_plural = "Tareas archivadas"
+        ordering = ['-archived_at']
+        indexes = [
+            models.Index(fields=['list', '-archived_at'], name='archived_list_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class BoardStat(models.Model):
+    """
+    Contador precalculado de un tablero, mantenido desde las señales
+    (ver tasks/stats.py). `day` solo se usa en el throughput ('moved').
+    """
+    objects = ShardedManager()
+
+    DIMENSION_CHOICES = [
+        ('list', 'Tareas por lista'),
+        ('priority', 'Tareas por prioridad'),
+        ('assignee', 'Tareas por asignado'),
+        ('moved', 'Tareas movidas a la lista por día'),
+        ('member', 'Miembros'),
+    ]
+
+    board = models.ForeignKey(
+        Board,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name="Tablero"
+    )
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES, verbose_name="Dimensión")
+    key = models.CharField(max_length=32, verbose_name="Clave")
+    day = models.DateField(null=True, blank=True, verbose_name="Día")
+    count = models.IntegerField(default=0, verbose_name="Cantidad")
+
+    class Meta:
+        verbose_name = "Estadística del tablero"
+        verbose_name_plural = "Estadísticas del tablero"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['board', 'dimension', 'key'], condition=models.Q(day__isnull=True), name='boardstat_unique_total'
+            ),
+            models.UniqueConstraint(
+                fields=['board', 'dimension', 'key', 'day'], condition=models.Q(day__isnull=False), name='boardstat_unique_day'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.board_id} {self.dimension}={self.key} {self.day or ''}: {self.count}"
+
+
+class BoardEvent(models.Model):
+    """
+    Evento de estado de un tablero tal como salió por el WebSocket (ver
+    tasks/history.py). `version` es la Board.version que le asignó broadcast().
+    """
+    objects = ShardedManager()
+
+    board = models.ForeignKey(
+        Board,
+        on_delete=models.CASCADE,
+        related_name='events',
+        verbose_name="Tablero"
+    )
+    version = models.PositiveBigIntegerField(verbose_name="Versión")
+    type = models.CharField(max_length=30, verbose_name="Tipo")
+    payload = models.JSONField(verbose_name="Datos")
+    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="Fecha y hora")
+
+    class Meta:
+        verbose_name = "Evento del tablero"
+        verbose_name_plural = "Eventos del tablero"
+        indexes = [
+            models.Index(fields=['board', 'version'], name='boardevent_version_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.board_id} v{self.version} {self.type}"
+
+
+class BoardCheckpoint(models.Model):
+    """
+    Estado completo de un tablero en una versión, en JSON comprimido con zlib.
+    """
+    objects = ShardedManager()
+
+    board = models.ForeignKey(
+        Board,
+        on_delete=models.CASCADE,
+        related_name='checkpoints',
+        verbose_name="Tablero"
+    )
+    version = models.PositiveBigIntegerField(verbose_name="Versión")
+    data = models.BinaryField(verbose_name="Estado comprimido")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+
+    class Meta:
+        verbose_name = "Checkpoint del tablero"
+        verbose_name_plural = "Checkpoints del tablero"
+        indexes = [
+            models.Index(fields=['board', 'created_at'], name='boardcheckpoint_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.board_id} v{self.version}"
+
 
 class ActivityLog(models.Model):
     """
     Modelo para registrar el historial de actividades.
     Usa Generic Foreign Keys para poder apuntar a cualquier modelo.
     """
+    objects = ShardedManager()
+
     user = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -182,10 +422,89 @@ class ActivityLog(models.Model):
     object_id = models.PositiveIntegerField(verbose_name="ID del objeto")
     content_object = GenericForeignKey('content_type', 'object_id')
 
+    # Entradas fundidas (ver tasks/activity.py): tipo, nº de eventos y objetos afectados
+    board_id = models.PositiveIntegerField(null=True, blank=True, verbose_name="ID del tablero")
+    kind = models.CharField(max_length=40, blank=True, verbose_name="Tipo")
+    count = models.PositiveIntegerField(default=1, verbose_name="Eventos")
+    object_ids = models.JSONField(default=list, blank=True, verbose_name="IDs afectados")
+
     class Meta:
         verbose_name = "Registro de actividad"
         verbose_name_plural = "Registros de actividad"
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp'], name='activity_timestamp_idx'),
+            models.Index(fields=['content_type', '-timestamp'], name='activity_ct_timestamp_idx'),
+            models.Index(fields=['user', 'board_id', 'kind', '-timestamp'], name='activity_coalesce_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.action} - {self.timestamp}"
+
+
+class Notification(models.Model):
+    """
+    Notificación de la bandeja de un usuario (ver tasks/notifications.py).
+    Tablero y tarea se guardan como ids: la tarea puede archivarse o vivir en
+    otro shard y la notificación sigue siendo válida.
+    """
+    KIND_CHOICES = [
+        ('assigned', 'Asignación'),
+        ('mentioned', 'Mención'),
+        ('due_soon', 'Vence pronto'),
+    ]
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name="Usuario"
+    )
+    actor = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Autor"
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Tipo")
+    board_id = models.PositiveIntegerField(verbose_name="ID del tablero")
+    task_id = models.PositiveIntegerField(null=True, blank=True, verbose_name="ID de la tarea")
+    message = models.CharField(max_length=255, verbose_name="Mensaje")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
+    read_at = models.DateTimeField(null=True, blank=True, verbose_name="Leída")
+
+    class Meta:
+        verbose_name = "Notificación"
+        verbose_name_plural = "Notificaciones"
+        ordering = ['-id']
+        indexes = [
+            models.Index(fields=['user', '-id'], name='notification_user_idx'),
+            models.Index(fields=['created_at'], name='notification_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: {self.message}"
+
+
+class Inbox(models.Model):
+    """
+    Contador de notificaciones sin leer de un usuario. Se actualiza en la
+    misma transacción que las notificaciones, así leerlo es una sola fila.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='inbox',
+        verbose_name="Usuario"
+    )
+    unread = models.PositiveIntegerField(default=0, verbose_name="Sin leer")
+
+    class Meta:
+        verbose_name = "Bandeja"
+        verbose_name_plural = "Bandejas"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread}"
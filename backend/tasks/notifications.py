@@ -0,0 +1,176 @@
+"""
+Bandeja de notificaciones por usuario.
+
+Las notificaciones se generan al escribir: asignaciones y menciones
+(@usuario en la descripción) desde las vistas de tareas, y vencimientos
+próximos desde `manage.py notify_due_tasks`. Cada entrega inserta las filas
+y suma al contador de Inbox en la misma transacción, así el badge de no
+leídas es una lectura de una fila. Tras el commit, cada notificación se
+envía al grupo `user_<id>` (ver NotificationConsumer).
+"""
+import re
+from collections import Counter
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .db_routers import board_db, each_shard, use_primary
+from .models import Board, BoardMember, Inbox, Notification, Task
+
+User = get_user_model()
+
+MENTION_RE = re.compile(r'(?<![\w@])@([\w.+-]+)')
+BATCH_SIZE = 1000
+
+
+def user_group(user_id):
+    return f'user_{user_id}'
+
+
+def mentions(text):
+    return {name.rstrip('.') for name in MENTION_RE.findall(text or '')}
+
+
+def _add_unread(counts):
+    """
+    Suma a Inbox.unread {user_id: n} (negativo para restar) sin bajar de cero.
+    """
+    Inbox.objects.bulk_create([Inbox(user_id=user_id) for user_id in counts], ignore_conflicts=True)
+    by_delta = {}
+    for user_id, delta in counts.items():
+        by_delta.setdefault(delta, []).append(user_id)
+    for delta, user_ids in by_delta.items():
+        Inbox.objects.filter(user_id__in=user_ids).update(unread=Greatest(F('unread') + delta, 0))
+
+
+def unread_count(user_id):
+    with use_primary():
+        return Inbox.objects.filter(user_id=user_id).values_list('unread', flat=True).first() or 0
+
+
+def deliver(notifications):
+    """
+    Guarda las notificaciones, actualiza los contadores y, tras el commit,
+    las envía a cada usuario con su número de no leídas.
+    """
+    if not notifications:
+        return []
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(notifications, batch_size=BATCH_SIZE)
+        _add_unread(Counter(notification.user_id for notification in notifications))
+        transaction.on_commit(lambda: _push(notifications))
+    return notifications
+
+
+def _push(notifications):
+    from .serializers import NotificationSerializer
+
+    with use_primary():
+        unread = dict(Inbox.objects.filter(user_id__in={n.user_id for n in notifications}).values_list('user_id', 'unread'))
+    send = async_to_sync(get_channel_layer().group_send)
+    for notification in notifications:
+        send(user_group(notification.user_id), {
+            'type': 'notification',
+            'notification': NotificationSerializer(notification).data,
+            'unread': unread.get(notification.user_id, 0),
+        })
+
+
+def task_notifications(task, actor, new_assignees=(), old_description=''):
+    """
+    Notifica a los recién asignados y a los nuevos @mencionados que tienen
+    acceso al tablero. Nadie recibe notificaciones de sus propios cambios.
+    """
+    notifications = []
+    assigned = {getattr(user, 'pk', user) for user in new_assignees} - {actor.id}
+    for user_id in sorted(assigned):
+        notifications.append(Notification(
+            user_id=user_id, actor=actor, kind='assigned', board_id=task.board_id, task_id=task.id,
+            message=f"{actor.username} assigned you to '{task.title}'",
+        ))
+
+    names = mentions(task.description) - mentions(old_description) - {actor.username}
+    if names:
+        members = BoardMember.objects.using(board_db(task.board_id)).filter(
+            board_id=task.board_id, user__username__in=names
+        ).values_list('user_id', flat=True)
+        owner = Board.objects.filter(pk=task.board_id, owner__username__in=names).values_list('owner_id', flat=True)
+        for user_id in sorted(({*members} | {*owner}) - assigned - {actor.id}):
+            notifications.append(Notification(
+                user_id=user_id, actor=actor, kind='mentioned', board_id=task.board_id, task_id=task.id,
+                message=f"{actor.username} mentioned you in '{task.title}'",
+            ))
+    return deliver(notifications)
+
+
+def due_soon_notifications(hours=24):
+    """
+    Avisa a los asignados de las tareas que vencen en las próximas `hours`
+    horas, una sola vez por tarea y usuario.
+    """
+    now = timezone.now()
+    pending = []
+    for alias in each_shard():
+        assignments = Task.assigned_to.through.objects.using(alias).filter(
+            task__due_date__gt=now, task__due_date__lte=now + timedelta(hours=hours)
+        ).values_list('user_id', 'task_id', 'task__board_id', 'task__title')
+        pending += list(assignments)
+    if not pending:
+        return []
+
+    with use_primary():
+        notified = set(Notification.objects.filter(
+            kind='due_soon', task_id__in={task_id for _, task_id, _, _ in pending}
+        ).values_list('user_id', 'task_id'))
+    return deliver([
+        Notification(
+            user_id=user_id, kind='due_soon', board_id=board_id, task_id=task_id,
+            message=f"'{title}' is due within {hours} hours",
+        )
+        for user_id, task_id, board_id, title in pending
+        if (user_id, task_id) not in notified
+    ])
+
+
+def mark_read(user, ids=None):
+    """
+    Marca como leídas las notificaciones `ids` del usuario (todas si es None)
+    y devuelve cuántas cambiaron. Solo cuentan las que seguían sin leer, así
+    dos peticiones a la vez no restan dos veces.
+    """
+    queryset = Notification.objects.filter(user=user, read_at__isnull=True)
+    if ids is not None:
+        queryset = queryset.filter(pk__in=ids)
+    with transaction.atomic():
+        changed = queryset.update(read_at=timezone.now())
+        if changed:
+            _add_unread({user.id: -changed})
+    return changed
+
+
+def trim_notifications(older_than_days=90, batch_size=BATCH_SIZE):
+    """
+    Borra en lotes las notificaciones más antiguas que `older_than_days`
+    (leídas o no) y descuenta de los contadores las que seguían sin leer.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted = 0
+    while True:
+        with transaction.atomic(), use_primary():
+            batch = list(
+                Notification.objects.filter(created_at__lt=cutoff).order_by('pk')
+                .values_list('pk', 'user_id', 'read_at')[:batch_size]
+            )
+            if not batch:
+                return deleted
+            Notification.objects.filter(pk__in=[pk for pk, _, _ in batch]).delete()
+            unread = Counter(user_id for _, user_id, read_at in batch if read_at is None)
+            if unread:
+                _add_unread({user_id: -count for user_id, count in unread.items()})
+        deleted += len(batch)
@@ -0,0 +1,108 @@
+"""
+Autorización por tablero basada en BoardMember.role.
+
+Los roles de un usuario se resuelven como un dict {board_id: role} que se
+guarda en la caché bajo la versión actual del usuario y se memoriza en el
+request o en la conexión WebSocket. Las señales de BoardMember y Board
+incrementan esa versión (ver invalidate_board_roles()), así la entrada
+anterior deja de leerse sin tener que borrarla. Para que la invalidación
+llegue a todos los workers CACHES debe apuntar a una caché común (Redis,
+Memcached); con la LocMem por defecto cada proceso tiene su propia versión.
+Los querysets filtran por la columna board_id de cada modelo, sin joins
+adicionales.
+"""
+import time
+
+from channels.db import database_sync_to_async
+from django.core.cache import cache
+from rest_framework import permissions
+from rest_framework.exceptions import PermissionDenied
+
+from .db_routers import each_shard, use_primary
+from .models import Board, BoardMember
+
+ADMIN = 'admin'
+ROLES_CACHE_SECONDS = 300
+
+
+def _version_key(user_id):
+    return f'board-roles-version:{user_id}'
+
+
+def _roles_version(user_id):
+    """
+    Versión actual de los roles del usuario. Si la clave no existe (o la
+    caché la expulsó) se crea con un valor que ninguna entrada anterior usa.
+    """
+    key = _version_key(user_id)
+    cache.add(key, time.time_ns(), None)
+    return cache.get(key)
+
+
+def invalidate_board_roles(user_id):
+    key = _version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def board_roles(user):
+    """
+    Roles del usuario por tablero. El propietario cuenta como admin.
+    Se leen del primario: una réplica atrasada dejaría en caché una
+    membresía que ya cambió.
+    """
+    if not user or not user.is_authenticated:
+        return {}
+    key = f'board-roles:{user.id}:{_roles_version(user.id)}'
+    roles = cache.get(key)
+    if roles is None:
+        with use_primary():
+            roles = {}
+            # Con sharding las membresías están repartidas: una consulta por shard
+            for alias in each_shard():
+                roles.update(BoardMember.objects.using(alias).filter(user_id=user.id).values_list('board_id', 'role'))
+            roles.update((board_id, ADMIN) for board_id in Board.objects.filter(owner_id=user.id).values_list('id', flat=True))
+        cache.set(key, roles, ROLES_CACHE_SECONDS)
+    return roles
+
+
+aboard_roles = database_sync_to_async(board_roles)
+
+
+def request_roles(request):
+    """
+    board_roles() resuelto una sola vez por request.
+    """
+    if not hasattr(request, '_board_roles'):
+        request._board_roles = board_roles(request.user)
+    return request._board_roles
+
+
+def require_board_role(roles, board_id, admin=False):
+    role = roles.get(board_id)
+    if role is None:
+        raise PermissionDenied("You are not a member of this board.")
+    if admin and role != ADMIN:
+        raise PermissionDenied("Only board admins can do this.")
+
+
+def board_id_of(obj):
+    return obj.id if isinstance(obj, Board) else obj.board_id
+
+
+class BoardRolePermission(permissions.BasePermission):
+    """
+    Los miembros leen y escriben; solo los admins borran (y editan el propio tablero).
+    La pertenencia ya la garantiza el queryset, esto comprueba el rol.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        roles = request_roles(request)
+        board_id = board_id_of(obj)
+        if request.method in permissions.SAFE_METHODS:
+            return board_id in roles
+        admin_only = request.method == 'DELETE' or (isinstance(obj, Board) and request.method in ('PUT', 'PATCH'))
+        require_board_role(roles, board_id, admin=admin_only)
+        return True
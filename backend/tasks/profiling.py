@@ -0,0 +1,183 @@
+"""
+Profiler estadístico bajo demanda para requests y handlers de consumers.
+
+Desactivado (PROFILING['ENABLED'] = False) no cuesta nada: el middleware
+lanza MiddlewareNotUsed y los consumers reciben un contexto nulo. Activado,
+se perfila 1 de cada SAMPLE_RATE requests/mensajes y los requests que traen
+en PROFILING['HEADER'] un token firmado (ver `manage.py profile_token`).
+
+Un hilo muestrea cada INTERVAL segundos las pilas de los hilos perfilados y
+las guarda en formato "folded" (una línea `raíz;...;hoja N` por pila), que
+entienden flamegraph.pl, speedscope e inferno. Junto a cada .folded va un
+.json con la etiqueta y el tiempo de pared. En un worker async el perfil
+empieza en el hilo del event loop (que incluye lo que se ejecute a la vez) y
+el middleware añade en process_view el hilo de sync_to_async donde corre la
+vista (ver profile_view_thread()).
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.utils.text import slugify
+
+SIGNING_SALT = 'tasks.profiling'
+
+_disabled = nullcontext()
+
+# Perfil del request en curso; sync_to_async copia el contexto al hilo de la vista
+_current = ContextVar('profile', default=None)
+
+
+def profiling_setting(name):
+    return settings.PROFILING[name]
+
+
+def profile_token():
+    return signing.TimestampSigner(salt=SIGNING_SALT).sign('profile')
+
+
+def _valid_token(token):
+    try:
+        signing.TimestampSigner(salt=SIGNING_SALT).unsign(token, max_age=profiling_setting('TOKEN_MAX_AGE'))
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def _sampled():
+    rate = profiling_setting('SAMPLE_RATE')
+    return bool(rate) and random.random() * rate < 1
+
+
+def profile_request(request):
+    """
+    Contexto que perfila el request si toca (muestreo o cabecera firmada).
+    """
+    token = request.headers.get(profiling_setting('HEADER'))
+    if (token and _valid_token(token)) or _sampled():
+        return Profile(f'{request.method} {request.path}')
+    return _disabled
+
+
+def profile_message(consumer, message):
+    """
+    Igual que profile_request() para un mensaje de consumer (solo muestreo).
+    """
+    if not profiling_setting('ENABLED') or not _sampled():
+        return _disabled
+    return Profile(f'ws {type(consumer).__name__}.{message.get("type")}')
+
+
+def profile_view_thread():
+    """
+    Añade el hilo actual al perfil del request en curso, si lo hay.
+    """
+    profile = _current.get()
+    if profile is not None:
+        profile.thread_ids.add(threading.get_ident())
+
+
+def _folded(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+class Profile:
+    """
+    Muestrea la pila del hilo que entra en el contexto, y de los que se
+    añadan con profile_view_thread(), hasta que sale y escribe el resultado
+    en PROFILING['DIR'].
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.stacks = Counter()
+        self.thread_ids = {threading.get_ident()}
+        self.stopped = threading.Event()
+        self.sampler = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        interval = profiling_setting('INTERVAL')
+        while not self.stopped.wait(interval):
+            frames = sys._current_frames()
+            for thread_id in tuple(self.thread_ids):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.stacks[_folded(frame)] += 1
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.token = _current.set(self)
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.sampler.join()
+        _current.reset(self.token)
+        self.wall_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        self.write()
+
+    def write(self):
+        directory = Path(profiling_setting('DIR'))
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f'{time.time_ns()}-{slugify(self.label)[:80]}'
+        (directory / f'{name}.folded').write_text(
+            ''.join(f'{stack} {count}\n' for stack, count in self.stacks.items())
+        )
+        (directory / f'{name}.json').write_text(json.dumps({
+            'name': name,
+            'label': self.label,
+            'wall_ms': self.wall_ms,
+            'samples': sum(self.stacks.values()),
+            'created': time.time(),
+        }))
+        _prune(directory)
+
+
+def _prune(directory):
+    keep = profiling_setting('KEEP')
+    metadata = sorted(directory.glob('*.json'), reverse=True)
+    for path in metadata[keep:]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.folded').unlink(missing_ok=True)
+
+
+def recent_profiles(limit=50):
+    """
+    Los últimos `limit` perfiles, ordenados por tiempo de pared descendente.
+    """
+    directory = Path(profiling_setting('DIR'))
+    if not directory.is_dir():
+        return []
+    profiles = []
+    for path in sorted(directory.glob('*.json'), reverse=True)[:limit]:
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda p: p['wall_ms'], reverse=True)
+
+
+def profile_path(name):
+    """
+    Ruta del .folded de un perfil, o None si el nombre no es de este directorio.
+    """
+    directory = Path(profiling_setting('DIR'))
+    path = directory / f'{name}.folded'
+    if path.parent != directory or not path.is_file():
+        return None
+    return path
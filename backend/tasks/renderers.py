@@ -0,0 +1,11 @@
+from rest_framework.renderers import JSONRenderer
+
+
+class CompactJSONRenderer(JSONRenderer):
+    """
+    Selecciona la representación compacta del tablero, por cabecera
+    (Accept: application/vnd.collab.compact+json) o con ?format=compact.
+    Solo la ofrece el detalle del tablero (ver BoardViewSet.get_renderers).
+    """
+    media_type = 'application/vnd.collab.compact+json'
+    format = 'compact'
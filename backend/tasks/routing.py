@@ -6,4 +6,10 @@ websocket_urlpatterns = [
     # WebSocket para un tablero específico
     # Ejemplo de uso: ws://localhost:8000/ws/board/1/
     re_path(r'ws/board/(?P<board_id>\w+)/$', consumers.BoardConsumer.as_asgi()),
+    # Un socket para varios tableros (subscribe/unsubscribe)
+    # Ejemplo de uso: ws://localhost:8000/ws/boards/
+    re_path(r'ws/boards/$', consumers.MultiBoardConsumer.as_asgi()),
+    # Notificaciones del usuario autenticado
+    # Ejemplo de uso: ws://localhost:8000/ws/notifications/
+    re_path(r'ws/notifications/$', consumers.NotificationConsumer.as_asgi()),
 ]
@@ -1,6 +1,10 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from .models import Board, List, Task, BoardMember, ActivityLog
+from django.db.models import CharField, Count, Exists, F, Max, OuterRef, Prefetch, Q, Window
+from django.db.models.functions import Cast, RowNumber
+from .db_routers import board_db
+from .models import Board, List, Task, ArchivedTask, BoardMember, BoardStat, ActivityLog, Notification
 
 User = get_user_model()
 
@@ -19,12 +23,39 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = ['id', 'list', 'title', 'description', 'position', 'due_date', 'assigned_to', 'assigned_to_ids', 'priority', 'created_at', 'updated_at']
 
+class ArchivedTaskSerializer(serializers.ModelSerializer):
+    assigned_to = UserSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedTask
+        fields = ['id', 'list', 'board', 'title', 'description', 'position', 'due_date', 'assigned_to', 'priority', 'created_at', 'updated_at', 'archived_at', 'archived_by']
+
 class ListSerializer(serializers.ModelSerializer):
+    """
+    `tasks` contiene solo la ventana inicial de la lista (ver windowed_lists());
+    `task_count` es el total, y el resto se pide a /api/lists/{id}/tasks/?after=.
+    `last_position` es la posición de la última tarea aunque no esté en la
+    ventana: una tarea nueva al final va después de ella.
+    """
     tasks = TaskSerializer(many=True, read_only=True)
+    task_count = serializers.SerializerMethodField()
+    last_position = serializers.SerializerMethodField()
 
     class Meta:
         model = List
-        fields = ['id', 'board', 'title', 'position', 'tasks', 'created_at', 'updated_at']
+        fields = ['id', 'board', 'title', 'position', 'tasks', 'task_count', 'last_position', 'created_at', 'updated_at']
+
+    def get_task_count(self, obj):
+        if hasattr(obj, 'task_count'):
+            return obj.task_count
+        return obj.tasks.count()
+
+    def get_last_position(self, obj):
+        if hasattr(obj, 'last_position'):
+            position = obj.last_position
+        else:
+            position = obj.tasks.order_by('-position').values_list('position', flat=True).first()
+        return None if position is None else f'{position:.5f}'
 
 class BoardMemberSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField(source='user.id')
@@ -36,17 +67,216 @@ class BoardMemberSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'role']
 
 class BoardSerializer(serializers.ModelSerializer):
+    """
+    `members` no es la lista completa: solo los miembros con tareas asignadas,
+    los conectados al tablero y quien hace la petición. `member_count` es el
+    total y el directorio completo está en /api/boards/{id}/members/.
+    `version` es la de los eventos WebSocket: el cliente aplica a partir de
+    ella los eventos version + 1, version + 2...
+    """
     lists = ListSerializer(many=True, read_only=True)
     owner = UserSerializer(read_only=True)
-    members = BoardMemberSerializer(source='board_members', many=True, read_only=True)
+    members = serializers.SerializerMethodField()
+    member_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Board
-        fields = ['id', 'name', 'description', 'owner', 'members', 'lists', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'description', 'is_template', 'owner', 'members', 'member_count', 'version', 'lists', 'created_at', 'updated_at']
+
+    def get_members(self, obj):
+        return BoardMemberSerializer(active_members(obj, _viewer_id(self.context)), many=True).data
+
+    def get_member_count(self, obj):
+        return member_count(obj)
 
 class ActivityLogSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = ActivityLog
-        fields = ['id', 'user', 'action', 'timestamp', 'content_type', 'object_id']
+        fields = ['id', 'user', 'action', 'timestamp', 'content_type', 'object_id', 'count', 'object_ids']
+
+class NotificationSerializer(serializers.ModelSerializer):
+    actor = serializers.ReadOnlyField(source='actor.username', default=None)
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'kind', 'board_id', 'task_id', 'actor', 'message', 'created_at', 'read_at']
+
+
+def windowed_tasks(queryset, size=None):
+    """
+    Filtra el queryset a las primeras `size` tareas de cada lista por (position, id).
+    """
+    size = size or settings.BOARD_TASKS_PER_LIST
+    return queryset.annotate(
+        list_rank=Window(RowNumber(), partition_by=[F('list_id')], order_by=[F('position'), F('id')])
+    ).filter(list_rank__lte=size)
+
+
+def windowed_lists(queryset):
+    """
+    Anota el total de tareas y la última posición de cada lista y precarga
+    solo las primeras BOARD_TASKS_PER_LIST de cada una.
+    """
+    window = windowed_tasks(Task.objects.prefetch_related('assigned_to')).order_by('position', 'id')
+    return queryset.annotate(task_count=Count('tasks'), last_position=Max('tasks__position')).prefetch_related(
+        Prefetch('tasks', queryset=window)
+    )
+
+
+def _viewer_id(context):
+    request = context.get('request')
+    return getattr(getattr(request, 'user', None), 'id', None)
+
+
+def _online_usernames(board_id=None):
+    # Solo las conexiones de este worker (consumers.connected_users): con varios
+    # workers un conectado a otro proceso no cuenta como "online" aquí
+    from .consumers import connected_users  # consumers importa snapshots, que importa este módulo
+
+    if board_id is not None:
+        return set(connected_users.get(f'board_{board_id}', ()))
+    return set().union(*connected_users.values())
+
+
+def active_members_queryset(viewer_id=None, online=None):
+    """
+    Miembros que viajan en el payload del tablero: con alguna tarea asignada
+    (contador 'assignee' de BoardStat), conectados (`online`, por defecto los
+    de cualquier tablero de este worker) o el propio `viewer_id`.
+
+    La presencia es local al worker que sirve el request, así que con varios
+    workers la lista es un subconjunto. Los clientes no dependen de ella para
+    saber quién está conectado: eso llega por WebSocket (present_users y
+    presence_changed, que sí pasan por el channel layer); aquí solo decide
+    qué miembros se incluyen en el payload sin pedir /members/.
+    """
+    if online is None:
+        online = _online_usernames()
+    assigned = BoardStat.objects.filter(
+        board_id=OuterRef('board_id'), dimension='assignee', day__isnull=True,
+        key=Cast(OuterRef('user_id'), CharField()), count__gt=0,
+    )
+    return BoardMember.objects.annotate(is_assigned=Exists(assigned)).filter(
+        Q(is_assigned=True) | Q(username__in=online) | Q(user_id=viewer_id)
+    ).select_related('user').order_by('username', 'user_id')
+
+
+def active_members(board, viewer_id=None):
+    if hasattr(board, 'active_members'):
+        # La precarga cubre a los conectados de cualquier tablero: se acota a este
+        online = _online_usernames(board.id)
+        return [
+            member for member in board.active_members
+            if member.is_assigned or member.username in online or member.user_id == viewer_id
+        ]
+    queryset = active_members_queryset(viewer_id, _online_usernames(board.id))
+    return list(queryset.using(board_db(board.id)).filter(board_id=board.id))
+
+
+def member_count(board):
+    if hasattr(board, 'member_stats'):
+        return sum(stat.count for stat in board.member_stats)
+    stats = BoardStat.objects.using(board_db(board.id)).filter(board_id=board.id, dimension='member', day__isnull=True)
+    return stats.values_list('count', flat=True).first() or 0
+
+
+def board_snapshot_prefetches(viewer_id=None):
+    return (
+        Prefetch('lists', queryset=windowed_lists(List.objects.all())),
+        Prefetch('board_members', queryset=active_members_queryset(viewer_id), to_attr='active_members'),
+        Prefetch('stats', queryset=BoardStat.objects.filter(dimension='member', day__isnull=True), to_attr='member_stats'),
+    )
+
+
+def with_board_snapshot(queryset, viewer_id=None):
+    """
+    Precargas que necesita BoardSerializer (snapshot REST y WebSocket).
+    """
+    return queryset.select_related('owner').prefetch_related(*board_snapshot_prefetches(viewer_id))
+
+
+def _epoch(value):
+    return int(value.timestamp()) if value else None
+
+
+class CompactBoardSerializer(serializers.BaseSerializer):
+    """
+    Representación compacta y normalizada de un tablero (solo lectura).
+
+    - Los usuarios aparecen una sola vez en `users` ({id: [username, email]})
+      y el resto del payload los referencia por id.
+    - Listas y tareas van por columnas: {"id": [...], "title": [...], ...}.
+    - Posiciones como números, fechas como epoch en segundos y la prioridad
+      como índice en `priorities`.
+    - Los campos pesados de las tareas (description, created_at, updated_at)
+      solo se incluyen si se piden en context['include'].
+    - Igual que el snapshot normal, solo viajan las primeras
+      BOARD_TASKS_PER_LIST tareas de cada lista; `lists.task_count` da el total.
+    - `members` son los mismos miembros activos que en el snapshot normal,
+      como [user_id, role]; `member_count` es el total.
+    """
+    OPTIONAL_TASK_FIELDS = ('description', 'created_at', 'updated_at')
+    PRIORITIES = [value for value, _ in Task.PRIORITY_CHOICES]
+    PRIORITY_INDEX = {value: index for index, value in enumerate(PRIORITIES)}
+    # Índice para valores fuera de PRIORITY_CHOICES (p. ej. datos antiguos)
+    DEFAULT_PRIORITY = PRIORITY_INDEX[Task._meta.get_field('priority').default]
+
+    def to_representation(self, board):
+        include = [field for field in self.context.get('include', ()) if field in self.OPTIONAL_TASK_FIELDS]
+
+        lists = {'id': [], 'title': [], 'position': [], 'task_count': []}
+        rows = board.lists.annotate(task_count=Count('tasks')).order_by('position', 'id')
+        for list_id, title, position, task_count in rows.values_list('id', 'title', 'position', 'task_count'):
+            lists['id'].append(list_id)
+            lists['title'].append(title)
+            lists['position'].append(float(position))
+            lists['task_count'].append(task_count)
+
+        window = windowed_tasks(Task.objects.filter(board=board))
+        assigned = {}
+        through = Task.assigned_to.through.objects.filter(task__in=window.values('id'))
+        for task_id, user_id in through.values_list('task_id', 'user_id').iterator():
+            assigned.setdefault(task_id, []).append(user_id)
+
+        columns = ['id', 'list', 'title', 'position', 'due_date', 'priority', 'assigned_to'] + include
+        tasks = {column: [] for column in columns}
+        rows = window.order_by('list_id', 'position', 'id').values_list(
+            'id', 'list_id', 'title', 'position', 'due_date', 'priority', *include
+        )
+        for task_id, list_id, title, position, due_date, priority, *extra in rows.iterator():
+            tasks['id'].append(task_id)
+            tasks['list'].append(list_id)
+            tasks['title'].append(title)
+            tasks['position'].append(float(position))
+            tasks['due_date'].append(_epoch(due_date))
+            tasks['priority'].append(self.PRIORITY_INDEX.get(priority, self.DEFAULT_PRIORITY))
+            tasks['assigned_to'].append(assigned.get(task_id, []))
+            for column, value in zip(include, extra):
+                tasks[column].append(value if column == 'description' else _epoch(value))
+
+        members = [(member.user_id, member.role) for member in active_members(board, _viewer_id(self.context))]
+        user_ids = {board.owner_id} | {user_id for user_id, _ in members}
+        for ids in assigned.values():
+            user_ids.update(ids)
+        users = {
+            user_id: [username, email]
+            for user_id, username, email in User.objects.filter(id__in=user_ids).values_list('id', 'username', 'email')
+        }
+
+        return {
+            'format': 'compact/1',
+            'id': board.id,
+            'name': board.name,
+            'description': board.description,
+            'owner': board.owner_id,
+            'created_at': _epoch(board.created_at),
+            'updated_at': _epoch(board.updated_at),
+            'priorities': self.PRIORITIES,
+            'users': users,
+            'members': members,
+            'member_count': member_count(board),
+            'lists': lists,
+            'tasks': tasks,
+        }
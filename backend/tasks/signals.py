@@ -1,9 +1,66 @@
-from django.db.models.signals import post_save, post_delete
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.contenttypes.models import ContentType
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from .models import Board, Task, List, ActivityLog
+from .db_routers import copy_rows, each_shard
+from .models import Board, BoardMember, Task, List, ActivityLog
+from .permissions import invalidate_board_roles
+from . import history, stats
+from .events import broadcast
+
+User = get_user_model()
+
+
+# Permite a quien ya registra la actividad y notifica por su cuenta
+# (vistas async, importaciones masivas) desactivar los handlers de este módulo.
+_muted = ContextVar('signals_muted', default=False)
+
+
+# Listas y tableros cuyo borrado está en curso en este contexto. Las tareas
+# borradas en cascada se agrupan en un único evento por lista.
+_cascade = ContextVar('cascade_deletes', default=None)
+
+
+def _cascade_state():
+    state = _cascade.get()
+    if state is None:
+        state = {'lists': {}, 'boards': set()}
+        _cascade.set(state)
+    return state
+
+
+@contextmanager
+def mute_signals():
+    """
+    Desactiva los handlers de actividad/WebSocket dentro del bloque.
+    Se propaga a los hilos de sync_to_async (p.ej. Model.asave()).
+    """
+    token = _muted.set(True)
+    try:
+        yield
+    finally:
+        _muted.reset(token)
+
+
+def task_payload(instance):
+    """
+    Representación de una Task que viaja en los eventos WebSocket.
+    Solo usa columnas propias de la tarea, sin consultas adicionales.
+    """
+    return {
+        'id': instance.id,
+        'title': instance.title,
+        'description': instance.description,
+        'list_id': instance.list_id,
+        'position': str(instance.position),
+        'due_date': instance.due_date.isoformat() if instance.due_date else None,
+        'priority': instance.priority,
+    }
 
 
 @receiver(post_save, sender=Board)
@@ -12,6 +69,9 @@ def log_board_activity(sender, instance, created, **kwargs):
     Registra automáticamente la creación o actualización de un Board
     y envía notificación WebSocket.
     """
+    if _muted.get():
+        return
+
     if created:
         action = f"Board '{instance.name}' created"
     else:
@@ -26,18 +86,14 @@ def log_board_activity(sender, instance, created, **kwargs):
     
     # Enviar notificación WebSocket si no es creación (evitar notificar antes de que exista el grupo)
     if not created:
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f'board_{instance.id}',
-            {
-                'type': 'board_updated',
-                'board': {
-                    'id': instance.id,
-                    'name': instance.name,
-                    'description': instance.description,
-                }
+        broadcast(instance.id, {
+            'type': 'board_updated',
+            'board': {
+                'id': instance.id,
+                'name': instance.name,
+                'description': instance.description,
             }
-        )
+        })
 
 
 @receiver(post_save, sender=Task)
@@ -46,8 +102,15 @@ def log_task_activity(sender, instance, created, **kwargs):
     Registra automáticamente la creación o actualización de una Task
     y envía notificación WebSocket.
     """
+    if _muted.get():
+        return
+
     if created:
-        action = f"Task '{instance.title}' created in list '{instance.list.title}'"
+        # El título de la lista solo si ya está cargada (la crea el serializer)
+        if Task.list.is_cached(instance):
+            action = f"Task '{instance.title}' created in list '{instance.list.title}'"
+        else:
+            action = f"Task '{instance.title}' created"
         event_type = 'task_created'
     else:
         action = f"Task '{instance.title}' updated"
@@ -64,23 +127,10 @@ def log_task_activity(sender, instance, created, **kwargs):
     )
     
     # Enviar notificación WebSocket al grupo del tablero
-    channel_layer = get_channel_layer()
-    board_id = instance.list.board.id
-    
-    async_to_sync(channel_layer.group_send)(
-        f'board_{board_id}',
-        {
-            'type': event_type,
-            'task': {
-                'id': instance.id,
-                'title': instance.title,
-                'description': instance.description,
-                'list_id': instance.list.id,
-                'position': str(instance.position),
-                'due_date': instance.due_date.isoformat() if instance.due_date else None,
-            }
-        }
-    )
+    broadcast(instance.board_id, {
+        'type': event_type,
+        'task': task_payload(instance)
+    })
 
 
 @receiver(post_save, sender=List)
@@ -89,6 +139,9 @@ def log_list_activity(sender, instance, created, **kwargs):
     Registra automáticamente la creación o actualización de una List
     y envía notificación WebSocket.
     """
+    if _muted.get():
+        return
+
     if created:
         action = f"List '{instance.title}' created in board '{instance.board.name}'"
         event_type = 'list_created'
@@ -104,20 +157,32 @@ def log_list_activity(sender, instance, created, **kwargs):
     )
     
     # Enviar notificación WebSocket al grupo del tablero
-    channel_layer = get_channel_layer()
-    
-    async_to_sync(channel_layer.group_send)(
-        f'board_{instance.board.id}',
-        {
-            'type': event_type,
-            'list': {
-                'id': instance.id,
-                'title': instance.title,
-                'board_id': instance.board.id,
-                'position': str(instance.position),
-            }
+    broadcast(instance.board_id, {
+        'type': event_type,
+        'list': {
+            'id': instance.id,
+            'title': instance.title,
+            'board_id': instance.board_id,
+            'position': str(instance.position),
         }
-    )
+    })
+
+
+@receiver(pre_delete, sender=Board)
+def start_board_cascade(sender, instance, **kwargs):
+    """
+    Marca el tablero como en borrado: sus listas y tareas no emiten eventos propios.
+    """
+    _cascade_state()['boards'].add(instance.id)
+
+
+@receiver(pre_delete, sender=List)
+def start_list_cascade(sender, instance, **kwargs):
+    """
+    Marca la lista como en borrado; las tareas que caigan en cascada se acumulan
+    aquí y se notifican juntas en log_list_deletion.
+    """
+    _cascade_state()['lists'][instance.id] = []
 
 
 @receiver(post_delete, sender=Board)
@@ -125,6 +190,10 @@ def log_board_deletion(sender, instance, **kwargs):
     """
     Registra la eliminación de un Board.
     """
+    _cascade_state()['boards'].discard(instance.id)
+    if _muted.get():
+        return
+
     ActivityLog.objects.create(
         user=instance.owner,
         action=f"Board '{instance.name}' deleted",
@@ -138,8 +207,16 @@ def log_task_deletion(sender, instance, **kwargs):
     """
     Registra la eliminación de una Task y envía notificación WebSocket.
     """
-    board_id = instance.list.board.id
-    
+    if _muted.get():
+        return
+
+    cascade = _cascade_state()
+    if instance.board_id in cascade['boards']:
+        return
+    if instance.list_id in cascade['lists']:
+        cascade['lists'][instance.list_id].append(instance.id)
+        return
+
     ActivityLog.objects.create(
         user=None,  # Puedes modificar esto para obtener el usuario del contexto
         action=f"Task '{instance.title}' deleted",
@@ -148,12 +225,164 @@ def log_task_deletion(sender, instance, **kwargs):
     )
     
     # Enviar notificación WebSocket al grupo del tablero
-    channel_layer = get_channel_layer()
-    
-    async_to_sync(channel_layer.group_send)(
-        f'board_{board_id}',
-        {
-            'type': 'task_deleted',
-            'task_id': instance.id
-        }
-    )
+    broadcast(instance.board_id, {
+        'type': 'task_deleted',
+        'task_id': instance.id
+    })
+
+
+@receiver(post_delete, sender=List)
+def log_list_deletion(sender, instance, **kwargs):
+    """
+    Envía un único evento con la lista y todas las tareas borradas en cascada.
+    """
+    cascade = _cascade_state()
+    task_ids = cascade['lists'].pop(instance.id, [])
+    if instance.board_id in cascade['boards']:
+        return
+    # Las tareas en cascada no actualizan contadores una a una
+    stats.rebuild_board_stats(instance.board_id)
+    if _muted.get():
+        return
+
+    broadcast(instance.board_id, {
+        'type': 'list_deleted',
+        'list_id': instance.id,
+        'task_ids': task_ids
+    })
+
+
+def _invalidate_roles(user_id, using):
+    """
+    Sube la versión de los roles ahora, para quien lee dentro de la misma
+    transacción, y otra vez al confirmar: un worker que leyó del primario
+    entre medias habrá guardado los roles antiguos bajo la versión nueva.
+    """
+    invalidate_board_roles(user_id)
+    transaction.on_commit(lambda: invalidate_board_roles(user_id), using=using)
+
+
+@receiver(post_save, sender=BoardMember)
+@receiver(post_delete, sender=BoardMember)
+def invalidate_member_roles(sender, instance, using, **kwargs):
+    """
+    Los roles cacheados del usuario dejan de valer en cuanto cambia su membresía.
+    No se silencia con mute_signals(): la caché tiene que quedar coherente.
+    """
+    _invalidate_roles(instance.user_id, using)
+
+
+@receiver(post_save, sender=Board)
+@receiver(post_delete, sender=Board)
+def invalidate_owner_roles(sender, instance, using, **kwargs):
+    _invalidate_roles(instance.owner_id, using)
+
+
+@receiver(post_save, sender=User)
+def invalidate_new_user_roles(sender, instance, created, using, **kwargs):
+    # Un id puede reutilizarse (p. ej. tras un rollback): no hereda roles cacheados
+    if created:
+        _invalidate_roles(instance.id, using)
+
+
+# Tablas de referencia: usuarios y tableros se escriben en 'default' y se
+# copian a cada shard (ver tasks/db_routers.py). Tampoco se silencian.
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Board)
+def replicate_reference_row(sender, instance, using, **kwargs):
+    if using in settings.DATABASE_SHARDS:
+        return
+    for alias in settings.DATABASE_SHARDS:
+        copy_rows(sender, [instance], alias)
+
+
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Board)
+def delete_reference_row(sender, instance, using, **kwargs):
+    """
+    Borra la copia de cada shard, y con ella en cascada las filas del shard
+    que dependen de ella (listas y tareas del tablero, membresías del usuario...).
+    """
+    if using in settings.DATABASE_SHARDS:
+        return
+    with mute_signals():
+        for alias in settings.DATABASE_SHARDS:
+            sender._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+
+@receiver(post_save, sender=Board)
+def checkpoint_new_board(sender, instance, created, **kwargs):
+    """
+    Primer checkpoint del historial (ver tasks/history.py). Va después de
+    replicate_reference_row: con sharding el tablero ya está en su shard.
+    Con las señales silenciadas (clonado, dataset) lo hace quien crea el tablero.
+    """
+    if created and not _muted.get():
+        history.checkpoint(instance.id, instance.version)
+
+
+# Contadores de BoardStat (tasks/stats.py). No se silencian con mute_signals():
+# las vistas async también los necesitan. Los borrados en cascada o por
+# queryset no los tocan fila a fila; quien los lanza reconstruye el tablero.
+
+@receiver(post_save, sender=Task)
+def update_task_stats(sender, instance, created, **kwargs):
+    if created:
+        stats.task_created(instance)
+    else:
+        stats.task_changed(instance)
+
+
+@receiver(pre_delete, sender=Task)
+def remember_task_assignees(sender, instance, origin=None, **kwargs):
+    if origin is instance:
+        instance._assignee_ids = list(instance.assigned_to.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Task)
+def update_deleted_task_stats(sender, instance, origin=None, **kwargs):
+    if origin is instance:
+        stats.task_deleted(instance, getattr(instance, '_assignee_ids', []))
+
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def update_assignee_stats(sender, instance, action, reverse, pk_set, using, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    delta = 1 if action == 'post_add' else -1
+    if not reverse:
+        user_ids = instance.assigned_to.values_list('id', flat=True) if action == 'pre_clear' else pk_set
+        stats.assignees_changed(instance.board_id, list(user_ids), delta)
+        return
+    # user.assigned_tasks.add(...): instance es el usuario y pk_set son tareas
+    tasks = Task.objects.using(using)
+    tasks = tasks.filter(assigned_to=instance) if action == 'pre_clear' else tasks.filter(pk__in=pk_set)
+    for board_id in tasks.values_list('board_id', flat=True):
+        stats.assignees_changed(board_id, [instance.pk], delta)
+
+
+@receiver(post_save, sender=BoardMember)
+def count_new_member(sender, instance, created, **kwargs):
+    if created:
+        stats.members_changed(instance.board_id, 1)
+
+
+@receiver(post_delete, sender=BoardMember)
+def count_removed_member(sender, instance, origin=None, **kwargs):
+    # En el borrado de un tablero el contador cae con él
+    if not (isinstance(origin, Board) or getattr(origin, 'model', None) is Board):
+        stats.members_changed(instance.board_id, -1)
+
+
+@receiver(post_save, sender=User)
+def sync_member_username(sender, instance, created, using, **kwargs):
+    """
+    Mantiene BoardMember.username (copia para el directorio de miembros).
+    """
+    if created or using in settings.DATABASE_SHARDS:
+        return
+    for alias in each_shard():
+        BoardMember.objects.using(alias).filter(user_id=instance.pk).exclude(
+            username=instance.username
+        ).update(username=instance.username)
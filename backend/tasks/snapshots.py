@@ -0,0 +1,66 @@
+"""
+Snapshot del tablero para el primer frame del WebSocket.
+
+El snapshot se guarda ya renderizado a JSON en la caché por (tablero,
+formato, versión): se serializa una vez, se envía tal cual a cada cliente
+y deja de usarse en cuanto llega un evento nuevo. Sin CACHES en settings la
+caché es LocMem y cada worker tiene la suya; solo se comparte entre workers
+si CACHES apunta a una caché común (Redis, Memcached).
+Dentro de un worker, las conexiones que piden la misma versión a la vez
+esperan una única carga (single-flight) en lugar de lanzar una cada una.
+"""
+import asyncio
+import json
+
+from channels.db import database_sync_to_async
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .db_routers import use_board_shard, use_primary
+from .models import Board
+from .serializers import BoardSerializer, CompactBoardSerializer, with_board_snapshot
+
+SNAPSHOT_CACHE_SECONDS = 60
+FORMATS = ('full', 'compact')
+
+_inflight = {}
+
+
+def _render(board_id, fmt, version, tagged):
+    with use_primary(), use_board_shard(board_id):
+        if fmt == 'compact':
+            data = CompactBoardSerializer(Board.objects.get(pk=board_id)).data
+        else:
+            data = BoardSerializer(with_board_snapshot(Board.objects.filter(pk=board_id)).get()).data
+    header = {'board_id': board_id} if tagged else {}
+    header = json.dumps({**header, 'type': 'snapshot', 'format': fmt, 'version': version})
+    return f'{header[:-1]}, "board": {JSONRenderer().render(data).decode()}}}'
+
+
+async def _load(key, board_id, fmt, version, tagged):
+    frame = await database_sync_to_async(_render)(board_id, fmt, version, tagged)
+    await cache.aset(key, frame, SNAPSHOT_CACHE_SECONDS)
+    return frame
+
+
+async def board_snapshot(board_id, fmt='full', tagged=False):
+    """
+    Devuelve el frame {"type": "snapshot", "format": ..., "version": N, "board": ...}
+    como texto JSON. Con `tagged` el frame empieza por "board_id" (el de
+    MultiBoardConsumer) y se cachea aparte.
+
+    La versión se lee antes que los datos: el snapshot puede incluir cambios
+    de eventos posteriores a N, pero nunca le falta uno anterior. Como los
+    eventos llevan el estado completo del objeto, reaplicarlos es inocuo.
+    """
+    version = await Board.objects.using('default').filter(pk=board_id).values_list('version', flat=True).afirst()
+    key = f'board-snapshot:{board_id}:{fmt}:{version}' + (':tagged' if tagged else '')
+    frame = await cache.aget(key)
+    if frame is None:
+        task = _inflight.get(key)
+        if task is None:
+            task = _inflight[key] = asyncio.ensure_future(_load(key, board_id, fmt, version, tagged))
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        # shield: si esta conexión se cierra, la carga sigue para las demás
+        frame = await asyncio.shield(task)
+    return frame
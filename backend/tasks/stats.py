@@ -0,0 +1,116 @@
+"""
+Estadísticas de tablero mantenidas de forma incremental en BoardStat.
+
+Las señales de Task, de sus asignaciones y de BoardMember suman y restan
+contadores con UPDATE ... SET count = count + n; las operaciones masivas
+(borrado en cascada, importación, archivado, clonado) reconstruyen los
+contadores del tablero con rebuild_board_stats(). El throughput ('moved') es
+histórico y no se reconstruye. Los vencidos dependen de la hora, así que se
+cuentan al vuelo con el índice (board, due_date).
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .db_routers import board_db
+from .models import BoardMember, BoardStat, Task
+
+REBUILT_DIMENSIONS = ('list', 'priority', 'assignee', 'member')
+
+
+def bump(board_id, dimension, key, delta=1, day=None):
+    db = board_db(board_id)
+    rows = BoardStat.objects.using(db).filter(board_id=board_id, dimension=dimension, key=str(key), day=day)
+    if not rows.update(count=F('count') + delta):
+        BoardStat.objects.using(db).bulk_create(
+            [BoardStat(board_id=board_id, dimension=dimension, key=str(key), day=day)], ignore_conflicts=True
+        )
+        rows.update(count=F('count') + delta)
+
+
+def task_created(task):
+    bump(task.board_id, 'list', task.list_id)
+    bump(task.board_id, 'priority', task.priority)
+
+
+def task_changed(task):
+    """
+    Compara la tarea guardada con los valores que se leyeron de la BD.
+    """
+    old_board = task.loaded_value('board_id')
+    old_list = task.loaded_value('list_id')
+    old_priority = task.loaded_value('priority')
+    board_changed = old_board is not None and old_board != task.board_id
+    if old_list is not None and old_list != task.list_id:
+        bump(old_board, 'list', old_list, -1)
+        bump(task.board_id, 'list', task.list_id)
+        bump(task.board_id, 'moved', task.list_id, day=timezone.localdate())
+    if old_priority is not None and (board_changed or old_priority != task.priority):
+        bump(old_board, 'priority', old_priority, -1)
+        bump(task.board_id, 'priority', task.priority)
+    if board_changed:
+        assignee_ids = list(task.assigned_to.values_list('id', flat=True))
+        assignees_changed(old_board, assignee_ids, -1)
+        assignees_changed(task.board_id, assignee_ids, 1)
+
+
+def task_deleted(task, assignee_ids):
+    bump(task.board_id, 'list', task.list_id, -1)
+    bump(task.board_id, 'priority', task.priority, -1)
+    assignees_changed(task.board_id, assignee_ids, -1)
+
+
+def assignees_changed(board_id, user_ids, delta):
+    for user_id in user_ids:
+        bump(board_id, 'assignee', user_id, delta)
+
+
+def members_changed(board_id, delta):
+    bump(board_id, 'member', '', delta)
+
+
+def rebuild_board_stats(board_id):
+    """
+    Recalcula desde cero los contadores de listas, prioridades, asignados y miembros.
+    """
+    db = board_db(board_id)
+    tasks = Task.objects.using(db).filter(board_id=board_id).order_by()
+    rows = [
+        BoardStat(board_id=board_id, dimension='list', key=str(list_id), count=count)
+        for list_id, count in tasks.values_list('list_id').annotate(count=Count('id'))
+    ] + [
+        BoardStat(board_id=board_id, dimension='priority', key=priority, count=count)
+        for priority, count in tasks.values_list('priority').annotate(count=Count('id'))
+    ] + [
+        BoardStat(board_id=board_id, dimension='assignee', key=str(user_id), count=count)
+        for user_id, count in Task.assigned_to.through.objects.using(db).filter(task__board_id=board_id).order_by()
+        .values_list('user_id').annotate(count=Count('id'))
+    ] + [
+        BoardStat(board_id=board_id, dimension='member', key='',
+                  count=BoardMember.objects.using(db).filter(board_id=board_id).count())
+    ]
+    with transaction.atomic(using=db):
+        BoardStat.objects.using(db).filter(board_id=board_id, dimension__in=REBUILT_DIMENSIONS).delete()
+        BoardStat.objects.using(db).bulk_create(rows)
+
+
+def board_stats(board, days=14):
+    """
+    Respuesta de /api/boards/{id}/stats/.
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    result = {'lists': {}, 'priorities': {}, 'assignees': {}, 'throughput': {}, 'members': 0}
+    dimensions = {'list': 'lists', 'priority': 'priorities', 'assignee': 'assignees'}
+    db = board_db(board.id)
+    stats = BoardStat.objects.using(db).filter(board=board).exclude(dimension='moved', day__lt=since)
+    for dimension, key, day, count in stats.values_list('dimension', 'key', 'day', 'count'):
+        if dimension == 'moved':
+            result['throughput'].setdefault(key, {})[day.isoformat()] = count
+        elif dimension == 'member':
+            result['members'] = count
+        elif count:
+            result[dimensions[dimension]][key] = count
+    result['overdue'] = Task.objects.using(db).filter(board=board, due_date__lt=timezone.now()).count()
+    return result
@@ -1,3 +1,1370 @@
-from django.test import TestCase
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.db.utils import ConnectionHandler
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .admin import estimate_row_count
+from .admission import admission
+from .activity import log_task_update
+from .archive import archive_tasks, restore_tasks
+from .backends.sqlite3.base import writer_queue
+from .models import ActivityLog, ArchivedTask, Board, BoardCheckpoint, BoardMember, List, Notification, Task
+from .consumers import BoardConsumer, CLOSE_FORBIDDEN, CLOSE_OVERLOADED
+from .db_routers import ShardNotSelected, prepare_shard, shard_for_board, shard_for_id, use_board_shard
+from .history import record
+from .middleware import PIN_HEADER, QueryStringJWTAuthMiddleware
+from .notifications import deliver, mark_read, trim_notifications, unread_count, user_group
+from .permissions import board_roles
+from .profiling import profile_path, profile_token, recent_profiles
+from .routing import websocket_urlpatterns
+from .serializers import with_board_snapshot
+from .signals import mute_signals
+from .views import BoardViewSet
+from .warmup import STARTUP, STEPS, warm_up
+
+User = get_user_model()
+
+
+def websocket_app():
+    return QueryStringJWTAuthMiddleware(URLRouter(websocket_urlpatterns))
+
+
+def board_path(board, user):
+    return f'/ws/board/{board.id}/?token={RefreshToken.for_user(user).access_token}'
+
+
+async def drain(communicator):
+    """Descarta los mensajes de presencia que llegan al conectar."""
+    while not await communicator.receive_nothing(timeout=settings.BOARD_CONSUMER['PRESENCE_DEBOUNCE'] + 0.1):
+        await communicator.receive_output()
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'], REPLICA_PIN_SECONDS=60)
+class ReplicaRoutingTests(TestCase):
+    """
+    Las réplicas son ficheros SQLite independientes sin replicación, así que un
+    dato escrito solo en el primario es "lag" visible desde las réplicas.
+    """
+    databases = {'default', 'replica_1', 'replica_2'}
+
+    def setUp(self):
+        cache.clear()
+        # El usuario existe en todas las bases (ya replicado)
+        for alias in ['default', 'replica_1', 'replica_2']:
+            self.user = User.objects.db_manager(alias).create_user(id=1, username='ana', password='x')
+        self.board = Board.objects.create(name='Primario', owner=self.user)
+        self.client = APIClient()
+        access = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_safe_reads_go_to_replica(self):
+        response = self.client.get(f'/api/boards/{self.board.id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_writes_go_to_primary(self):
+        response = self.client.post('/api/lists/', {'board': self.board.id, 'title': 'Todo'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(List.objects.using('default').filter(title='Todo').exists())
+        self.assertFalse(List.objects.using('replica_1').exists())
+        self.assertFalse(List.objects.using('replica_2').exists())
+
+    def test_reads_stick_to_primary_after_write(self):
+        self.client.post('/api/lists/', {'board': self.board.id, 'title': 'Todo'}, format='json')
+        response = self.client.get(f'/api/boards/{self.board.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([l['title'] for l in response.data['lists']], ['Todo'])
+
+    def test_pin_is_per_user(self):
+        self.client.post('/api/lists/', {'board': self.board.id, 'title': 'Todo'}, format='json')
+        other = APIClient()
+        for alias in ['default', 'replica_1', 'replica_2']:
+            bob = User.objects.db_manager(alias).create_user(id=2, username='bob', password='x')
+        other.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(bob).access_token}')
+        self.assertEqual(other.get(f'/api/boards/{self.board.id}/').status_code, 404)
+
+    def test_pin_travels_with_the_client(self):
+        response = self.client.post('/api/lists/', {'board': self.board.id, 'title': 'Todo'}, format='json')
+        pin = response[PIN_HEADER]
+        # Otro worker, sin caché compartida: basta con la marca firmada
+        cache.clear()
+        self.client.cookies.clear()
+        self.assertEqual(self.client.get(f'/api/boards/{self.board.id}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/boards/{self.board.id}/', HTTP_X_DB_PIN=pin).status_code, 200)
+        self.assertEqual(self.client.get(f'/api/boards/{self.board.id}/', HTTP_X_DB_PIN=pin + 'x').status_code, 404)
+
+
+class AsyncTaskViewTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+        self.todo = List.objects.create(board=self.board, title='Todo')
+        self.done = List.objects.create(board=self.board, title='Done', position=1)
+        access = RefreshToken.for_user(self.user).access_token
+        self.auth = {'headers': {'Authorization': f'Bearer {access}'}}
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.post('/api/async/tasks/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+    async def test_create_update_and_move(self):
+        response = await self.async_client.post(
+            '/api/async/tasks/',
+            {'list': self.todo.id, 'title': 'Write docs', 'assigned_to_ids': [self.user.id]},
+            content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, 201)
+        task = response.json()
+        self.assertEqual([u['username'] for u in task['assigned_to']], ['ana'])
+
+        response = await self.async_client.patch(
+            f"/api/async/tasks/{task['id']}/", {'title': ''}, content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('title', response.json())
+
+        response = await self.async_client.post(
+            f"/api/async/tasks/{task['id']}/move/", {'list': self.done.id, 'position': '2'},
+            content_type='application/json', **self.auth
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['list'], self.done.id)
+        log = await ActivityLog.objects.select_related('user').afirst()
+        self.assertEqual(log.action, "moved task 'Write docs' to 'Done'")
+        self.assertEqual(log.user, self.user)
+
+
+class BoardTransferTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.source = Board.objects.create(name='Source', owner=self.user)
+        todo = List.objects.create(board=self.source, title='Todo')
+        for i in range(3):
+            task = Task.objects.create(list=todo, title=f'Task {i}', position=i)
+            task.assigned_to.add(self.user)
+        self.target = Board.objects.create(name='Target', owner=self.user)
+        access = RefreshToken.for_user(self.user).access_token
+        self.auth = {'headers': {'Authorization': f'Bearer {access}'}}
+
+    async def test_export_then_import_round_trip(self):
+        response = await self.async_client.get(f'/api/boards/{self.source.id}/export/?activity=1', **self.auth)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        types = [json.loads(line)['type'] for line in body.splitlines()]
+        self.assertEqual(types[:6], ['board', 'list', 'task', 'task', 'task', 'assignment'])
+        self.assertIn('activity', types)
+
+        response = await self.async_client.post(
+            f'/api/boards/{self.target.id}/import/', body, content_type='application/x-ndjson', **self.auth
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'lists': 1, 'tasks': 3, 'assignments': 3, 'skipped': 0})
+        titles = [t async for t in Task.objects.filter(list__board=self.target).values_list('title', flat=True)]
+        self.assertEqual(titles, ['Task 0', 'Task 1', 'Task 2'])
+
+    async def test_import_rejects_malformed_line(self):
+        response = await self.async_client.post(
+            f'/api/boards/{self.target.id}/import/', b'{"type": "list"\n', content_type='application/x-ndjson', **self.auth
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(await List.objects.filter(board=self.target).aexists())
+
+    async def test_import_rejects_invalid_records_with_line_number(self):
+        header = '{"type": "board"}\n{"type": "list", "id": 1, "title": "Todo"}\n'
+        invalid = [
+            '[]',
+            '1',
+            '"x"',
+            '{"type": "list", "id": 2, "title": ""}',
+            json.dumps({'type': 'task', 'id': 1, 'list': 1, 'title': 'x' * 256}),
+            '{"type": "task", "id": 1, "list": 1, "title": "Task", "priority": "urgent"}',
+        ]
+        for line in invalid:
+            with self.subTest(line=line[:40]):
+                response = await self.async_client.post(
+                    f'/api/boards/{self.target.id}/import/', (header + line + '\n').encode(),
+                    content_type='application/x-ndjson', **self.auth
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertTrue(response.json()['detail'].startswith('line 3:'))
+        self.assertFalse(await List.objects.filter(board=self.target).aexists())
+
+
+@override_settings(BOARD_CONSUMER={
+    **settings.BOARD_CONSUMER, 'INBOUND_RATE': 1, 'INBOUND_BURST': 2, 'INBOUND_MAX_STRIKES': 3,
+})
+class BoardConsumerLimitsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+
+    async def connect(self):
+        communicator = WebsocketCommunicator(websocket_app(), board_path(self.board, self.user))
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await drain(communicator)
+        return communicator
+
+    async def test_unknown_client_types_are_rejected(self):
+        communicator = await self.connect()
+        await communicator.send_json_to({'type': 'task_deleted', 'task_id': 1})
+        response = await communicator.receive_json_from()
+        self.assertEqual(response['type'], 'error')
+        await communicator.disconnect()
+
+    async def test_inbound_rate_limit_then_close(self):
+        communicator = await self.connect()
+        for _ in range(2):
+            await communicator.send_json_to({'type': 'ping'})
+            self.assertEqual((await communicator.receive_json_from())['type'], 'pong')
+        await communicator.send_json_to({'type': 'ping'})
+        self.assertEqual((await communicator.receive_json_from())['message'], 'Demasiados mensajes')
+        for _ in range(3):
+            await communicator.send_json_to({'type': 'ping'})
+        self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': 4029})
+
+    async def test_pending_updates_are_coalesced(self):
+        consumer = BoardConsumer()
+        consumer.setup_queues()
+        for title in ('a', 'b', 'c'):
+            await consumer.task_updated({'task': {'id': 7, 'title': title}})
+        await consumer.task_deleted({'task_id': 8})
+        self.assertEqual(
+            [payload.get('task', {}).get('title') for payload in consumer.outbox.values()], ['c', None]
+        )
+
+    async def test_drop_policy_discards_stale_updates(self):
+        consumer = BoardConsumer()
+        with self.settings(BOARD_CONSUMER={
+            **settings.BOARD_CONSUMER, 'OUTBOUND_QUEUE_SIZE': 2, 'SLOW_CONSUMER_POLICY': 'drop',
+        }):
+            consumer.setup_queues()
+            await consumer.task_updated({'task': {'id': 1, 'title': 'a'}})
+            await consumer.task_deleted({'task_id': 2})
+            await consumer.task_deleted({'task_id': 3})
+        self.assertEqual([payload['task_id'] for payload in consumer.outbox.values()], [2, 3])
+        self.assertTrue(consumer.needs_resync)
+
+    async def test_unacknowledged_frames_hold_the_queue(self):
+        with self.settings(BOARD_CONSUMER={
+            **settings.BOARD_CONSUMER, 'INBOUND_BURST': 20, 'ACK_WINDOW': 2, 'OUTBOUND_QUEUE_SIZE': 3,
+        }):
+            communicator = await self.connect()
+            # present_users y presence_changed llenan la ventana
+            for _ in range(3):
+                await communicator.send_json_to({'type': 'ping'})
+            self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+
+            await communicator.send_json_to({'type': 'ack', 'received': 2})
+            for _ in range(2):
+                self.assertEqual((await communicator.receive_json_from())['type'], 'pong')
+            self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+
+            # Sin más acks la cola se llena y se aplica la política (coalesce)
+            for _ in range(3):
+                await communicator.send_json_to({'type': 'ping'})
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'resync', 'reason': 'slow_consumer'})
+            self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': 4008})
+
+    async def test_missing_acks_close_with_resync(self):
+        with self.settings(BOARD_CONSUMER={**settings.BOARD_CONSUMER, 'ACK_WINDOW': 2, 'ACK_TIMEOUT': 0.2}):
+            communicator = await self.connect()
+            await communicator.send_json_to({'type': 'ping'})
+            self.assertEqual(await communicator.receive_json_from(), {'type': 'resync', 'reason': 'slow_consumer'})
+            self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': 4008})
+
+
+class EphemeralChannelTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+        self.log_count = ActivityLog.objects.count()
+
+    async def test_latest_value_per_object_is_flushed_once_per_tick(self):
+        app = websocket_app()
+        sender = WebsocketCommunicator(app, board_path(self.board, self.user))
+        watcher = WebsocketCommunicator(app, board_path(self.board, self.user))
+        await sender.connect()
+        await watcher.connect()
+        await drain(sender)
+        await drain(watcher)
+
+        for x in range(10):
+            await sender.send_json_to({'type': 'ephemeral', 'kind': 'drag', 'object_id': 5, 'data': {'x': x}})
+        await sender.send_json_to({'type': 'ephemeral', 'kind': 'cursor', 'object_id': 'me', 'data': {'x': 1}})
+
+        message = await watcher.receive_json_from(timeout=1)
+        self.assertEqual(message['type'], 'ephemeral')
+        self.assertEqual(
+            {(item['kind'], item['object_id']): item['data'] for item in message['items']},
+            {('drag', 5): {'x': 9}, ('cursor', 'me'): {'x': 1}}
+        )
+        self.assertTrue(await watcher.receive_nothing(timeout=0.2))
+        # El emisor no recibe su propio lote y no se registra actividad
+        self.assertTrue(await sender.receive_nothing(timeout=0.1))
+        self.assertEqual(await ActivityLog.objects.acount(), self.log_count)
+        await sender.disconnect()
+        await watcher.disconnect()
+
+
+class CompactBoardFormatTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='x', email='ana@example.com')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+        self.todo = List.objects.create(board=self.board, title='Todo')
+        for i in range(20):
+            task = Task.objects.create(list=self.todo, title=f'Task {i}', description='x' * 200, position=i, priority='high')
+            task.assigned_to.add(self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_compact_is_opt_in_and_smaller(self):
+        full = self.client.get(f'/api/boards/{self.board.id}/')
+        compact = self.client.get(f'/api/boards/{self.board.id}/', HTTP_ACCEPT='application/vnd.collab.compact+json')
+        self.assertEqual(compact['Content-Type'], 'application/vnd.collab.compact+json')
+        self.assertLess(len(compact.content) * 5, len(full.content))
+
+        data = json.loads(compact.content)
+        self.assertEqual(data['users'], {str(self.user.id): ['ana', 'ana@example.com']})
+        self.assertEqual(data['tasks']['assigned_to'][0], [self.user.id])
+        self.assertEqual(data['priorities'][data['tasks']['priority'][0]], 'high')
+        self.assertNotIn('description', data['tasks'])
+
+        # Solo el detalle tiene formato compacto
+        accept = {'HTTP_ACCEPT': 'application/vnd.collab.compact+json'}
+        self.assertEqual(self.client.get('/api/boards/', **accept).status_code, 406)
+        self.assertEqual(self.client.get(f'/api/boards/{self.board.id}/stats/', **accept).status_code, 406)
+
+    def test_query_flag_and_optional_fields(self):
+        response = self.client.get(f'/api/boards/{self.board.id}/?format=compact&include=description')
+        data = json.loads(response.content)
+        self.assertEqual(data['tasks']['description'][0], 'x' * 200)
+        self.assertEqual(data['lists'], {'id': [self.todo.id], 'title': ['Todo'], 'position': [0.0], 'task_count': [20]})
+
+    def test_compact_skips_snapshot_prefetches_and_tolerates_unknown_priority(self):
+        Task.objects.filter(title='Task 0').update(priority='urgent')
+        with patch('tasks.views.with_board_snapshot', wraps=with_board_snapshot) as snapshot:
+            response = self.client.get(f'/api/boards/{self.board.id}/?format=compact')
+        self.assertEqual(response.status_code, 200)
+        snapshot.assert_not_called()
+        data = json.loads(response.content)
+        self.assertEqual(data['priorities'][data['tasks']['priority'][0]], 'medium')
+
+
+@override_settings(BOARD_TASKS_PER_LIST=3)
+class WindowedListTasksTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+        self.todo = List.objects.create(board=self.board, title='Todo')
+        self.done = List.objects.create(board=self.board, title='Done', position=1)
+        # Posiciones repetidas: el desempate por id tiene que ser estable
+        for i in range(7):
+            Task.objects.create(list=self.todo, title=f'Task {i}', position=i // 2)
+        Task.objects.create(list=self.done, title='Shipped')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_snapshot_includes_first_window_per_list(self):
+        response = self.client.get(f'/api/boards/{self.board.id}/')
+        todo, done = response.data['lists']
+        self.assertEqual([t['title'] for t in todo['tasks']], ['Task 0', 'Task 1', 'Task 2'])
+        self.assertEqual(todo['task_count'], 7)
+        self.assertEqual((len(done['tasks']), done['task_count']), (1, 1))
+        # La última posición cuenta también las tareas fuera de la ventana
+        self.assertEqual((todo['last_position'], done['last_position']), ('3.00000', '0.00000'))
+        self.assertEqual(self.client.get(f'/api/lists/{self.todo.id}/').data['last_position'], '3.00000')
+
+    def test_keyset_pages_cover_the_list_once(self):
+        url = f'/api/lists/{self.todo.id}/tasks/'
+        params, titles = {'limit': 3}, []
+        while True:
+            data = self.client.get(url, params).data
+            titles += [t['title'] for t in data['results']]
+            if data['next'] is None:
+                break
+            params = {'limit': 3, **data['next']}
+        self.assertEqual(titles, [f'Task {i}' for i in range(7)])
+        self.assertEqual(self.client.get(url, {'after': 'x'}).status_code, 400)
+
+
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+        self.done = List.objects.create(board=self.board, title='Done')
+        self.tasks = [Task.objects.create(list=self.done, title=f'Task {i}', position=i) for i in range(5)]
+        for task in self.tasks:
+            task.assigned_to.add(self.user)
+        self.created_at = self.tasks[0].created_at
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_archive_by_age_moves_tasks_and_assignments(self):
+        Task.objects.filter(pk__in=[t.pk for t in self.tasks[:3]]).update(
+            updated_at=timezone.now() - timezone.timedelta(days=40)
+        )
+        call_command('archive_tasks', older_than_days=30, batch_size=2, stdout=StringIO())
+
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertEqual(sorted(ArchivedTask.objects.values_list('id', flat=True)), [t.pk for t in self.tasks[:3]])
+        self.assertEqual(ArchivedTask.assigned_to.through.objects.count(), 3)
+        response = self.client.get(f'/api/boards/{self.board.id}/')
+        self.assertEqual(response.data['lists'][0]['task_count'], 2)
+        response = self.client.get('/api/archived-tasks/', {'board': self.board.id, 'search': 'task 1'})
+        self.assertEqual([t['title'] for t in response.data['results']], ['Task 1'])
+
+    def test_restore_keeps_id_dates_and_assignees(self):
+        task = self.tasks[0]
+        self.assertEqual(self.client.post(f'/api/tasks/{task.pk}/archive/').status_code, 204)
+        self.assertFalse(Task.objects.filter(pk=task.pk).exists())
+
+        response = self.client.post(f'/api/archived-tasks/{task.pk}/restore/')
+        self.assertEqual(response.status_code, 200)
+        restored = Task.objects.get(pk=task.pk)
+        self.assertEqual(restored.created_at, self.created_at)
+        self.assertEqual(list(restored.assigned_to.all()), [self.user])
+        self.assertFalse(ArchivedTask.objects.exists())
+
+
+class DenormalizedBoardTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+        self.other = Board.objects.create(name='Other', owner=self.user)
+        self.todo = List.objects.create(board=self.board, title='Todo')
+
+    def test_board_follows_list_on_create_and_move(self):
+        task = Task.objects.create(list=self.todo, title='Task')
+        self.assertEqual(task.board_id, self.board.id)
+
+        task = Task.objects.get(pk=task.pk)
+        elsewhere = List.objects.create(board=self.other, title='Backlog')
+        task.list_id = elsewhere.id
+        task.save(update_fields=['list'])
+        self.assertEqual(Task.objects.get(pk=task.pk).board_id, self.other.id)
+
+    def test_update_signal_needs_no_lookups(self):
+        task = Task.objects.create(list=self.todo, title='Task')
+        task = Task.objects.get(pk=task.pk)
+        task.title = 'Renamed'
+        with CaptureQueriesContext(connection) as queries:
+            task.save()
+        # UPDATE de la tarea + INSERT del ActivityLog + versión del tablero + evento del historial
+        self.assertEqual(len(queries), 4)
+
+    async def test_list_cascade_sends_one_event(self):
+        channel_layer = get_channel_layer()
+        channel = await channel_layer.new_channel()
+        await channel_layer.group_add(f'board_{self.board.id}', channel)
+        tasks = [await Task.objects.acreate(list=self.todo, title=f'Task {i}') for i in range(30)]
+        while True:
+            try:
+                await asyncio.wait_for(channel_layer.receive(channel), 0.05)
+            except asyncio.TimeoutError:
+                break
+
+        await self.todo.adelete()
+        event = await channel_layer.receive(channel)
+        self.assertEqual(event['type'], 'list_deleted')
+        self.assertEqual(sorted(event['task_ids']), [t.id for t in tasks])
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(channel_layer.receive(channel), 0.05)
+        self.assertFalse(await ActivityLog.objects.filter(action__contains='deleted').aexists())
+
+
+class BoardPermissionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='ana', password='x')
+        self.member = User.objects.create_user(username='bob', password='x')
+        self.outsider = User.objects.create_user(username='eve', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.owner)
+        BoardMember.objects.create(board=self.board, user=self.member, role='member')
+        self.todo = List.objects.create(board=self.board, title='Todo')
+        self.task = Task.objects.create(list=self.todo, title='Task')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_outsiders_see_nothing(self):
+        client = self.client_for(self.outsider)
+        self.assertEqual(client.get('/api/boards/').data, [])
+        self.assertEqual(client.get(f'/api/tasks/{self.task.id}/').status_code, 404)
+        response = client.post('/api/tasks/', {'list': self.todo.id, 'title': 'Nope', 'assigned_to_ids': []}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_members_write_but_only_admins_delete(self):
+        client = self.client_for(self.member)
+        self.assertEqual(client.patch(f'/api/tasks/{self.task.id}/', {'title': 'Edited'}, format='json').status_code, 200)
+        self.assertEqual(client.delete(f'/api/tasks/{self.task.id}/').status_code, 403)
+        self.assertEqual(self.client_for(self.owner).delete(f'/api/tasks/{self.task.id}/').status_code, 204)
+
+    def test_membership_changes_invalidate_cached_roles(self):
+        client = self.client_for(self.outsider)
+        self.assertEqual(client.get(f'/api/boards/{self.board.id}/').status_code, 404)
+        BoardMember.objects.create(board=self.board, user=self.outsider, role='member')
+        self.assertEqual(client.get(f'/api/boards/{self.board.id}/').status_code, 200)
+
+    def test_roles_are_cached_until_the_membership_changes(self):
+        self.assertEqual(board_roles(self.member), {self.board.id: 'member'})
+        with self.assertNumQueries(0):
+            self.assertEqual(board_roles(self.member), {self.board.id: 'member'})
+
+        member = BoardMember.objects.get(board=self.board, user=self.member)
+        member.role = 'admin'
+        member.save()
+        self.assertEqual(board_roles(self.member), {self.board.id: 'admin'})
+
+        # mute_signals() no afecta a la invalidación: la entrada en caché deja de valer
+        client = self.client_for(self.member)
+        self.assertEqual(client.get(f'/api/boards/{self.board.id}/').status_code, 200)
+        with mute_signals():
+            BoardMember.objects.filter(board=self.board, user=self.member).delete()
+        self.assertEqual(client.get(f'/api/boards/{self.board.id}/').status_code, 404)
+        self.assertEqual(client.patch(f'/api/tasks/{self.task.id}/', {'title': 'Nope'}, format='json').status_code, 404)
+
+    def test_task_list_needs_no_join(self):
+        client = self.client_for(self.member)
+        with CaptureQueriesContext(connection) as queries:
+            client.get('/api/tasks/')
+        task_query = next(q['sql'] for q in queries if 'FROM "tasks_task"' in q['sql'])
+        self.assertNotIn('JOIN', task_query)
+
+    async def test_websocket_rejects_non_members(self):
+        communicator = WebsocketCommunicator(websocket_app(), board_path(self.board, self.outsider))
+        connected, code = await communicator.connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, CLOSE_FORBIDDEN)
+
+
+class BoardStatsTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+        self.todo = List.objects.create(board=self.board, title='Todo')
+        self.done = List.objects.create(board=self.board, title='Done', position=1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def stats(self):
+        return self.client.get(f'/api/boards/{self.board.id}/stats/').data
+
+    def test_counters_follow_task_changes(self):
+        tasks = [Task.objects.create(list=self.todo, title=f'Task {i}', priority='high') for i in range(3)]
+        tasks[0].assigned_to.add(self.user)
+        Task.objects.filter(pk=tasks[1].pk).update(due_date=timezone.now() - timezone.timedelta(days=1))
+
+        task = Task.objects.get(pk=tasks[2].pk)
+        task.list = self.done
+        task.priority = 'low'
+        task.save()
+        Task.objects.get(pk=tasks[0].pk).delete()
+
+        data = self.stats()
+        self.assertEqual(data['lists'], {str(self.todo.id): 1, str(self.done.id): 1})
+        self.assertEqual(data['priorities'], {'high': 1, 'low': 1})
+        self.assertEqual(data['assignees'], {})
+        self.assertEqual(data['overdue'], 1)
+        self.assertEqual(list(data['throughput'][str(self.done.id)].values()), [1])
+
+    def test_rebuild_corrects_drift_after_bulk_changes(self):
+        for i in range(4):
+            Task.objects.create(list=self.todo, title=f'Task {i}').assigned_to.add(self.user)
+        Task.objects.filter(title='Task 0').delete()
+        self.assertEqual(self.stats()['lists'], {str(self.todo.id): 4})
+
+        call_command('rebuild_board_stats', board=[self.board.id], stdout=StringIO())
+        data = self.stats()
+        self.assertEqual(data['lists'], {str(self.todo.id): 3})
+        self.assertEqual(data['assignees'], {str(self.user.id): 3})
+
+
+class WebsocketSnapshotTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+        self.todo = List.objects.create(board=self.board, title='Todo')
+
+    async def test_first_frame_is_snapshot_then_newer_events(self):
+        app = websocket_app()
+        path = board_path(self.board, self.user) + '&snapshot=1'
+        first, second = WebsocketCommunicator(app, path), WebsocketCommunicator(app, path)
+        await first.connect()
+        await second.connect()
+
+        snapshots = [await first.receive_json_from(), await second.receive_json_from()]
+        self.assertEqual(snapshots[0], snapshots[1])
+        self.assertEqual(snapshots[0]['type'], 'snapshot')
+        self.assertEqual([l['title'] for l in snapshots[0]['board']['lists']], ['Todo'])
+        # El payload REST/snapshot lleva la misma versión que los eventos
+        self.assertEqual(snapshots[0]['board']['version'], snapshots[0]['version'])
+        await drain(first)
+
+        await Task.objects.acreate(list=self.todo, title='New')
+        event = await first.receive_json_from()
+        self.assertEqual(event['type'], 'task_created')
+        self.assertEqual(event['version'], snapshots[0]['version'] + 1)
+        await first.disconnect()
+        await second.disconnect()
+
+
+class MultiBoardConsumerTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.first = Board.objects.create(name='First', owner=self.user)
+        self.second = Board.objects.create(name='Second', owner=self.user)
+        self.foreign = Board.objects.create(name='Foreign', owner=User.objects.create_user(username='eva', password='x'))
+        self.todo = List.objects.create(board=self.second, title='Todo')
+
+    async def test_events_are_tagged_and_stop_after_unsubscribe(self):
+        token = RefreshToken.for_user(self.user).access_token
+        communicator = WebsocketCommunicator(websocket_app(), f'/ws/boards/?token={token}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        await communicator.send_json_to({
+            'type': 'subscribe', 'board_ids': [self.first.id, self.second.id, self.foreign.id], 'snapshot': 'compact'
+        })
+        reply = await communicator.receive_json_from()
+        self.assertEqual(reply['board_ids'], [self.first.id, self.second.id])
+        self.assertEqual(reply['denied'], [self.foreign.id])
+        snapshots = [await communicator.receive_json_from() for _ in range(2)]
+        self.assertEqual([s['board_id'] for s in snapshots], [self.first.id, self.second.id])
+        self.assertEqual(snapshots[1]['board']['name'], 'Second')
+
+        await Task.objects.acreate(list=self.todo, title='New')
+        event = await communicator.receive_json_from()
+        self.assertEqual((event['type'], event['board_id']), ('task_created', self.second.id))
+
+        await communicator.send_json_to({'type': 'unsubscribe', 'board_ids': [self.second.id]})
+        self.assertEqual((await communicator.receive_json_from())['board_ids'], [self.second.id])
+        await Task.objects.acreate(list=self.todo, title='Ignored')
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+        await communicator.disconnect()
+
+    async def test_group_events_without_board_id_are_dropped(self):
+        token = RefreshToken.for_user(self.user).access_token
+        communicator = WebsocketCommunicator(websocket_app(), f'/ws/boards/?token={token}')
+        await communicator.connect()
+        await communicator.send_json_to({'type': 'subscribe', 'board_ids': [self.second.id]})
+        await communicator.receive_json_from()
+
+        layer = get_channel_layer()
+        await layer.group_send(f'board_{self.second.id}', {
+            'type': 'board_message', 'message_type': 'message', 'data': {}, 'user': 'eva'
+        })
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+
+        # Un mensaje de un cliente de BoardConsumer llega etiquetado con su tablero
+        board = WebsocketCommunicator(websocket_app(), board_path(self.second, self.user))
+        await board.connect()
+        await board.send_json_to({'type': 'message', 'text': 'hola'})
+        event = await communicator.receive_json_from()
+        self.assertEqual((event['type'], event['board_id'], event['user']), ('message', self.second.id, 'ana'))
+        await board.disconnect()
+        await communicator.disconnect()
+
+
+class AdmissionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='ana', password='x')
+        self.guest = User.objects.create_user(username='eva', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.owner)
+        BoardMember.objects.create(board=self.board, user=self.guest, role='member')
+
+    async def test_over_capacity_gets_retry_hint(self):
+        with self.settings(BOARD_CONSUMER={
+            **settings.BOARD_CONSUMER, 'MAX_CONCURRENT_ACCEPTS': 0, 'ACCEPT_QUEUE_SIZE': 0,
+            'RETRY_AFTER': 2, 'RETRY_JITTER': 3,
+        }):
+            communicator = WebsocketCommunicator(websocket_app(), board_path(self.board, self.owner))
+            await communicator.connect()
+            message = await communicator.receive_json_from()
+            self.assertEqual(message['type'], 'retry')
+            self.assertTrue(2 <= message['retry_after'] <= 5)
+            self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': CLOSE_OVERLOADED})
+
+    async def test_multi_board_socket_goes_through_admission(self):
+        path = f'/ws/boards/?token={RefreshToken.for_user(self.owner).access_token}'
+        with self.settings(BOARD_CONSUMER={
+            **settings.BOARD_CONSUMER, 'MAX_CONCURRENT_ACCEPTS': 0, 'ACCEPT_QUEUE_SIZE': 0,
+        }):
+            communicator = WebsocketCommunicator(websocket_app(), path)
+            await communicator.connect()
+            self.assertEqual((await communicator.receive_json_from())['type'], 'retry')
+            self.assertEqual(await communicator.receive_output(), {'type': 'websocket.close', 'code': CLOSE_OVERLOADED})
+
+        # Con plaza, la conexión la ocupa solo mientras se admite
+        communicator = WebsocketCommunicator(websocket_app(), path)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(admission.active, 0)
+        await communicator.disconnect()
+        self.assertEqual(admission.active, 0)
+
+    async def test_presence_is_debounced_per_board(self):
+        app = websocket_app()
+        watcher = WebsocketCommunicator(app, board_path(self.board, self.owner))
+        await watcher.connect()
+        await drain(watcher)
+
+        guest = WebsocketCommunicator(app, board_path(self.board, self.guest))
+        await guest.connect()
+        await guest.disconnect()
+        again = WebsocketCommunicator(app, board_path(self.board, self.guest))
+        await again.connect()
+        changes = []
+        while not await watcher.receive_nothing(timeout=settings.BOARD_CONSUMER['PRESENCE_DEBOUNCE'] + 0.1):
+            changes.append(await watcher.receive_json_from())
+        # Entrada, salida y reconexión dentro de la ventana: un único evento
+        self.assertEqual(changes, [{'type': 'presence_changed', 'joined': ['eva'], 'left': []}])
+        await again.disconnect()
+        await watcher.disconnect()
+
+
+class ProfilingTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.admin = User.objects.create_user(username='ana', password='x', is_staff=True)
+        self.board = Board.objects.create(name='Board', owner=self.admin)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def profiling(self, **overrides):
+        return self.settings(PROFILING={**settings.PROFILING, 'ENABLED': True, 'DIR': self.directory.name, **overrides})
+
+    def test_signed_header_profiles_request(self):
+        with self.profiling(SAMPLE_RATE=0):
+            self.client.get(f'/api/boards/{self.board.id}/')
+            self.client.get(f'/api/boards/{self.board.id}/', headers={'X-Profile': 'forged'})
+            self.assertEqual(self.client.get('/api/internal/profiles/').json(), [])
+
+            self.client.get(f'/api/boards/{self.board.id}/', headers={'X-Profile': profile_token()})
+            profiles = self.client.get('/api/internal/profiles/').json()
+            self.assertEqual([p['label'] for p in profiles], [f'GET /api/boards/{self.board.id}/'])
+            folded = self.client.get(f'/api/internal/profiles/{profiles[0]["name"]}/')
+            self.assertEqual(folded.status_code, 200)
+
+    async def test_async_request_profiles_the_view_thread(self):
+        # En la cadena async la vista de DRF corre en el hilo de sync_to_async,
+        # no en el del event loop donde empieza el perfil
+        retrieve = BoardViewSet.retrieve
+
+        def slow_retrieve(viewset, request, *args, **kwargs):
+            time.sleep(0.05)
+            return retrieve(viewset, request, *args, **kwargs)
+
+        token = RefreshToken.for_user(self.admin).access_token
+        with self.profiling(SAMPLE_RATE=0, INTERVAL=0.001), patch.object(BoardViewSet, 'retrieve', slow_retrieve):
+            response = await AsyncClient().get(
+                f'/api/boards/{self.board.id}/',
+                headers={'Authorization': f'Bearer {token}', 'X-Profile': profile_token()},
+            )
+            self.assertEqual(response.status_code, 200)
+            [profile] = recent_profiles()
+            folded = profile_path(profile['name']).read_text()
+        self.assertIn('slow_retrieve (tests.py', folded)
+
+    def test_profiles_are_staff_only(self):
+        self.client.force_authenticate(User.objects.create_user(username='eva', password='x'))
+        with self.profiling():
+            self.assertEqual(self.client.get('/api/internal/profiles/').status_code, 403)
+
+
+class DatasetBenchmarkTests(TestCase):
+
+    def test_generate_and_benchmark_against_baseline(self):
+        out = StringIO()
+        call_command('generate_dataset', boards=3, users=5, max_tasks=20, activity_per_board=5, stdout=out)
+        self.assertEqual(Board.objects.filter(owner__username__startswith='bench-').count(), 3)
+        self.assertTrue(Task.objects.exists())
+        self.assertTrue(ActivityLog.objects.filter(timestamp__lt=timezone.now() - timezone.timedelta(minutes=1)).exists())
+
+        with tempfile.NamedTemporaryFile(suffix='.json') as baseline:
+            call_command('benchmark', iterations=2, warmup=1, save_baseline=baseline.name, stdout=out)
+            results = json.load(open(baseline.name))
+            self.assertEqual(set(results), {'board_retrieve', 'task_patch', 'task_move', 'activity_feed', 'signup'})
+            self.assertGreater(results['board_retrieve']['queries'], 0)
+            # El benchmark no deja escrituras
+            self.assertFalse(User.objects.filter(username__startswith='signup-').exists())
+
+            for row in results.values():
+                row['queries'] -= 1
+            json.dump(results, open(baseline.name, 'w'))
+            with self.assertRaisesMessage(CommandError, 'Regresiones'):
+                call_command('benchmark', iterations=2, warmup=1, scenario=['board_retrieve'], baseline=baseline.name, stdout=out)
+
+
+class BoardCloneTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='ana', password='x')
+        self.member = User.objects.create_user(username='eva', password='x')
+        self.board = Board.objects.create(name='Sprint', owner=self.owner)
+        BoardMember.objects.create(board=self.board, user=self.member, role='member')
+        todo = List.objects.create(board=self.board, title='Todo', position=1)
+        done = List.objects.create(board=self.board, title='Done', position=2)
+        for i in range(30):
+            task = Task.objects.create(list=todo if i % 2 else done, title=f'T{i}', position=i, priority='high')
+            task.assigned_to.add(self.member)
+        self.client = APIClient()
+        self.client.force_authenticate(self.member)
+
+    def test_clone_copies_in_bulk_with_one_activity_entry(self):
+        logs = ActivityLog.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/boards/{self.board.id}/clone/', {
+                'name': 'Sprint 2', 'include_members': True, 'include_assignments': True
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        # No depende del número de tareas
+        self.assertLess(len(queries), 40)
+
+        clone = Board.objects.get(pk=response.data['id'])
+        self.assertEqual((clone.name, clone.owner), ('Sprint 2', self.member))
+        self.assertEqual([l['title'] for l in response.data['lists']], ['Todo', 'Done'])
+        self.assertEqual(Task.objects.filter(board=clone).count(), 30)
+        self.assertEqual(Task.assigned_to.through.objects.filter(task__board=clone).count(), 30)
+        self.assertEqual(
+            dict(clone.board_members.values_list('user__username', 'role')), {'ana': 'admin', 'eva': 'admin'}
+        )
+        self.assertEqual(ActivityLog.objects.count(), logs + 1)
+        self.assertEqual(self.client.get(f'/api/boards/{clone.id}/stats/').data['priorities'], {'high': 30})
+
+    def test_templates(self):
+        response = self.client.post(f'/api/boards/{self.board.id}/clone/', {'as_template': True}, format='json')
+        template_id = response.data['id']
+        self.assertTrue(response.data['is_template'])
+        self.assertEqual(Task.assigned_to.through.objects.filter(task__board_id=template_id).count(), 0)
+
+        ids = [b['id'] for b in self.client.get('/api/boards/?template=1').data]
+        self.assertEqual(ids, [template_id])
+        board = self.client.post(f'/api/boards/{template_id}/clone/', {'name': 'From template'}, format='json').data
+        self.assertFalse(board['is_template'])
+        self.assertEqual(Task.objects.filter(board_id=board['id']).count(), 30)
+
+
+class AdminBoardFilterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='root', password='x')
+        self.boards = [Board.objects.create(name=f'Board {i}', owner=self.user) for i in range(2)]
+        for board in self.boards:
+            List.objects.create(board=board, title=f'Todo of {board.name}')
+        self.client.force_login(self.user)
+
+    def test_board_filter_is_an_id_input(self):
+        response = self.client.get('/admin/tasks/list/', {'board_id': self.boards[1].id, 'o': '1'})
+        self.assertContains(response, 'Todo of Board 1')
+        self.assertNotContains(response, 'Todo of Board 0')
+        # Un campo de texto que conserva el resto de parámetros, sin opciones por tablero
+        self.assertContains(response, 'name="board_id"')
+        self.assertContains(response, '<input type="hidden" name="o" value="1">', html=True)
+        self.assertNotContains(response, 'board__id__exact')
+        self.assertEqual(self.client.get('/admin/tasks/task/', {'board_id': 'x'}).status_code, 200)
+
+
+@override_settings(DATABASE_SHARDS=['shard_1', 'shard_2'])
+class ShardingTests(TestCase):
+    databases = {'default', 'shard_1', 'shard_2'}
+
+    def setUp(self):
+        cache.clear()
+        for alias in settings.DATABASE_SHARDS:
+            prepare_shard(alias)
+        self.owner = User.objects.create_user(username='ana', password='x')
+        self.boards = [Board.objects.create(name=f'Board {i}', owner=self.owner) for i in range(2)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def create_task(self, board):
+        task_list = self.client.post('/api/lists/', {'board': board.id, 'title': 'Todo', 'position': 1}, format='json')
+        self.assertEqual(task_list.status_code, 201)
+        task = self.client.post('/api/tasks/', {'list': task_list.data['id'], 'title': 'Write docs', 'position': 1, 'assigned_to_ids': []}, format='json')
+        self.assertEqual(task.status_code, 201)
+        return task_list.data['id'], task.data['id']
+
+    def test_rows_live_in_the_board_shard(self):
+        for board in self.boards:
+            alias = shard_for_board(board.id)
+            list_id, task_id = self.create_task(board)
+            self.assertEqual(shard_for_id(list_id), alias)
+            self.assertTrue(Task.objects.using(alias).filter(pk=task_id, board=board).exists())
+            self.assertEqual(Task.objects.using('default').count(), 0)
+
+            response = self.client.patch(f'/api/tasks/{task_id}/', {'title': 'Docs'}, format='json')
+            self.assertEqual(response.status_code, 200)
+            board_data = self.client.get(f'/api/boards/{board.id}/').data
+            self.assertEqual([t['title'] for t in board_data['lists'][0]['tasks']], ['Docs'])
+
+        self.assertNotEqual(*[shard_for_board(board.id) for board in self.boards])
+        boards = self.client.get('/api/boards/').data
+        self.assertEqual([len(board['lists']) for board in boards], [1, 1])
+        # Creación de tablero, lista y tarea y la edición, en cada shard
+        activity = self.client.get('/api/activity/').data
+        self.assertEqual(len(activity), 8)
+        newest = self.client.get('/api/activity/?limit=3').data
+        self.assertEqual([log['id'] for log in newest], [log['id'] for log in activity[:3]])
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 400)
+        self.assertEqual(len(self.client.get(f'/api/tasks/?board={self.boards[0].id}').data), 1)
+
+    def test_reference_tables_are_replicated(self):
+        member = User.objects.create_user(username='eva', password='x')
+        for alias in settings.DATABASE_SHARDS:
+            self.assertTrue(User.objects.using(alias).filter(pk=member.pk).exists())
+            self.assertEqual(Board.objects.using(alias).count(), 2)
+
+        board = self.boards[0]
+        with use_board_shard(board.id):
+            BoardMember.objects.create(board=board, user=member, role='member')
+        self.client.force_authenticate(member)
+        self.assertEqual([b['id'] for b in self.client.get('/api/boards/').data], [board.id])
+
+        self.create_task(board)
+        alias = shard_for_board(board.id)
+        board.delete()
+        self.assertFalse(Board.objects.using(alias).filter(pk=board.pk).exists())
+        self.assertEqual(Task.objects.using(alias).count(), 0)
+
+    def test_unrouted_queries_fail(self):
+        with self.assertRaises(ShardNotSelected):
+            Task.objects.count()
+        self.assertEqual(self.client.get('/api/tasks/999999999/').status_code, 404)
+
+    def test_admin_lists_rows_of_the_selected_shard(self):
+        # El segundo shard: sus ids empiezan en SHARD_ID_SPAN
+        alias = settings.DATABASE_SHARDS[1]
+        board = next(board for board in self.boards if shard_for_board(board.id) == alias)
+        list_id, task_id = self.create_task(board)
+        admin_user = User.objects.create_superuser(username='root', password='x')
+        self.client.force_login(admin_user)
+
+        response = self.client.get(f'/admin/tasks/task/?shard={alias}')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Write docs')
+        other = next(a for a in settings.DATABASE_SHARDS if a != alias)
+        self.assertNotContains(self.client.get(f'/admin/tasks/task/?shard={other}'), 'Write docs')
+        self.assertEqual(self.client.get(f'/admin/tasks/task/{task_id}/change/').status_code, 200)
+        self.assertEqual(self.client.get(f'/admin/tasks/list/?shard={alias}').status_code, 200)
+        self.assertEqual(self.client.get(f'/admin/tasks/activitylog/?shard={alias}').status_code, 200)
+        self.assertEqual(self.client.get(f'/admin/tasks/board/{board.id}/change/').status_code, 200)
+
+        # La estimación de filas descuenta el inicio del rango de ids del shard
+        self.assertLessEqual(estimate_row_count(Task, alias), 1)
+        self.assertIsNone(estimate_row_count(Task, other))
+
+
+@override_settings(DATABASE_SHARDS=['shard_1', 'shard_2'])
+class InitShardsTests(TransactionTestCase):
+    # Migra de verdad (no cabe en la transacción de TestCase)
+    databases = {'default', 'shard_1', 'shard_2'}
+
+    def test_init_shards_migrates_a_fresh_shard(self):
+        # Shard vacío: se deshacen sus migraciones y init_shards las vuelve a aplicar todas
+        call_command('migrate', 'tasks', 'zero', database='shard_2', verbosity=0)
+        out = StringIO()
+        call_command('init_shards', shard=['shard_2'], stdout=out)
+        self.assertIn('shard_2 listo', out.getvalue())
+
+        owner = User.objects.create_user(username='ana', password='x')
+        board = Board.objects.create(name='Board', owner=owner)
+        while shard_for_board(board.id) != 'shard_2':
+            board = Board.objects.create(name='Board', owner=owner)
+        todo = List.objects.create(board=board, title='Todo')
+        self.assertEqual(shard_for_id(todo.pk), 'shard_2')
+
+
+class NotificationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='ana', password='x')
+        self.member = User.objects.create_user(username='eva', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.owner)
+        BoardMember.objects.create(board=self.board, user=self.member, role='member')
+        self.todo = List.objects.create(board=self.board, title='Todo')
+        self.task = Task.objects.create(list=self.todo, title='Write docs')
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+
+    def test_assignment_and_mentions_fill_the_inbox(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(user_group(self.member.id), channel)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f'/api/tasks/{self.task.id}/', {
+                'assigned_to_ids': [self.member.id, self.owner.id], 'description': 'cc @eva @nobody'
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        # Asignada y mencionada a la vez: solo la asignación; nada para quien edita
+        self.assertEqual(list(Notification.objects.values_list('user__username', 'kind')), [('eva', 'assigned')])
+        event = async_to_sync(layer.receive)(channel)
+        self.assertEqual((event['notification']['actor'], event['unread']), ('ana', 1))
+
+        self.client.patch(f'/api/tasks/{self.task.id}/', {'description': 'cc @eva @nobody, ping @eva'}, format='json')
+        self.client.force_authenticate(self.member)
+        self.client.patch(f'/api/tasks/{self.task.id}/', {'description': 'thanks @ana'}, format='json')
+        self.assertEqual(Notification.objects.filter(user=self.owner, kind='mentioned').count(), 1)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(unread_count(self.member.id), 1)
+        inbox = self.client.get('/api/notifications/?unread=1').data['results']
+        self.assertEqual([n['kind'] for n in inbox], ['assigned'])
+        self.assertEqual(self.client.post('/api/notifications/read/', {'ids': [inbox[0]['id']]}, format='json').data, {'read': 1, 'unread': 0})
+        self.assertEqual(self.client.post('/api/notifications/read/', {}, format='json').data, {'read': 0, 'unread': 0})
+
+    def test_due_soon_is_sent_once_and_trim_fixes_counters(self):
+        self.task.due_date = timezone.now() + timezone.timedelta(hours=2)
+        self.task.save()
+        self.task.assigned_to.add(self.member)
+        call_command('notify_due_tasks', stdout=StringIO())
+        call_command('notify_due_tasks', stdout=StringIO())
+        self.assertEqual(Notification.objects.filter(user=self.member, kind='due_soon').count(), 1)
+
+        deliver([Notification(user=self.member, kind='mentioned', board_id=self.board.id, message='old') for _ in range(3)])
+        Notification.objects.filter(message='old').update(created_at=timezone.now() - timezone.timedelta(days=120))
+        mark_read(self.member, list(Notification.objects.filter(message='old').values_list('pk', flat=True)[:1]))
+        self.assertEqual(unread_count(self.member.id), 3)
+        self.assertEqual(trim_notifications(older_than_days=90, batch_size=2), 3)
+        self.assertEqual(unread_count(self.member.id), 1)
+
+    async def test_socket_starts_with_the_unread_counter(self):
+        await database_sync_to_async(deliver)([Notification(user=self.member, kind='mentioned', board_id=self.board.id, message='hi')])
+        token = RefreshToken.for_user(self.member).access_token
+        communicator = WebsocketCommunicator(websocket_app(), f'/ws/notifications/?token={token}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'unread', 'unread': 1})
+        await communicator.disconnect()
+
+
+@override_settings(BOARD_HISTORY={'CHECKPOINT_EVERY': 3})
+class BoardHistoryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Retro', owner=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def at(self, instant):
+        return self.client.get(f'/api/boards/{self.board.id}/', {'at': instant.isoformat()})
+
+    def test_reconstructs_past_states_from_nearest_checkpoint(self):
+        todo = List.objects.create(board=self.board, title='Todo')
+        task = Task.objects.create(list=todo, title='Draft', position=1)
+        Task.objects.create(list=todo, title='Second', position=2)
+        before = timezone.now()
+
+        task.title = 'Final'
+        task.save()
+        Task.objects.get(title='Second').delete()
+        self.board.name = 'Retro Q3'
+        self.board.save()
+
+        past = self.at(before).data
+        self.assertEqual(past['name'], 'Retro')
+        self.assertEqual([t['title'] for t in past['lists'][0]['tasks']], ['Draft', 'Second'])
+        now = self.at(timezone.now()).data
+        self.assertEqual((now['name'], [t['title'] for t in now['lists'][0]['tasks']]), ('Retro Q3', ['Final']))
+
+        # Solo se reaplican los eventos desde el último checkpoint
+        self.assertGreater(BoardCheckpoint.objects.filter(board=self.board).count(), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.at(timezone.now())
+        self.assertLess(len(queries), 10)
+
+        self.assertEqual(self.at(timezone.now() - timezone.timedelta(days=1)).status_code, 404)
+        self.assertEqual(self.client.get(f'/api/boards/{self.board.id}/', {'at': 'yesterday'}).status_code, 400)
+
+    def test_checkpoint_is_not_skipped_by_unrecorded_versions(self):
+        start = Board.objects.get(pk=self.board.pk).checkpoint_version
+        # Versiones consumidas por eventos que no se guardan (miembros, presencia...)
+        record(self.board.id, start + 2, {'type': 'task_deleted', 'task_id': 0}, start)
+        self.assertFalse(BoardCheckpoint.objects.filter(board=self.board, version=start + 2).exists())
+        record(self.board.id, start + 4, {'type': 'task_deleted', 'task_id': 0}, start)
+        self.assertTrue(BoardCheckpoint.objects.filter(board=self.board, version=start + 4).exists())
+        self.assertEqual(Board.objects.get(pk=self.board.pk).checkpoint_version, start + 4)
+
+    def test_stale_board_save_keeps_checkpoint_version(self):
+        stale = Board.objects.get(pk=self.board.pk)
+        for i in range(3):
+            List.objects.create(board=self.board, title=f'L{i}')
+        fresh = Board.objects.get(pk=self.board.pk)
+        self.assertGreater(fresh.checkpoint_version, stale.checkpoint_version)
+
+        # Un save() con la instancia cargada antes no vuelve atrás ninguna de
+        # las dos versiones (sin señales: su evento podría crear otro checkpoint)
+        stale.name = 'Renamed'
+        with mute_signals():
+            stale.save()
+        saved = Board.objects.get(pk=self.board.pk)
+        self.assertEqual(saved.name, 'Renamed')
+        self.assertEqual((saved.version, saved.checkpoint_version), (fresh.version, fresh.checkpoint_version))
+
+    def test_bulk_changes_are_checkpointed(self):
+        todo = List.objects.create(board=self.board, title='Todo')
+        tasks = [Task.objects.create(list=todo, title=f'T{i}', position=i) for i in range(3)]
+        archive_tasks(Task.objects.filter(pk__in=[t.pk for t in tasks[:2]]))
+        restore_tasks(ArchivedTask.objects.filter(pk=tasks[0].pk))
+        titles = [t['title'] for t in self.at(timezone.now()).data['lists'][0]['tasks']]
+        self.assertEqual(titles, ['T0', 'T2'])
+
+
+class ActivityCoalescingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.user)
+        self.doing = List.objects.create(board=self.board, title='Doing')
+        self.done = List.objects.create(board=self.board, title='Done', position=1)
+        self.tasks = [Task.objects.create(list=self.doing, title=f'T{i}', position=i) for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def patch(self, task, data):
+        response = self.client.patch(f'/api/tasks/{task.id}/', data, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def logs(self):
+        return list(ActivityLog.objects.filter(user=self.user).exclude(kind='').order_by('timestamp').values_list('action', 'count'))
+
+    def test_reorders_and_edits_merge_into_one_row(self):
+        for i, task in enumerate(self.tasks):
+            self.patch(task, {'position': str(10 - i)})
+        self.patch(self.tasks[0], {'title': 'Renamed'})
+        self.patch(self.tasks[0], {'description': 'More'})
+        self.patch(self.tasks[1], {'list': self.done.id})
+        self.assertEqual(self.logs(), [
+            ("reordered 3 tasks in 'Doing'", 3),
+            ("updated task 'Renamed'", 2),
+            ("moved task 'T1' to 'Done'", 1),
+        ])
+        reordered = ActivityLog.objects.get(action__startswith='reordered')
+        self.assertEqual(reordered.object_ids, [task.id for task in self.tasks])
+
+    def test_merge_updates_the_recent_row_in_place(self):
+        first = log_task_update(self.user, self.tasks[0], 'reordered', 'reordered T0')
+        with CaptureQueriesContext(connection) as queries:
+            merged = log_task_update(self.user, self.tasks[1], 'reordered', 'reordered T1')
+        statements = [q['sql'].split()[0] for q in queries.captured_queries]
+        self.assertNotIn('INSERT', statements)
+        self.assertNotIn('DELETE', statements)
+        self.assertEqual(statements.count('UPDATE'), 1)
+        self.assertEqual((merged.pk, merged.count, merged.object_ids), (first.pk, 2, [self.tasks[0].id, self.tasks[1].id]))
+
+    @override_settings(ACTIVITY_COALESCE={**settings.ACTIVITY_COALESCE, 'WINDOW': 0})
+    def test_no_merge_outside_the_window(self):
+        self.patch(self.tasks[0], {'position': '5'})
+        self.patch(self.tasks[1], {'position': '6'})
+        self.assertEqual(len(self.logs()), 2)
+
+
+class MemberDirectoryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='x')
+        self.board = Board.objects.create(name='Board', owner=self.owner)
+        self.users = [User.objects.create_user(username=f'user{i:02d}', password='x') for i in range(12)]
+        for user in self.users:
+            BoardMember.objects.create(board=self.board, user=user, role='member')
+        self.viewer = self.users[0]
+        self.task = Task.objects.create(list=List.objects.create(board=self.board, title='To Do'), title='T')
+        self.task.assigned_to.add(self.users[5])
+        self.client = APIClient()
+        self.client.force_authenticate(self.viewer)
+
+    def test_keyset_pages_and_prefix_search(self):
+        names, params = [], {'limit': 5}
+        while params is not None:
+            response = self.client.get(f'/api/boards/{self.board.id}/members/', params)
+            self.assertEqual(response.status_code, 200)
+            names += [member['username'] for member in response.data['results']]
+            params = response.data['next'] and {**response.data['next'], 'limit': 5}
+        self.assertEqual(names, [user.username for user in self.users])
+
+        response = self.client.get(f'/api/boards/{self.board.id}/members/', {'search': 'user1'})
+        self.assertEqual([member['username'] for member in response.data['results']], ['user10', 'user11'])
+        response = self.client.get(f'/api/boards/{self.board.id}/members/', {'search': 'USER1'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_board_payload_carries_count_and_active_members(self):
+        response = self.client.get(f'/api/boards/{self.board.id}/')
+        self.assertEqual(response.data['member_count'], 12)
+        self.assertEqual([member['username'] for member in response.data['members']], ['user00', 'user05'])
+
+        BoardMember.objects.filter(user=self.users[11]).delete()
+        self.users[1].username = 'renamed'
+        self.users[1].save()
+        response = self.client.get(f'/api/boards/{self.board.id}/members/', {'search': 'renamed'})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertEqual(self.client.get(f'/api/boards/{self.board.id}/').data['member_count'], 11)
+
+
+class SerializedSqliteWriterTests(SimpleTestCase):
+    """
+    Backend de DB_PROFILE=sqlite contra un fichero propio, fuera de la BD de test.
+    """
+    # Las conexiones de self.handler son de la misma clase que las de la BD de test
+    databases = '__all__'
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        self.handler = ConnectionHandler({'default': {
+            'ENGINE': 'tasks.backends.sqlite3',
+            'NAME': f'{self.dir.name}/writer.sqlite3',
+            'OPTIONS': {
+                'timeout': 0.05,
+                # Holgado: con la máquina cargada la cola de 8 hilos puede pasar de 50 ms
+                'writer_timeout': 5,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': 'PRAGMA journal_mode=WAL',
+                'serialize_writes': True,
+            },
+        }})
+        with self.handler['default'].cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (id INTEGER PRIMARY KEY, value INTEGER)')
+            cursor.execute('INSERT INTO counter VALUES (1, 0)')
+        self.handler['default'].close()
+
+    def test_concurrent_read_modify_write_transactions_queue_instead_of_failing(self):
+        failures = []
+
+        def worker():
+            connection = self.handler['default']
+            try:
+                for _ in range(20):
+                    connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT value FROM counter WHERE id = 1')
+                        value = cursor.fetchone()[0]
+                        time.sleep(0.001)
+                        cursor.execute('UPDATE counter SET value = %s WHERE id = 1', [value + 1])
+                    connection.commit()
+                    connection.set_autocommit(True)
+                    # Escritura suelta en autocommit: también pasa por la cola
+                    with connection.cursor() as cursor:
+                        cursor.execute('UPDATE counter SET value = value + 1 WHERE id = 1')
+            except Exception as exc:
+                failures.append(exc)
+            finally:
+                connection.close()
+
+        # busy_timeout de 50 ms: sin la cola, 8 hilos compitiendo por el escritor fallarían
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+        with self.handler['default'].cursor() as cursor:
+            cursor.execute('SELECT value FROM counter WHERE id = 1')
+            self.assertEqual(cursor.fetchone()[0], 8 * 20 * 2)
+        self.handler['default'].close()
+
+    def test_waiting_past_the_timeout_raises_database_locked(self):
+        self.handler['default'].settings_dict['OPTIONS']['writer_timeout'] = 0.05
+        queue = writer_queue(f'{self.dir.name}/writer.sqlite3')
+        self.assertTrue(queue.acquire())
+        try:
+            with self.assertRaisesMessage(OperationalError, 'database is locked'):
+                with self.handler['default'].cursor() as cursor:
+                    cursor.execute('UPDATE counter SET value = 1')
+        finally:
+            queue.release()
+            self.handler['default'].close()
+
+
+class WorkerWarmupTests(TestCase):
+    # warm_up() carga la caché de ContentType de todos los alias
+    databases = '__all__'
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_readiness_flips_after_warm_up(self):
+        with patch.dict(STARTUP, {'ready': False, 'steps': {}}):
+            self.assertEqual(self.client.get('/api/health/ready/').status_code, 503)
+            warm_up()
+            response = self.client.get('/api/health/ready/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(set(response.data['steps']), {name for name, _ in STEPS})
+
+    def test_failed_warm_up_stays_unready_until_a_retry_succeeds(self):
+        def broken():
+            raise OperationalError('database is unavailable')
+
+        with patch.dict(STARTUP, {'ready': False, 'steps': {}}):
+            with patch('tasks.warmup.STEPS', (('broken', broken),)), self.assertLogs('tasks.warmup', 'ERROR'):
+                warm_up()
+                response = self.client.get('/api/health/ready/')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.data['error'], 'broken: database is unavailable')
+
+            # La siguiente sonda reintenta con los pasos reales
+            response = self.client.get('/api/health/ready/')
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('error', response.data)
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_content_types_are_only_read_on_replicas(self):
+        ContentType.objects.clear_cache()
+        with patch.dict(STARTUP, {'ready': False, 'steps': {}}), CaptureQueriesContext(connections['replica_1']) as queries:
+            warm_up()
+        self.assertTrue(queries.captured_queries)
+        self.assertTrue(all(q['sql'].startswith('SELECT') for q in queries.captured_queries))
+        self.assertEqual(ContentType.objects.db_manager('replica_1').get_for_model(Board).model, 'board')
+
+    def test_admin_loads_on_first_use(self):
+        staff = User.objects.create_user(username='root', password='x', is_staff=True, is_superuser=True)
+        self.client.force_login(staff)
+        self.assertEqual(reverse('admin:tasks_board_changelist'), '/admin/tasks/board/')
+        self.assertEqual(self.client.get('/admin/tasks/board/').status_code, 200)
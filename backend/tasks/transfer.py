@@ -0,0 +1,241 @@
+"""
+Exportación e importación de tableros en NDJSON (un objeto JSON por línea).
+
+Formato, en este orden:
+    {"type": "board", ...}
+    {"type": "list", "id": ..., ...}
+    {"type": "task", "id": ..., "list": <id de lista>, ...}
+    {"type": "assignment", "task": <id de tarea>, "user": ..., "username": ...}
+    {"type": "archived_task", ...}     (opcional, la importación lo ignora)
+    {"type": "archived_assignment", ...}
+    {"type": "activity", ...}          (opcional, la importación lo ignora)
+
+Los ids son los del entorno de origen; la importación los remapea.
+"""
+import json
+from decimal import Decimal, InvalidOperation
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .db_routers import board_db
+from .events import broadcast
+from .models import ActivityLog, ArchivedTask, Board, List, Task
+from .signals import mute_signals
+from .stats import rebuild_board_stats
+
+User = get_user_model()
+
+CHUNK_SIZE = 2000
+BATCH_SIZE = 500
+
+
+def _line(record):
+    return json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+async def export_board(board, include_activity=False, include_archived=False):
+    """
+    Generador async de líneas NDJSON. Cada consulta se recorre con aiterator()
+    por bloques, así que la memoria no depende del tamaño del tablero
+    (un generador síncrono se acumularía entero en memoria bajo ASGI).
+    """
+    yield _line({
+        'type': 'board',
+        'id': board.id,
+        'name': board.name,
+        'description': board.description,
+    })
+
+    # El generador se consume después de la vista, fuera del shard del request
+    db = board_db(board.id)
+    lists = List.objects.using(db).filter(board=board).order_by('position', 'id').values('id', 'title', 'position')
+    async for row in lists.aiterator(chunk_size=CHUNK_SIZE):
+        yield _line({'type': 'list', **row})
+
+    tasks = Task.objects.using(db).filter(board=board).order_by('list_id', 'position', 'id').values(
+        'id', 'list', 'title', 'description', 'position', 'due_date', 'priority'
+    )
+    async for row in tasks.aiterator(chunk_size=CHUNK_SIZE):
+        yield _line({'type': 'task', **row})
+
+    assignments = Task.assigned_to.through.objects.using(db).filter(task__board=board).order_by('task_id').values(
+        'task', 'user', username=F('user__username')
+    )
+    async for row in assignments.aiterator(chunk_size=CHUNK_SIZE):
+        yield _line({'type': 'assignment', **row})
+
+    if include_archived:
+        archived = ArchivedTask.objects.using(db).filter(board=board).order_by('list_id', 'position', 'id').values(
+            'id', 'list', 'title', 'description', 'position', 'due_date', 'priority', 'archived_at'
+        )
+        async for row in archived.aiterator(chunk_size=CHUNK_SIZE):
+            yield _line({'type': 'archived_task', **row})
+
+        assignments = ArchivedTask.assigned_to.through.objects.using(db).filter(archivedtask__board=board).order_by(
+            'archivedtask_id'
+        ).values('user', task=F('archivedtask'), username=F('user__username'))
+        async for row in assignments.aiterator(chunk_size=CHUNK_SIZE):
+            yield _line({'type': 'archived_assignment', **row})
+
+    if include_activity:
+        activity = ActivityLog.objects.using(db).filter(await _activity_filter(board)).order_by('timestamp', 'id').values(
+            'id', 'action', 'timestamp', 'object_id', model=F('content_type__model'), username=F('user__username')
+        )
+        async for row in activity.aiterator(chunk_size=CHUNK_SIZE):
+            yield _line({'type': 'activity', **row})
+
+
+async def _activity_filter(board):
+    get_for_model = sync_to_async(ContentType.objects.get_for_model)
+    board_ct, list_ct, task_ct = [await get_for_model(model) for model in (Board, List, Task)]
+    return (
+        Q(content_type=board_ct, object_id=board.id)
+        | Q(content_type=list_ct, object_id__in=List.objects.filter(board=board).values('id'))
+        | Q(content_type=task_ct, object_id__in=Task.objects.filter(board=board).values('id'))
+    )
+
+
+def _text(record, model, field, default=None):
+    """
+    Valor de texto del registro validado contra el max_length del modelo;
+    sin `default` el campo es obligatorio y no puede ir vacío.
+    """
+    value = record[field] if default is None else record.get(field) or default
+    max_length = model._meta.get_field(field).max_length
+    if not isinstance(value, str) or (default is None and not value.strip()):
+        raise ValueError(f"invalid {field!r}")
+    if max_length is not None and len(value) > max_length:
+        raise ValueError(f"{field!r} longer than {max_length} characters")
+    return value
+
+
+PRIORITIES = {value for value, _ in Task.PRIORITY_CHOICES}
+
+
+class BoardImporter:
+    """
+    Importa un stream NDJSON dentro de un tablero existente.
+    Acumula filas en buffers y las inserta con bulk_create por lotes,
+    respetando el orden listas -> tareas -> asignaciones. Solo se guardan
+    en memoria los mapas de ids antiguos a nuevos.
+    """
+
+    def __init__(self, board, batch_size=BATCH_SIZE):
+        self.board = board
+        self.db = board_db(board.id)
+        self.batch_size = batch_size
+        self.list_ids = {}
+        self.task_ids = {}
+        self.usernames = {}
+        self.pending_lists = []
+        self.pending_tasks = []
+        self.pending_assignments = []
+        self.summary = {'lists': 0, 'tasks': 0, 'assignments': 0, 'skipped': 0}
+
+    def feed(self, record):
+        if not isinstance(record, dict):
+            raise ValueError('expected a JSON object')
+        kind = record.get('type')
+        if kind == 'list':
+            self.pending_lists.append((record['id'], List(
+                board=self.board,
+                title=_text(record, List, 'title'),
+                position=Decimal(str(record.get('position', 0))),
+            )))
+        elif kind == 'task':
+            if record['list'] not in self.list_ids:
+                self.flush()
+            list_id = self.list_ids.get(record['list'])
+            if list_id is None:
+                self.summary['skipped'] += 1
+                return
+            priority = record.get('priority', 'medium')
+            if priority not in PRIORITIES:
+                raise ValueError(f"invalid priority {priority!r}")
+            self.pending_tasks.append((record['id'], Task(
+                list_id=list_id,
+                board=self.board,
+                title=_text(record, Task, 'title'),
+                description=_text(record, Task, 'description', default=''),
+                position=Decimal(str(record.get('position', 0))),
+                due_date=parse_datetime(record['due_date']) if record.get('due_date') else None,
+                priority=priority,
+            )))
+        elif kind == 'assignment':
+            if record['task'] not in self.task_ids:
+                self.flush()
+            self.pending_assignments.append((record['task'], record.get('username')))
+        elif kind in ('board', 'activity', 'archived_task', 'archived_assignment'):
+            return
+        else:
+            raise ValueError(f"unknown record type {kind!r}")
+
+        if max(len(self.pending_lists), len(self.pending_tasks), len(self.pending_assignments)) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending_lists:
+            created = List.objects.using(self.db).bulk_create([obj for _, obj in self.pending_lists])
+            for (old_id, _), obj in zip(self.pending_lists, created):
+                self.list_ids[old_id] = obj.id
+            self.summary['lists'] += len(created)
+            self.pending_lists = []
+
+        if self.pending_tasks:
+            created = Task.objects.using(self.db).bulk_create([obj for _, obj in self.pending_tasks])
+            for (old_id, _), obj in zip(self.pending_tasks, created):
+                self.task_ids[old_id] = obj.id
+            self.summary['tasks'] += len(created)
+            self.pending_tasks = []
+
+        if self.pending_assignments:
+            missing = {name for _, name in self.pending_assignments if name not in self.usernames}
+            self.usernames.update(User.objects.filter(username__in=missing).values_list('username', 'id'))
+            Through = Task.assigned_to.through
+            rows = [
+                Through(task_id=self.task_ids[old_task], user_id=self.usernames[name])
+                for old_task, name in self.pending_assignments
+                if old_task in self.task_ids and name in self.usernames
+            ]
+            Through.objects.using(self.db).bulk_create(rows, ignore_conflicts=True)
+            self.summary['assignments'] += len(rows)
+            self.summary['skipped'] += len(self.pending_assignments) - len(rows)
+            self.pending_assignments = []
+
+
+def import_board(board, lines, user=None):
+    """
+    Importa las líneas NDJSON en el tablero dentro de una única transacción,
+    con las señales silenciadas, y emite un solo evento de resumen al final.
+    """
+    importer = BoardImporter(board)
+    with transaction.atomic(using=importer.db), mute_signals():
+        for number, raw in enumerate(lines, start=1):
+            if not raw.strip():
+                continue
+            try:
+                importer.feed(json.loads(raw))
+            except (ValueError, KeyError, TypeError, InvalidOperation) as exc:
+                raise ValidationError({'detail': f"line {number}: {exc}"})
+        importer.flush()
+        rebuild_board_stats(board.id)
+
+        ActivityLog.objects.create(
+            user=user,
+            action=f"imported {importer.summary['lists']} lists and {importer.summary['tasks']} tasks",
+            content_type=ContentType.objects.get_for_model(board),
+            object_id=board.id
+        )
+
+    broadcast(board.id, {
+        'type': 'board_imported',
+        'summary': importer.summary
+    })
+    return importer.summary
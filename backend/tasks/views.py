@@ -1,12 +1,37 @@
+import heapq
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Q
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import status, permissions, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Board, List, Task, ActivityLog
-from .serializers import BoardSerializer, ListSerializer, TaskSerializer, ActivityLogSerializer, BoardMemberSerializer
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from .models import Board, BoardMember, List, Task, ArchivedTask, ActivityLog, Notification
+from .events import broadcast
+from .archive import archive_tasks, restore_tasks, stale_tasks
+from .cloning import clone_board
+from .history import HistoryUnavailable, board_at
+from .db_routers import board_db, each_shard, prefetch_by_shard, reset_shard_routing, route_shard_to, shard_for_board, shard_for_id, sharding_enabled, use_board_shard, use_shard
+from .permissions import BoardRolePermission, request_roles, require_board_role
+from .stats import board_stats
+from .notifications import mark_read, task_notifications, unread_count
+from .profiling import profile_path, recent_profiles
+from .activity import describe_task_update, log_task_update
+from .transfer import export_board, import_board
+from .renderers import CompactJSONRenderer
+from .warmup import STARTUP, warm_up
+from .serializers import BoardSerializer, ListSerializer, TaskSerializer, ArchivedTaskSerializer, ActivityLogSerializer, BoardMemberSerializer, NotificationSerializer, CompactBoardSerializer, windowed_lists, with_board_snapshot, board_snapshot_prefetches
 
 class RegisterView(APIView):
     permission_classes = (permissions.AllowAny,)
@@ -31,21 +56,16 @@ class RegisterView(APIView):
         user = User.objects.create_user(username=username, password=password, email=email)
         
         # Auto-add user to all existing boards as a member and notify
-        from .models import BoardMember
-        channel_layer = get_channel_layer()
-        
         for board in Board.objects.all():
-            member, created = BoardMember.objects.get_or_create(user=user, board=board, defaults={'role': 'member'})
+            with use_board_shard(board.id):
+                member, created = BoardMember.objects.get_or_create(user=user, board=board, defaults={'role': 'member'})
             
             # Notify board group
             serializer = BoardMemberSerializer(member)
-            async_to_sync(channel_layer.group_send)(
-                f'board_{board.id}',
-                {
-                    'type': 'member_added',
-                    'member': serializer.data
-                }
-            )
+            broadcast(board.id, {
+                'type': 'member_added',
+                'member': serializer.data
+            })
         
         refresh = RefreshToken.for_user(user)
         
@@ -59,23 +79,313 @@ class RegisterView(APIView):
             'access': str(refresh.access_token),
         }, status=status.HTTP_201_CREATED)
 
-class BoardViewSet(viewsets.ModelViewSet):
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_instant(value):
+    try:
+        return datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        pass
+    try:
+        at = parse_datetime(value)
+    except ValueError:
+        return None
+    if at is not None and timezone.is_naive(at):
+        at = timezone.make_aware(at)
+    return at
+
+
+class ShardContextMixin:
+    """
+    Con sharding, fija el shard del request (ver db_routers.use_shard) antes
+    de permisos y consultas: en las rutas de detalle por el id de la URL, al
+    crear por el tablero o la lista del cuerpo y en los listados por ?board=.
+    Sin sharding no hace nada.
+    """
+    # Campo del cuerpo que indica el shard al crear: ('board' | 'list', nombre)
+    shard_create_field = None
+    shard_by_board_pk = False
+    shard_list_requires_board = True
+
+    def request_shard(self, request):
+        pk = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        if pk is not None:
+            pk = _int(pk)
+            alias = None if pk is None else shard_for_board(pk) if self.shard_by_board_pk else shard_for_id(pk)
+            if alias is None:
+                raise Http404
+            return alias
+        if request.method == 'POST' and self.shard_create_field:
+            kind, field = self.shard_create_field
+            value = _int(request.data.get(field))
+            if value is None:
+                raise ValidationError({field: 'This field is required.'})
+            alias = shard_for_board(value) if kind == 'board' else shard_for_id(value)
+            if alias is None:
+                raise ValidationError({field: 'Invalid pk.'})
+            return alias
+        board_id = _int(request.query_params.get('board'))
+        if board_id is not None:
+            return shard_for_board(board_id)
+        if self.shard_list_requires_board:
+            raise ValidationError({'board': 'Required when the database is sharded.'})
+        return None
+
+    def initial(self, request, *args, **kwargs):
+        if sharding_enabled():
+            self._shard_token = route_shard_to(self.request_shard(request))
+        super().initial(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_shard_token', None)
+        if token is not None:
+            reset_shard_routing(token)
+            self._shard_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class BoardViewSet(ShardContextMixin, viewsets.ModelViewSet):
     queryset = Board.objects.all()
     serializer_class = BoardSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, BoardRolePermission]
+    shard_by_board_pk = True
+    # Los tableros están en 'default'; el listado precarga shard a shard
+    shard_list_requires_board = False
+
+    def get_renderers(self):
+        # El formato compacto solo existe para el detalle actual: en el resto de
+        # acciones (y con ?at=) Accept compacto da 406 y ?format=compact 404
+        renderers = super().get_renderers()
+        if self.action == 'retrieve' and 'at' not in self.request.query_params:
+            renderers.append(CompactJSONRenderer())
+        return renderers
 
     def get_queryset(self):
-        # En una app real filtraríamos por membresía
-        return Board.objects.all()
+        queryset = Board.objects.filter(id__in=list(request_roles(self.request)))
+        if self.action == 'list' and self.request.query_params.get('template') in ('0', '1'):
+            queryset = queryset.filter(is_template=self.request.query_params['template'] == '1')
+        if self.action in ('stats', 'members', 'export', 'import_data', 'clone') or 'at' in self.request.query_params:
+            return queryset
+        if self.compact:
+            # CompactBoardSerializer hace sus propias consultas por columnas
+            return queryset
+        if self.action == 'list' and sharding_enabled():
+            return queryset.select_related('owner')
+        return with_board_snapshot(queryset, self.request.user.id)
+
+    def list(self, request, *args, **kwargs):
+        if not sharding_enabled():
+            return super().list(request, *args, **kwargs)
+        boards = list(self.filter_queryset(self.get_queryset()))
+        prefetch_by_shard(boards, *board_snapshot_prefetches(request.user.id))
+        return Response(self.get_serializer(boards, many=True).data)
+
+    @property
+    def compact(self):
+        """
+        True en el detalle cuando la negociación eligió el formato compacto.
+        """
+        renderer = getattr(self.request, 'accepted_renderer', None)
+        return self.action == 'retrieve' and renderer is not None and renderer.format == CompactJSONRenderer.format
+
+    def retrieve(self, request, *args, **kwargs):
+        if 'at' in request.query_params:
+            return self.retrieve_at(request)
+        if not self.compact:
+            return super().retrieve(request, *args, **kwargs)
+        # ?include=description,created_at añade los campos pesados de las tareas
+        include = [field for field in request.query_params.get('include', '').split(',') if field]
+        serializer = CompactBoardSerializer(self.get_object(), context={'include': include, 'request': request})
+        return Response(serializer.data)
+
+    def retrieve_at(self, request):
+        """
+        ?at=<ISO 8601 o epoch en segundos>: el tablero tal como estaba en ese
+        instante, reconstruido desde el historial (ver tasks/history.py).
+        """
+        at = _parse_instant(request.query_params['at'])
+        if at is None:
+            raise ValidationError({'at': 'Must be an ISO 8601 datetime or a Unix timestamp.'})
+        board = self.get_object()
+        try:
+            return Response(board_at(board.id, at))
+        except HistoryUnavailable as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_404_NOT_FOUND)
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Contadores por lista, prioridad y asignado, vencidas y throughput
+        de los últimos ?days= días (14 por defecto).
+        """
+        try:
+            days = min(max(int(request.query_params.get('days', 14)), 1), 90)
+        except ValueError:
+            raise ValidationError({'days': 'Must be an integer.'})
+        return Response(board_stats(self.get_object(), days=days))
+
+    @action(detail=True, methods=['get'])
+    def members(self, request, pk=None):
+        """
+        Directorio completo de miembros paginado por keyset sobre (username, id):
+        ?search=<prefijo exacto>&after=<username>&after_id=<id>&limit=<n>. Como en
+        /api/lists/{id}/tasks/, `next` trae los parámetros de la página siguiente.
+        """
+        board = self.get_object()
+        params = request.query_params
+        try:
+            limit = min(max(int(params.get('limit', 50)), 1), 200)
+            after_id = int(params['after_id']) if 'after_id' in params else None
+        except ValueError:
+            raise ValidationError({'detail': 'Invalid pagination parameters.'})
+        after = params.get('after')
 
-class ListViewSet(viewsets.ModelViewSet):
+        # (board, username, user) cubre el prefijo, el orden y el keyset
+        queryset = BoardMember.objects.using(board_db(board.id)).filter(board=board).select_related('user').order_by('username', 'user_id')
+        if params.get('search'):
+            # Rango en lugar de LIKE: usa el índice y distingue mayúsculas en
+            # todos los motores (en SQLite LIKE no las distingue)
+            prefix = params['search']
+            queryset = queryset.filter(username__gte=prefix, username__lt=prefix + '\uffff')
+        if after is not None and after_id is not None:
+            queryset = queryset.filter(Q(username__gt=after) | Q(username=after, user_id__gt=after_id))
+        elif after is not None:
+            queryset = queryset.filter(username__gt=after)
+
+        page = list(queryset[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        return Response({
+            'results': BoardMemberSerializer(page, many=True).data,
+            'next': {'after': page[-1].username, 'after_id': page[-1].user_id} if has_more else None,
+        })
+
+    @action(detail=True, methods=['get'])
+    def export(self, request, pk=None):
+        """
+        Exporta el tablero como NDJSON en streaming. ?activity=1 incluye el
+        historial y ?archived=1 las tareas archivadas.
+        """
+        board = self.get_object()
+        include_activity = request.query_params.get('activity') in ('1', 'true')
+        include_archived = request.query_params.get('archived') in ('1', 'true')
+        response = StreamingHttpResponse(
+            export_board(board, include_activity=include_activity, include_archived=include_archived),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = f'attachment; filename="board-{board.id}.ndjson"'
+        return response
+
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        """
+        Copia el tablero (o plantilla) en uno nuevo del usuario: listas y tareas,
+        y con include_members / include_assignments también miembros y
+        asignaciones. as_template=true crea una plantilla.
+        """
+        source = self.get_object()
+        flags = {
+            key: str(request.data.get(key, '')).lower() in ('1', 'true')
+            for key in ('include_members', 'include_assignments', 'as_template')
+        }
+        board = clone_board(
+            source,
+            request.user,
+            name=request.data.get('name') or None,
+            include_members=flags['include_members'],
+            include_assignments=flags['include_assignments'],
+            is_template=flags['as_template'],
+        )
+        return Response(
+            BoardSerializer(
+                with_board_snapshot(Board.objects.filter(pk=board.pk), request.user.id).get(),
+                context=self.get_serializer_context(),
+            ).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    @action(detail=True, methods=['post'], url_path='import')
+    def import_data(self, request, pk=None):
+        """
+        Importa un export NDJSON (cuerpo del request) dentro de este tablero.
+        """
+        board = self.get_object()
+        require_board_role(request_roles(request), board.id, admin=True)
+        # Se lee el cuerpo línea a línea sin pasar por los parsers de DRF
+        summary = import_board(board, request._request, user=request.user)
+        return Response(summary, status=status.HTTP_201_CREATED)
+
+class ListViewSet(ShardContextMixin, viewsets.ModelViewSet):
     queryset = List.objects.all()
     serializer_class = ListSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, BoardRolePermission]
+    shard_create_field = ('board', 'board')
+
+    def get_queryset(self):
+        queryset = List.objects.filter(board_id__in=list(request_roles(self.request)))
+        if self.request.query_params.get('board'):
+            queryset = queryset.filter(board_id=self.request.query_params['board'])
+        if self.action in ('tasks', 'archive'):
+            return queryset
+        return windowed_lists(queryset)
+
+    @action(detail=True, methods=['get'])
+    def tasks(self, request, pk=None):
+        """
+        Tareas de la lista paginadas por keyset sobre (position, id):
+        ?after=<position>&after_id=<id>&limit=<n>. La respuesta trae en `next`
+        los parámetros de la página siguiente, o null si no hay más.
+
+        Los eventos en tiempo real llevan list_id y position, así que el cliente
+        puede ignorar los que caen después de la última tarea cargada de la lista.
+        """
+        task_list = self.get_object()
+        params = request.query_params
+        try:
+            limit = min(int(params.get('limit', settings.BOARD_TASKS_PER_LIST)), 500)
+            after = Decimal(params['after']) if 'after' in params else None
+            after_id = int(params['after_id']) if 'after_id' in params else None
+        except (ValueError, InvalidOperation):
+            raise ValidationError({'detail': 'Invalid pagination parameters.'})
+
+        queryset = task_list.tasks.prefetch_related('assigned_to').order_by('position', 'id')
+        if after is not None and after_id is not None:
+            queryset = queryset.filter(Q(position__gt=after) | Q(position=after, id__gt=after_id))
+        elif after is not None:
+            queryset = queryset.filter(position__gt=after)
+
+        page = list(queryset[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+        return Response({
+            'results': TaskSerializer(page, many=True).data,
+            'next': {'after': str(page[-1].position), 'after_id': page[-1].id} if has_more else None,
+        })
+
+    @action(detail=True, methods=['post'])
+    def archive(self, request, pk=None):
+        """
+        Archiva las tareas de la lista; con older_than_days solo las que
+        llevan ese tiempo sin modificarse.
+        """
+        task_list = self.get_object()
+        queryset = task_list.tasks.all()
+        if request.data.get('older_than_days') is not None:
+            try:
+                days = int(request.data['older_than_days'])
+            except (TypeError, ValueError):
+                raise ValidationError({'older_than_days': 'Must be an integer.'})
+            queryset = stale_tasks(days, queryset)
+        return Response({'archived': archive_tasks(queryset, user=request.user)})
 
     def perform_create(self, serializer):
+        require_board_role(request_roles(self.request), serializer.validated_data['board'].id)
         instance = serializer.save()
-        from django.contrib.contenttypes.models import ContentType
         last_log = ActivityLog.objects.filter(
             content_type=ContentType.objects.get_for_model(instance),
             object_id=instance.id
@@ -84,9 +394,16 @@ class ListViewSet(viewsets.ModelViewSet):
             last_log.user = self.request.user
             last_log.save()
 
+    def perform_update(self, serializer):
+        if 'board' in serializer.validated_data:
+            board = serializer.validated_data['board']
+            require_board_role(request_roles(self.request), board.id)
+            if board_db(board.id) != board_db(serializer.instance.board_id):
+                raise ValidationError({'board': 'Cannot move a list to a board on another shard.'})
+        serializer.save()
+
     def perform_destroy(self, instance):
         # El signal post_delete no tiene acceso al request, lo registramos aquí antes de borrar
-        from django.contrib.contenttypes.models import ContentType
         ActivityLog.objects.create(
             user=self.request.user,
             action=f"deleted list '{instance.title}'",
@@ -95,15 +412,25 @@ class ListViewSet(viewsets.ModelViewSet):
         )
         instance.delete()
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(ShardContextMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
-    permission_classes = [permissions.IsAuthenticated]
+    permission_classes = [permissions.IsAuthenticated, BoardRolePermission]
+    # Con sharding, mover a una lista de otro shard da "Invalid pk" (no la ve)
+    shard_create_field = ('list', 'list')
+
+    def get_queryset(self):
+        # Task.board_id evita el join con List
+        queryset = Task.objects.filter(board_id__in=list(request_roles(self.request)))
+        if self.request.query_params.get('board'):
+            queryset = queryset.filter(board_id=self.request.query_params['board'])
+        return queryset
 
     def perform_create(self, serializer):
+        require_board_role(request_roles(self.request), serializer.validated_data['list'].board_id)
         instance = serializer.save()
+        task_notifications(instance, self.request.user, serializer.validated_data.get('assigned_to', ()))
         
-        from django.contrib.contenttypes.models import ContentType
         last_log = ActivityLog.objects.filter(
             content_type=ContentType.objects.get_for_model(instance),
             object_id=instance.id
@@ -114,6 +441,8 @@ class TaskViewSet(viewsets.ModelViewSet):
             last_log.save()
 
     def perform_update(self, serializer):
+        if 'list' in serializer.validated_data:
+            require_board_role(request_roles(self.request), serializer.validated_data['list'].board_id)
         old_instance = self.get_object()
         old_list = old_instance.list
         old_title = old_instance.title
@@ -122,17 +451,12 @@ class TaskViewSet(viewsets.ModelViewSet):
         old_assigned = set(old_instance.assigned_to.all())
 
         instance = serializer.save()
-        
-        # Check if anything relevant changed
-        has_list_changed = old_list != instance.list
-        has_content_changed = old_title != instance.title or old_description != instance.description
-        # Position diff check (rounding)
-        has_position_changed = abs(float(old_position) - float(instance.position)) > 0.0001
-        
         new_assigned = set(instance.assigned_to.all())
-        has_assignment_changed = old_assigned != new_assigned
+        task_notifications(instance, self.request.user, new_assigned - old_assigned, old_description)
+        change = describe_task_update(
+            instance, old_list, old_title, old_description, old_position, old_assigned, new_assigned
+        )
 
-        from django.contrib.contenttypes.models import ContentType
         # Ultimo log creado por el signal
         last_log = ActivityLog.objects.filter(
             content_type=ContentType.objects.get_for_model(instance),
@@ -140,37 +464,16 @@ class TaskViewSet(viewsets.ModelViewSet):
             user__isnull=True
         ).order_by('-timestamp').first()
 
-        if not (has_list_changed or has_content_changed or has_position_changed or has_assignment_changed):
+        if change is None:
             # No real changes, delete noise log
             if last_log: last_log.delete()
             return
 
-        if has_list_changed:
-            action_msg = f"moved task '{instance.title}' to '{instance.list.title}'"
-        elif has_assignment_changed:
-            added = new_assigned - old_assigned
-            removed = old_assigned - new_assigned
-            if added:
-                names = ", ".join([u.username for u in added if u and hasattr(u, 'username')])
-                action_msg = f"assigned task '{instance.title}' to {names}"
-            elif removed:
-                names = ", ".join([u.username for u in removed if u and hasattr(u, 'username')])
-                action_msg = f"unassigned {names} from task '{instance.title}'"
-            else:
-                action_msg = f"updated assignments for task '{instance.title}'"
-        elif has_position_changed and not has_content_changed:
-            action_msg = f"reordered task '{instance.title}' in '{instance.list.title}'"
-        else:
-            action_msg = f"updated task '{instance.title}'"
-
         if last_log:
-            last_log.user = self.request.user
-            last_log.action = action_msg
-            last_log.save()
+            log_task_update(self.request.user, instance, *change, pending=last_log)
 
 
     def perform_destroy(self, instance):
-        from django.contrib.contenttypes.models import ContentType
         ActivityLog.objects.create(
             user=self.request.user,
             action=f"deleted task '{instance.title}'",
@@ -179,12 +482,158 @@ class TaskViewSet(viewsets.ModelViewSet):
         )
         instance.delete()
 
+    @action(detail=True, methods=['post'])
+    def archive(self, request, pk=None):
+        task = self.get_object()
+        archive_tasks(Task.objects.filter(pk=task.pk), user=request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class ArchivePagination(CursorPagination):
+    ordering = ('-archived_at', '-id')
+    page_size = 50
 
-class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
+
+class ArchivedTaskViewSet(ShardContextMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Consulta de la tabla fría. Filtros: ?board=, ?list=, ?search= (título y descripción).
+    """
+    queryset = ArchivedTask.objects.all()
+    serializer_class = ArchivedTaskSerializer
+    permission_classes = [permissions.IsAuthenticated, BoardRolePermission]
+    pagination_class = ArchivePagination
+
+    def get_queryset(self):
+        queryset = ArchivedTask.objects.filter(board_id__in=list(request_roles(self.request))).prefetch_related('assigned_to')
+        params = self.request.query_params
+        if params.get('board'):
+            queryset = queryset.filter(board_id=params['board'])
+        if params.get('list'):
+            queryset = queryset.filter(list_id=params['list'])
+        if params.get('search'):
+            queryset = queryset.filter(Q(title__icontains=params['search']) | Q(description__icontains=params['search']))
+        return queryset
+
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        archived = self.get_object()
+        restore_tasks(ArchivedTask.objects.filter(pk=archived.pk), user=request.user)
+        return Response(TaskSerializer(Task.objects.get(pk=archived.pk)).data)
+
+
+class ActivityLogViewSet(ShardContextMixin, viewsets.ReadOnlyModelViewSet):
 
     queryset = ActivityLog.objects.all().order_by('-timestamp')
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # El listado sin ?board= reparte la consulta entre los shards
+    shard_list_requires_board = False
+    # Entradas más recientes que devuelve el listado (?limit= hasta max_page_size)
+    page_size = 100
+    max_page_size = 500
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.page_size))
+        except ValueError:
+            raise ValidationError({'limit': 'Must be an integer.'})
+        return max(1, min(limit, self.max_page_size))
+
+    def list(self, request, *args, **kwargs):
+        limit = self.get_limit()
+        if not sharding_enabled():
+            return Response(self.get_serializer(self.filter_queryset(self.get_queryset())[:limit], many=True).data)
+        # Cada shard aporta como mucho `limit` filas ya ordenadas; la mezcla
+        # se corta en `limit` sin cargar el historial completo de ningún shard.
+        per_shard = []
+        for alias in each_shard():
+            with use_shard(alias):
+                per_shard.append(list(self.get_queryset()[:limit]))
+        logs = heapq.merge(*per_shard, key=lambda log: log.timestamp, reverse=True)
+        return Response(self.get_serializer(list(islice(logs, limit)), many=True).data)
+
+    def get_queryset(self):
+        # Solo la actividad de tableros, listas y tareas de los tableros del usuario
+        board_ids = list(request_roles(self.request))
+        content_types = ContentType.objects.get_for_models(Board, List, Task)
+        return ActivityLog.objects.filter(
+            Q(content_type=content_types[Board], object_id__in=board_ids)
+            | Q(content_type=content_types[List], object_id__in=List.objects.filter(board_id__in=board_ids).values('id'))
+            | Q(content_type=content_types[Task], object_id__in=Task.objects.filter(board_id__in=board_ids).values('id'))
+        ).order_by('-timestamp')
+
+
+
+class NotificationPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 50
+
+
+class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Bandeja del usuario. ?unread=1 filtra las no leídas; /unread/ devuelve
+    solo el contador y /read/ marca como leídas las `ids` indicadas (o todas).
+    """
+    serializer_class = NotificationSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
+
+    def get_queryset(self):
+        queryset = Notification.objects.filter(user=self.request.user).select_related('actor')
+        if self.request.query_params.get('unread') in ('1', 'true'):
+            queryset = queryset.filter(read_at__isnull=True)
+        return queryset
+
+    @action(detail=False, methods=['get'])
+    def unread(self, request):
+        return Response({'unread': unread_count(request.user.id)})
+
+    @action(detail=False, methods=['post'])
+    def read(self, request):
+        ids = request.data.get('ids')
+        if ids is not None and (not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids)):
+            raise ValidationError({'ids': 'Must be a list of integers.'})
+        changed = mark_read(request.user, ids)
+        return Response({'read': changed, 'unread': unread_count(request.user.id)})
+
+
+class ReadinessView(APIView):
+    """
+    Sonda de disponibilidad del worker: 503 hasta que warm_up() termina bien
+    (ver tasks/warmup.py), 200 con los tiempos de arranque después. Si el
+    calentamiento falló, cada sonda lo reintenta.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        if not STARTUP['ready'] and 'error' in STARTUP:
+            warm_up()
+        return Response(STARTUP, status=status.HTTP_200_OK if STARTUP['ready'] else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class ProfileListView(APIView):
+    """
+    Perfiles recientes ordenados por tiempo de pared (ver tasks/profiling.py).
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get('limit', 50)), 1), 200)
+        except ValueError:
+            raise ValidationError({'limit': 'Debe ser un entero.'})
+        return Response(recent_profiles(limit))
+
+
+class ProfileDetailView(APIView):
+    """
+    El perfil en formato folded, listo para flamegraph.pl o speedscope.
+    """
+    permission_classes = [permissions.IsAdminUser]
 
+    def get(self, request, name):
+        path = profile_path(name)
+        if path is None:
+            raise Http404
+        return HttpResponse(path.read_text(), content_type='text/plain; charset=utf-8')
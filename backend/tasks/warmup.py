@@ -0,0 +1,141 @@
+"""
+Arranque en caliente de los workers ASGI (ver config/asgi.py).
+
+Lo que Django y DRF cargan de forma perezosa se paga en la primera petición
+de cada worker: el URLconf (y con él vistas y serializadores), la caché de
+ContentType de cada alias, los campos de los serializadores, las clases de
+api_settings y el primer paso por el compilador de consultas. warm_up() lo
+carga al importar la aplicación, antes de que el worker acepte conexiones, y
+deja en STARTUP el tiempo de cada paso. Si un paso falla (p. ej. la base de
+datos aún no responde) el error se registra y queda en STARTUP['error'];
+/api/health/ready/ responde 503 y reintenta el calentamiento hasta que
+termina bien. El esquema OpenAPI y el admin no se precargan: se importan en
+su primera petición (ver config/urls.py).
+"""
+import logging
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.urls import get_resolver
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .db_routers import use_board_shard, use_primary
+from .models import Board
+from .serializers import (
+    ActivityLogSerializer, ArchivedTaskSerializer, BoardMemberSerializer, BoardSerializer, ListSerializer,
+    NotificationSerializer, TaskSerializer, with_board_snapshot,
+)
+
+# Una ruta por vista que atiende tráfico: compila los patrones de URL
+WARM_PATHS = (
+    '/api/boards/1/', '/api/boards/1/members/', '/api/lists/1/tasks/', '/api/tasks/1/',
+    '/api/activity/', '/api/notifications/', '/api/async/tasks/1/', '/api/token/',
+)
+
+# Clases de api_settings que DRF importa al primer acceso (DEFAULT_SCHEMA_CLASS no:
+# arrastra drf_spectacular y solo la usa el esquema)
+API_SETTINGS = (
+    'DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES',
+    'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_THROTTLE_CLASSES', 'DEFAULT_CONTENT_NEGOTIATION_CLASS',
+    'DEFAULT_METADATA_CLASS', 'DEFAULT_VERSIONING_CLASS', 'DEFAULT_PAGINATION_CLASS',
+    'DEFAULT_FILTER_BACKENDS', 'EXCEPTION_HANDLER',
+)
+JWT_SETTINGS = ('AUTH_TOKEN_CLASSES', 'TOKEN_USER_CLASS', 'JSON_ENCODER')
+
+SERIALIZERS = (
+    BoardSerializer, ListSerializer, TaskSerializer, ArchivedTaskSerializer,
+    BoardMemberSerializer, ActivityLogSerializer, NotificationSerializer,
+)
+
+STARTUP = {'ready': False, 'steps': {}}
+
+logger = logging.getLogger(__name__)
+
+
+def _urls():
+    resolver = get_resolver()
+    for path in WARM_PATHS:
+        resolver.resolve(path)
+
+
+def _content_types():
+    models = [*apps.get_app_config('tasks').get_models(), get_user_model()]
+    # La caché de ContentTypeManager es por alias y las lecturas pueden ir a
+    # réplicas o shards. get_for_models() crea los que falten, así que solo se
+    # usa en los alias de escritura
+    content_types = {}
+    for alias in ['default', *settings.DATABASE_SHARDS]:
+        content_types = ContentType.objects.db_manager(alias).get_for_models(*models)
+    # En las réplicas, get_for_id() solo lee (y guarda en la caché por id y por modelo)
+    for alias in settings.DATABASE_REPLICAS:
+        for content_type in content_types.values():
+            try:
+                ContentType.objects.db_manager(alias).get_for_id(content_type.id)
+            except ContentType.DoesNotExist:
+                # Réplica atrasada: se cargará en la primera petición
+                continue
+
+
+def _api_settings():
+    for name in API_SETTINGS:
+        getattr(api_settings, name)
+    for name in JWT_SETTINGS:
+        getattr(jwt_settings, name)
+
+
+def _touch_fields(serializer):
+    for field in serializer.fields.values():
+        child = getattr(field, 'child', field)
+        if isinstance(child, serializers.BaseSerializer) and hasattr(child, 'fields'):
+            _touch_fields(child)
+
+
+def _serializers():
+    for serializer_class in SERIALIZERS:
+        _touch_fields(serializer_class())
+
+
+def _snapshot():
+    # Una lectura real del snapshot (solo lectura) recorre una vez el compilador
+    # de consultas, las precargas y la serialización anidada
+    board_id = Board.objects.order_by('pk').values_list('pk', flat=True).first()
+    if board_id is not None:
+        with use_primary(), use_board_shard(board_id):
+            BoardSerializer(with_board_snapshot(Board.objects.filter(pk=board_id)).get()).data
+
+
+STEPS = (
+    ('urls', _urls),
+    ('content_types', _content_types),
+    ('api_settings', _api_settings),
+    ('serializers', _serializers),
+    ('snapshot', _snapshot),
+)
+
+
+def warm_up():
+    """
+    Ejecuta los pasos de calentamiento, marca el worker como listo y
+    devuelve STARTUP ({'ready': True, 'steps': {paso: ms}, 'total_ms': ms}).
+    Si un paso falla no se lanza la excepción: se registra, STARTUP queda con
+    ready=False y 'error', y una llamada posterior vuelve a empezar.
+    """
+    started = time.perf_counter()
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        try:
+            step()
+        except Exception as exc:
+            logger.exception('Worker warm-up failed at step %r', name)
+            STARTUP['error'] = f'{name}: {exc}'
+            return STARTUP
+        STARTUP['steps'][name] = round((time.perf_counter() - step_started) * 1000, 1)
+    STARTUP['total_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    STARTUP.pop('error', None)
+    STARTUP['ready'] = True
+    return STARTUP
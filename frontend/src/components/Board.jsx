@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback, useMemo } from 'react';
+import React, { useState, useEffect, useCallback, useMemo, useRef } from 'react';
 import {
     DndContext,
     closestCorners,
@@ -24,6 +24,86 @@ import Sidebar from './Sidebar';
 import useWebsocket from '../hooks/useWebsocket';
 import api from '../services/api';
 
+// Eventos WebSocket aplicados sobre el estado local (ver applyBoardEvent)
+const byPosition = (a, b) => parseFloat(a.position) - parseFloat(b.position);
+
+// Inserta la tarea si cae dentro de la ventana cargada; si no, solo cuenta
+const insertTask = (list, task) => {
+    const last = list.tasks[list.tasks.length - 1];
+    const inWindow = list.tasks.length >= list.task_count || (last && byPosition(task, last) <= 0);
+    const isLast = list.last_position == null || parseFloat(task.position) > parseFloat(list.last_position);
+    return {
+        ...list,
+        task_count: list.task_count + 1,
+        last_position: isLast ? task.position : list.last_position,
+        tasks: inWindow ? [...list.tasks, task].sort(byPosition) : list.tasks,
+    };
+};
+
+// Quita las tareas indicadas; null si alguna no está cargada (no se sabe su lista)
+const removeTasks = (lists, taskIds) => {
+    const ids = new Set(taskIds);
+    let found = 0;
+    const next = lists.map(list => {
+        const tasks = list.tasks.filter(t => !ids.has(t.id));
+        found += list.tasks.length - tasks.length;
+        return tasks.length === list.tasks.length ? list : { ...list, tasks, task_count: list.task_count - (list.tasks.length - tasks.length) };
+    });
+    return found === ids.size ? next : null;
+};
+
+const fromPayload = (task, previous) => ({
+    assigned_to: [],
+    ...previous,
+    id: task.id,
+    list: task.list_id,
+    title: task.title,
+    description: task.description,
+    position: task.position,
+    due_date: task.due_date,
+    priority: task.priority,
+});
+
+/**
+ * Aplica un evento de estado al tablero y devuelve el tablero nuevo, o null
+ * si el payload no basta (importaciones, restauraciones, tareas fuera de la
+ * ventana cargada...) y hay que pedirlo entero por REST.
+ */
+const applyBoardEvent = (board, event) => {
+    switch (event.type) {
+        case 'board_updated':
+            return { ...board, ...event.board };
+        case 'task_created':
+        case 'task_updated': {
+            const previous = board.lists.flatMap(l => l.tasks).find(t => t.id === event.task.id);
+            const lists = previous ? removeTasks(board.lists, [previous.id]) : board.lists;
+            if (event.type === 'task_updated' && !previous) return null;
+            if (!lists.some(l => l.id === event.task.list_id)) return null;
+            const task = fromPayload(event.task, previous);
+            return { ...board, lists: lists.map(l => l.id === task.list ? insertTask(l, task) : l) };
+        }
+        case 'task_deleted': {
+            const lists = removeTasks(board.lists, [event.task_id]);
+            return lists && { ...board, lists };
+        }
+        case 'tasks_archived': {
+            const lists = removeTasks(board.lists, event.task_ids);
+            return lists && { ...board, lists };
+        }
+        case 'list_created':
+        case 'list_updated': {
+            const { board_id, ...fields } = event.list;
+            const previous = board.lists.find(l => l.id === fields.id);
+            const list = previous ? { ...previous, ...fields } : { ...fields, board: board_id, tasks: [], task_count: 0, last_position: null };
+            return { ...board, lists: [...board.lists.filter(l => l.id !== list.id), list].sort(byPosition) };
+        }
+        case 'list_deleted':
+            return { ...board, lists: board.lists.filter(l => l.id !== event.list_id) };
+        default:
+            return null;
+    }
+};
+
 const Board = () => {
     // Board State
     const [board, setBoard] = useState(null);
@@ -49,6 +129,7 @@ const Board = () => {
     const [newListTitle, setNewListTitle] = useState('');
     const [editingList, setEditingList] = useState(null);
     const [editListTitle, setEditListTitle] = useState('');
+    const [memberDirectory, setMemberDirectory] = useState([]);
 
     const boardId = 1;
     const { user, logout } = useAuth();
@@ -60,13 +141,27 @@ const Board = () => {
         // Check if user is the owner (super-admin for the board) or has 'admin' role in members
         // Also allow Django staff/superusers to delete if needed, but let's stick to board logic first.
         if (board.owner && board.owner.id === user.id) return true;
-        const member = board.members.find(m => m.id === user.id);
+        // board.members solo trae los miembros activos; el directorio tiene al resto
+        const member = [...board.members, ...memberDirectory].find(m => m.id === user.id);
         return member && member.role === 'admin';
-    }, [user, board]);
+    }, [user, board, memberDirectory]);
+
+    // Directorio para los selectores de asignación (primera página, paginado por keyset)
+    useEffect(() => {
+        api.get(`boards/${boardId}/members/`, { params: { limit: 200 } })
+            .then(response => setMemberDirectory(response.data.results))
+            .catch(error => console.error('Error fetching members:', error));
+    }, [boardId]);
+
+    // Última versión aplicada: los eventos con version + 1 se aplican en local
+    const versionRef = useRef(null);
+    const boardRef = useRef(board);
+    useEffect(() => { boardRef.current = board; }, [board]);
 
     const fetchBoardData = useCallback(async () => {
         try {
             const response = await api.get(`boards/${boardId}/`);
+            versionRef.current = response.data.version;
             setBoard(response.data);
         } catch (error) {
             console.error('Error fetching board:', error);
@@ -75,32 +170,77 @@ const Board = () => {
         }
     }, [boardId]);
 
+    // El tablero llega como primer frame del WebSocket; REST solo si no llega a tiempo
     useEffect(() => {
-        fetchBoardData();
+        const fallback = setTimeout(() => {
+            setBoard(prev => {
+                if (!prev) fetchBoardData();
+                return prev;
+            });
+        }, 3000);
+        return () => clearTimeout(fallback);
     }, [fetchBoardData]);
 
+    // El snapshot solo trae la primera ventana de cada lista; el resto se pide por keyset
+    const handleLoadMoreTasks = async (listId) => {
+        const list = board.lists.find(l => l.id === listId);
+        const last = list.tasks[list.tasks.length - 1];
+        try {
+            const response = await api.get(`lists/${listId}/tasks/`, {
+                params: last ? { after: last.position, after_id: last.id } : {}
+            });
+            setBoard(prev => ({
+                ...prev,
+                lists: prev.lists.map(l => l.id === listId ? { ...l, tasks: [...l.tasks, ...response.data.results] } : l)
+            }));
+        } catch (error) {
+            console.error('Error loading tasks:', error);
+        }
+    };
+
     const [onlineUsers, setOnlineUsers] = useState(new Set());
 
     useEffect(() => {
         if (!lastMessage) return;
-        const types = ['task_updated', 'task_created', 'task_deleted', 'task_moved', 'list_created', 'list_updated', 'list_deleted', 'member_added'];
-        if (types.includes(lastMessage.type)) {
+        if (lastMessage.type === 'snapshot') {
+            versionRef.current = lastMessage.version;
+            setBoard(lastMessage.board);
+            setIsLoading(false);
+            return;
+        }
+        if (lastMessage.type === 'resync') {
+            // El servidor ha descartado eventos (cliente lento): estado completo por REST
             fetchBoardData();
+            return;
+        }
+        const types = ['board_updated', 'task_updated', 'task_created', 'task_deleted', 'task_moved', 'list_created', 'list_updated', 'list_deleted', 'member_added', 'tasks_archived', 'tasks_restored', 'board_imported'];
+        if (types.includes(lastMessage.type)) {
+            const { version } = lastMessage;
+            const last = versionRef.current;
+            // Ya incluido en el snapshot o en la última carga REST
+            if (version != null && last != null && version <= last) return;
             setLastActivityEvent(lastMessage);
+            // Solo el siguiente evento se aplica en local; un hueco (o un evento
+            // que no se puede reproducir) recarga el tablero
+            const next = version != null && version === last + 1 && boardRef.current
+                ? applyBoardEvent(boardRef.current, lastMessage)
+                : null;
+            if (next) {
+                versionRef.current = version;
+                boardRef.current = next;
+                setBoard(next);
+            } else {
+                fetchBoardData();
+            }
         }
 
         if (lastMessage.type === 'present_users') {
             setOnlineUsers(new Set(lastMessage.users));
-        } else if (lastMessage.type === 'user_joined') {
-            setOnlineUsers(prev => {
-                const newSet = new Set(prev);
-                newSet.add(lastMessage.user);
-                return newSet;
-            });
-        } else if (lastMessage.type === 'user_left') {
+        } else if (lastMessage.type === 'presence_changed') {
             setOnlineUsers(prev => {
                 const newSet = new Set(prev);
-                newSet.delete(lastMessage.user);
+                lastMessage.joined.forEach(u => newSet.add(u));
+                lastMessage.left.forEach(u => newSet.delete(u));
                 return newSet;
             });
         }
@@ -131,7 +271,9 @@ const Board = () => {
         setIsSavingTask(true);
         try {
             const list = board.lists.find(l => l.id === listId);
-            const maxPos = list.tasks.length > 0 ? Math.max(...list.tasks.map(t => parseFloat(t.position))) : 0;
+            // last_position viene del servidor: la ventana cargada puede no incluir la última tarea
+            const positions = [list.last_position, ...list.tasks.map(t => t.position)].filter(p => p != null);
+            const maxPos = positions.length > 0 ? Math.max(...positions.map(p => parseFloat(p))) : 0;
             const newPos = maxPos + 1000;
 
             await api.post('tasks/', {
@@ -395,6 +537,8 @@ const Board = () => {
                                 key={list.id}
                                 list={list}
                                 tasks={list.tasks}
+                                hasMoreTasks={(board.lists.find(l => l.id === list.id)?.tasks.length || 0) < list.task_count}
+                                handleLoadMoreTasks={handleLoadMoreTasks}
                                 activeListMenu={activeListMenu}
                                 setActiveListMenu={setActiveListMenu}
                                 setEditingList={setEditingList}
@@ -408,7 +552,7 @@ const Board = () => {
                                 isSavingTask={isSavingTask}
                                 handleDeleteTask={handleDeleteTask}
                                 setEditingTask={setEditingTask}
-                                boardMembers={board?.members || []}
+                                boardMembers={memberDirectory}
                                 canDeleteTask={canDeleteTask}
                                 handleAssignTask={async (taskId, userId) => {
                                     const currentTask = board.lists.flatMap(l => l.tasks).find(t => t.id === taskId);
@@ -539,7 +683,7 @@ const Board = () => {
                             <div className="space-y-3">
                                 <label className="text-[10px] font-black uppercase tracking-widest text-blue-400/80 ml-1">Assigned Members</label>
                                 <div className="flex flex-wrap gap-2">
-                                    {(board?.members || []).map(member => {
+                                    {memberDirectory.map(member => {
                                         const isAssigned = (taskFormData.assigned_to || []).some(u => u.id === member.id);
                                         return (
                                             <button
@@ -642,7 +786,7 @@ const Board = () => {
                             <div className="space-y-3">
                                 <label className="text-[10px] font-black uppercase tracking-widest text-blue-400/80 ml-1">Assigned Members</label>
                                 <div className="flex flex-wrap gap-2">
-                                    {(board?.members || []).map(member => {
+                                    {memberDirectory.map(member => {
                                         const isAssigned = (taskFormData.assigned_to || []).some(u => u.id === member.id);
                                         return (
                                             <button
@@ -7,6 +7,8 @@ import DraggableTask from './DraggableTask';
 const BoardColumn = ({
     list,
     tasks,
+    hasMoreTasks,
+    handleLoadMoreTasks,
     activeListMenu,
     setActiveListMenu,
     setEditingList,
@@ -33,7 +35,7 @@ const BoardColumn = ({
             <div className="p-5 flex items-center justify-between relative border-b border-white/10 bg-white/5">
                 <div className="flex items-center gap-3">
                     <h3 className="font-black text-white text-xs tracking-widest uppercase py-1 px-3 bg-white/10 rounded-full shadow-sm border border-white/10 backdrop-blur-md">{list.title}</h3>
-                    <span className="text-[10px] font-bold text-gray-300 bg-black/20 px-2 py-0.5 rounded-md border border-white/5">{tasks.length}</span>
+                    <span className="text-[10px] font-bold text-gray-300 bg-black/20 px-2 py-0.5 rounded-md border border-white/5">{list.task_count ?? tasks.length}</span>
                 </div>
                 <div className="relative">
                     <button
@@ -85,6 +87,15 @@ const BoardColumn = ({
                     </div>
                 </SortableContext>
 
+                {hasMoreTasks && (
+                    <button
+                        onClick={() => handleLoadMoreTasks(list.id)}
+                        className="w-full p-3 mt-4 text-gray-400 hover:bg-white/5 hover:text-white rounded-2xl transition-all duration-300 text-[10px] font-black uppercase tracking-widest"
+                    >
+                        Load more
+                    </button>
+                )}
+
                 <button
                     onClick={() => { setCreatingInList(list.id); setTaskFormData({ id: null, title: '', description: '', assigned_to: [], priority: 'medium' }); }}
                     className="w-full flex items-center justify-center gap-2 p-4 mt-5 text-gray-400 hover:bg-white/5 hover:text-blue-400 rounded-2xl transition-all duration-300 text-xs font-black uppercase tracking-widest border-2 border-dashed border-white/5 hover:border-blue-400/30 hover:shadow-lg"
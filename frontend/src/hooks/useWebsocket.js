@@ -1,16 +1,40 @@
 import { useEffect, useRef, useState, useCallback } from 'react';
 
+// Frames recibidos entre acks (el servidor admite ACK_WINDOW = 64 sin confirmar)
+const ACK_EVERY = 16;
+const ACK_DELAY_MS = 100;
+// Cierre del servidor por cliente lento: hay que reconectar y recargar el tablero
+const CLOSE_RESYNC = 4008;
+
 const useWebsocket = (boardId) => {
     const socketRef = useRef(null);
     const [isConnected, setIsConnected] = useState(false);
     const [lastMessage, setLastMessage] = useState(null);
+    const [reconnectKey, setReconnectKey] = useState(0);
+    const retryAfterRef = useRef(null);
 
     useEffect(() => {
         if (!boardId) return;
 
+        let retryTimer = null;
+        let ackTimer = null;
+        let received = 0;
+        let acked = 0;
         const token = localStorage.getItem('access_token');
-        const wsUrl = `ws://localhost:8000/ws/board/${boardId}/${token ? `?token=${token}` : ''}`;
-        socketRef.current = new WebSocket(wsUrl);
+        // snapshot=1: el primer frame trae el tablero completo y su versión
+        const wsUrl = `ws://localhost:8000/ws/board/${boardId}/?snapshot=1${token ? `&token=${token}` : ''}`;
+        const socket = new WebSocket(wsUrl);
+        socketRef.current = socket;
+
+        // Control de flujo: confirma los frames ya procesados (ver BoardConsumer._drain_outbox)
+        const sendAck = () => {
+            clearTimeout(ackTimer);
+            ackTimer = null;
+            if (received > acked && socket.readyState === WebSocket.OPEN) {
+                acked = received;
+                socket.send(JSON.stringify({ type: 'ack', received }));
+            }
+        };
 
         socketRef.current.onopen = () => {
             console.log('Connected to board WebSocket');
@@ -20,12 +44,34 @@ const useWebsocket = (boardId) => {
         socketRef.current.onmessage = (event) => {
             const data = JSON.parse(event.data);
             console.log('WS Message:', data);
+            received += 1;
+            if (received - acked >= ACK_EVERY) {
+                sendAck();
+            } else if (!ackTimer) {
+                ackTimer = setTimeout(sendAck, ACK_DELAY_MS);
+            }
+            if (data.type === 'retry') {
+                // Servidor saturado: reintentar cuando indique (ya lleva jitter)
+                retryAfterRef.current = data.retry_after;
+                return;
+            }
+            // {type: 'resync'} también llega aquí: el tablero se recarga entero
             setLastMessage(data);
         };
 
-        socketRef.current.onclose = () => {
+        socketRef.current.onclose = (event) => {
             console.log('Disconnected from board WebSocket');
             setIsConnected(false);
+            clearTimeout(ackTimer);
+            if (event.code === CLOSE_RESYNC) {
+                // Se han perdido eventos: recargar y reconectar (con un snapshot nuevo)
+                setLastMessage({ type: 'resync', reason: 'closed' });
+                retryTimer = setTimeout(() => setReconnectKey(k => k + 1), 0);
+            } else if (retryAfterRef.current !== null) {
+                const delay = retryAfterRef.current * 1000;
+                retryAfterRef.current = null;
+                retryTimer = setTimeout(() => setReconnectKey(k => k + 1), delay);
+            }
         };
 
         socketRef.current.onerror = (error) => {
@@ -33,11 +79,13 @@ const useWebsocket = (boardId) => {
         };
 
         return () => {
+            clearTimeout(retryTimer);
+            clearTimeout(ackTimer);
             if (socketRef.current) {
                 socketRef.current.close();
             }
         };
-    }, [boardId]);
+    }, [boardId, reconnectKey]);
 
     const sendMessage = useCallback((data) => {
         if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
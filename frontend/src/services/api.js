@@ -7,4 +7,19 @@ const api = axios.create({
     },
 });
 
+// Read-your-writes: tras escribir, el backend devuelve X-DB-Pin y mientras
+// se reenvíe las lecturas van al primario (ver ReplicaRoutingMiddleware)
+let dbPin = null;
+
+api.interceptors.request.use((config) => {
+    if (dbPin) config.headers['X-DB-Pin'] = dbPin;
+    return config;
+});
+
+api.interceptors.response.use((response) => {
+    const pin = response.headers['x-db-pin'];
+    if (pin) dbPin = pin;
+    return response;
+});
+
 export default api;